@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""Time and memory of large blueprints as they grow, fully offline.
+
+For each size, a synthetic blueprint (see bench_orchestrator.synthetic_blueprint)
+is parsed with PyYAML's loader and with the streamed loader, validated,
+compiled and, up to --run-max phases, run with the OPENAI_OFFLINE mock and a
+SQLite checkpointer. Every step reports milliseconds and tracemalloc peak MB;
+the run also reports the bytes checkpointed for ProjectState channels
+next to the whole checkpoint database. The last table divides each cost per
+phase at the largest size by the same at the smallest: 1.0 is linear.
+
+    python benchmarks/bench_blueprint_scaling.py                       # 250..4000 phases
+    python benchmarks/bench_blueprint_scaling.py --sizes 100,200,400 --run-max 400 --out scaling.json
+"""
+import argparse, contextlib, gc, io as _io, json, os, pathlib, sqlite3, sys, tempfile, time, tracemalloc
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("OPENAI_OFFLINE", "1")
+
+from bench_orchestrator import synthetic_blueprint
+
+def _measure(fn):
+    """(result, ms, peak MB); time and memory on separate passes, tracing slows allocation down."""
+    gc.collect()
+    t = time.perf_counter()
+    out = fn()
+    ms = (time.perf_counter() - t) * 1000
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, round(ms, 1), round(peak / 2**20, 2)
+
+def _run(text: str, run_id: str) -> dict:
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    from src import orchestrator
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            pathlib.Path("run_artifacts").mkdir()
+            pathlib.Path("bp.yaml").write_text(text)
+            pathlib.Path("prompts.yaml").write_text("worker: Do the phase's work.\n")
+            t = time.perf_counter()
+            with contextlib.redirect_stdout(_io.StringIO()):
+                orchestrator.run_blueprint("bp.yaml", "prompts.yaml", run_id=run_id)
+            run_s = time.perf_counter() - t
+            db = sqlite3.connect(".agent_state/runs.sqlite")
+            # checkpoint rows also carry LangGraph's own bookkeeping (channel versions per node,
+            # fan-in barriers), which grows with the graph; state is what ProjectState holds
+            total = db.execute("select sum(length(checkpoint) + length(metadata)) from checkpoints").fetchone()[0]
+            writes = db.execute("select sum(length(value)) from writes").fetchone()[0]
+            keys = tuple(orchestrator.ProjectState.__annotations__)
+            state = db.execute(f"select sum(length(value)) from writes where channel in ({','.join('?' * len(keys))})",
+                               keys).fetchone()[0]
+            serde = JsonPlusSerializer()
+            for typ, blob in db.execute("select type, checkpoint from checkpoints"):
+                values = serde.loads_typed((typ, blob))["channel_values"]
+                state += len(serde.dumps_typed({k: v for k, v in values.items() if k in keys})[1])
+            db.close()
+        finally:
+            os.chdir(cwd)
+    return {"run_ms": round(run_s * 1000, 1), "state_kb": round(state / 1024, 1),
+            "checkpoint_kb": round((total + writes) / 1024, 1)}
+
+def scenario(phases: int, tasks: int, width: int, run: bool) -> dict:
+    import yaml
+    from src import orchestrator
+    from src.models import Blueprint
+    from src.runtime import loader
+
+    bp = synthetic_blueprint(phases, tasks, width, github_every=0)
+    # deploy needs the vercel CLI; this benchmark is about the orchestrator's own costs
+    bp["phases"][-1]["tasks"] = [t for t in bp["phases"][-1]["tasks"] if t["id"] != "deploy"]
+    text = yaml.safe_dump(bp, sort_keys=False)
+    row = {"phases": phases, "tasks": phases * tasks, "yaml_kb": round(len(text) / 1024, 1)}
+    _, row["pyyaml_ms"], row["pyyaml_mb"] = _measure(lambda: yaml.load(text, Loader=loader.YamlLoader))
+    data, row["parse_ms"], row["parse_mb"] = _measure(lambda: loader.load_yaml(text))
+    model, row["validate_ms"], row["validate_mb"] = _measure(lambda: Blueprint.model_validate(data))
+    _, row["compile_ms"], row["compile_mb"] = _measure(lambda: orchestrator.compile_graph(model, {"worker": "w"}))
+    if run:
+        row.update(_run(text, f"scale-{phases}"))
+    return row
+
+COSTS = ("pyyaml_ms", "parse_ms", "validate_ms", "compile_ms", "run_ms",
+         "pyyaml_mb", "parse_mb", "validate_mb", "compile_mb", "state_kb", "checkpoint_kb")
+
+def growth(rows) -> dict:
+    """Per-phase cost at the largest size over the smallest, per metric (1.0 = linear)."""
+    out = {}
+    for c in COSTS:
+        have = [r for r in rows if r.get(c)]
+        if len(have) > 1:
+            lo, hi = have[0], have[-1]
+            out[c] = round((hi[c] / hi["phases"]) / (lo[c] / lo["phases"]), 2)
+    return out
+
+def format_table(rows) -> str:
+    cols = [c for c in ("phases", "tasks", "yaml_kb") + COSTS if any(c in r for r in rows)]
+    cells = [cols] + [[str(r.get(c, "")) for c in cols] for r in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(cols))]
+    lines = ["  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip() for row in cells]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="250,500,1000,2000,4000", help="phase counts, ascending")
+    ap.add_argument("--tasks", type=int, default=3, help="tasks per phase")
+    ap.add_argument("--width", type=int, default=4, help="parallel phases per layer (1 = chain)")
+    ap.add_argument("--run-max", type=int, default=500, help="also run blueprints up to this many phases")
+    ap.add_argument("--out", default=None, help="write results JSON here")
+    args = ap.parse_args()
+
+    rows = []
+    for phases in (int(s) for s in args.sizes.split(",")):
+        rows.append(scenario(phases, args.tasks, args.width, phases <= args.run_max))
+        print(f"phases={phases}: parse {rows[-1]['parse_ms']}ms, compile {rows[-1]['compile_ms']}ms",
+              file=sys.stderr)
+    ratios = growth(rows)
+    print(format_table(rows))
+    print("\nper-phase growth, largest / smallest size (1.0 = linear)")
+    print(format_table([ratios]) if ratios else "(needs two sizes)")
+    if args.out:
+        pathlib.Path(args.out).write_text(json.dumps({"params": vars(args), "results": rows,
+                                                      "growth": ratios}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""Changelog/version tooling on a synthetic repository with a long history.
+
+Builds a repo of --commits commits with `git fast-import` (a tag --since-tag
+commits before HEAD), then times the release steps: the previous scripts
+(separate `git log` runs, one regex per section), the streamed single-regex
+pass with a cold cache, a warm cache after --new more commits land, and
+refreshing the release section of a long CHANGELOG.md.
+
+    python benchmarks/bench_changelog.py                  # 100k commits
+    python benchmarks/bench_changelog.py --commits 20000 --keep /tmp/bench-repo
+"""
+import argparse, datetime, os, pathlib, random, re, shutil, subprocess, sys, tempfile, time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "scripts"))
+import commit_log  # noqa: E402
+from changelog_from_commits import write_changelog  # noqa: E402
+
+PREFIXES = ["feat", "fix", "chore", "docs", "refactor", "test", "ci", "perf", "build", "feat(api)", "fix(ui)",
+            "Merge pull request", "Update README"]
+
+def _message(rng: random.Random, i: int) -> str:
+    prefix = rng.choice(PREFIXES)
+    subject = f"{prefix}: change {i}" if not prefix[0].isupper() else f"{prefix} #{i}"
+    if rng.random() < 0.002:
+        subject = subject.replace(":", "!:", 1)
+    body = "\n\nBREAKING CHANGE: config moved" if rng.random() < 0.001 else "\n\nDetails of the change."
+    return subject + body
+
+def fast_import(repo: pathlib.Path, start: int, n: int, seed: int = 1, tag_at: int | None = None):
+    """Append n empty commits to main (marks start+1..start+n) in one fast-import stream."""
+    rng = random.Random(seed + start)
+    out = []
+    ts = 1_500_000_000 + start * 60
+    for i in range(start + 1, start + n + 1):
+        msg = _message(rng, i).encode()
+        out.append(f"commit refs/heads/main\nmark :{i}\ncommitter Bench <bench@example.com> {ts + i * 60} +0000\n"
+                   f"data {len(msg)}\n".encode() + msg + b"\n")
+        if i > 1:  # earlier runs' marks are imported, so :start is the current tip
+            out.append(f"from :{i - 1}\n".encode())
+        if i == tag_at:
+            out.append(f"tag v1.0.0\nfrom :{i}\ntagger Bench <bench@example.com> {ts + i * 60} +0000\n"
+                       f"data 6\nv1.0.0\n".encode())
+    marks = ["--import-marks-if-exists=marks", "--export-marks=marks"]
+    subprocess.run(["git", "fast-import", "--quiet", *marks], cwd=repo, input=b"".join(out), check=True)
+    subprocess.run(["git", "reset", "--hard", "-q", "main"], cwd=repo, check=True)
+
+# --- the scripts as they were: git log twice, a version_bump log of its own, a regex per section
+LEGACY_SECTIONS = {
+    "Breaking": re.compile(r"BREAKING CHANGE|!:"),
+    "Features": re.compile(r"^feat"),
+    "Fixes": re.compile(r"^fix"),
+    "Chore": re.compile(r"^(build|chore|ci|docs|refactor|perf|test)"),
+}
+
+def legacy(repo: pathlib.Path, tag: str | None):
+    rng = f"{tag}..HEAD" if tag else "--since=1970-01-01"
+    # version_bump.py
+    lines = subprocess.check_output(["git", "log", "--pretty=%s%n%b", rng], text=True, cwd=repo).splitlines()
+    bump = "major" if any(LEGACY_SECTIONS["Breaking"].search(l) for l in lines) else "minor"
+    # chngelog_from_commits.py: commits_since() and then __main__ again
+    subprocess.check_output(["git", "log", "--pretty=%H%x09%s"], text=True, cwd=repo)
+    subprocess.check_output(["git", "log", "--pretty=%s", rng], text=True, cwd=repo)
+    commits = subprocess.check_output(["git", "log", "--pretty=%s", rng], text=True, cwd=repo).splitlines()
+    buckets = {k: [] for k in LEGACY_SECTIONS}
+    for c in commits:
+        for name, rx in LEGACY_SECTIONS.items():
+            if rx.search(c):
+                buckets[name].append(c)
+                break
+    return bump, buckets
+
+def current(repo: pathlib.Path, tag: str | None):
+    commits = commit_log.commits_since(tag, cwd=repo)
+    return commit_log.group(commits)
+
+def _time(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--commits", type=int, default=100_000)
+    ap.add_argument("--since-tag", type=int, default=20_000, help="commits after the last tag (0 = no tag)")
+    ap.add_argument("--new", type=int, default=200, help="commits merged between two release-PR refreshes")
+    ap.add_argument("--releases", type=int, default=2_000, help="sections already in CHANGELOG.md")
+    ap.add_argument("--keep", default=None, help="build the repo here and keep it")
+    args = ap.parse_args()
+
+    repo = pathlib.Path(args.keep or tempfile.mkdtemp(prefix="bench-changelog-"))
+    repo.mkdir(parents=True, exist_ok=True)
+    try:
+        t = time.perf_counter()
+        subprocess.run(["git", "init", "-q", "-b", "main"], cwd=repo, check=True)
+        tag_at = args.commits - args.since_tag if args.since_tag else None
+        fast_import(repo, 0, args.commits, tag_at=tag_at)
+        print(f"built {args.commits} commits in {time.perf_counter() - t:.1f}s ({repo})")
+        tag = commit_log.last_tag(repo)
+        cache = commit_log._cache_path(repo)
+
+        rows = [("legacy scripts", _time(lambda: legacy(repo, tag)))]
+        rows.append(("streamed, cold cache", _time(lambda: (cache.unlink(missing_ok=True), current(repo, tag)))))
+        rows.append(("cache, HEAD unchanged", _time(lambda: current(repo, tag))))
+        fast_import(repo, args.commits, args.new)
+        current(repo, tag)  # what the first refresh after the merges pays is below
+        fast_import(repo, args.commits + args.new, args.new)
+        rows.append((f"cache, +{args.new} commits", _time(lambda: current(repo, tag), repeat=1)))
+
+        log = repo / "CHANGELOG.md"
+        grouped, other = current(repo, tag)
+        def build_changelog():
+            log.write_text("# Changelog\n\n" + "".join(
+                f"## 0.{i}.0 - 2020-01-01\n\n### Fixes\n\n" + "".join(f"- fix: change {j}\n" for j in range(20)) + "\n"
+                for i in range(args.releases, 0, -1)), encoding="utf-8")
+        def legacy_write():
+            prev = log.read_text()
+            today = datetime.date.today().isoformat()
+            log.write_text(f"## 9.9.9 - {today}\n" + "".join(f"- {c}\n" for c in sum(grouped.values(), [])) + "\n" + prev)
+        build_changelog()
+        rows.append((f"CHANGELOG prepend ({args.releases} releases)", _time(legacy_write)))
+        build_changelog()
+        write_changelog("9.9.9", grouped, other, log)
+        rows.append((f"CHANGELOG refresh ({args.releases} releases)",
+                     _time(lambda: write_changelog("9.9.9", grouped, other, log))))
+        assert log.read_text().count("## 9.9.9 ") == 1
+
+        width = max(len(r[0]) for r in rows)
+        for name, secs in rows:
+            print(f"{name.ljust(width)}  {secs * 1000:9.1f} ms")
+    finally:
+        if not args.keep:
+            shutil.rmtree(repo, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Orchestrator overhead benchmarks on synthetic blueprints, fully offline.
+
+Measures blueprint validation, graph compile time and memory, end-to-end run
+time, per-phase overhead, throughput and checkpoint state size for blueprints
+of 10-1000 phases. LLM calls go through the OPENAI_OFFLINE mock (default) or,
+with --llm-latency-ms, a local fake Responses API server with that latency;
+GitHub calls hit a local stub server and deploy.vercel runs a fake CLI.
+
+    python benchmarks/bench_orchestrator.py                      # 10,100,1000 phases
+    python benchmarks/bench_orchestrator.py --sizes 10,100 --concurrency 1,4,16 --llm-latency-ms 20
+    python benchmarks/bench_orchestrator.py --compare benchmarks/results/<old>.json
+
+Results are written as JSON (default benchmarks/results/<commit>.json).
+"""
+import argparse, contextlib, io as _io, json, os, pathlib, platform, resource, stat, subprocess
+import sys, tempfile, threading, time, tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+# --- stub servers
+
+class _Stub:
+    def __init__(self, respond):
+        class H(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _serve(self):
+                n = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(n)) if n else None
+                status, payload = respond(self.command, self.path, body)
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            do_GET = do_POST = do_PATCH = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), H)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def fake_llm(latency: float) -> _Stub:
+    """Deterministic Responses API: fixed text and usage after `latency` seconds."""
+    def respond(method, path, body):
+        time.sleep(latency)
+        text = f"synthetic output for {len(json.dumps(body))} bytes of input"
+        return 200, {
+            "id": "resp_bench", "object": "response", "created_at": 0, "model": body["model"],
+            "status": "completed", "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+            "output": [{"type": "message", "id": "msg_bench", "role": "assistant", "status": "completed",
+                        "content": [{"type": "output_text", "text": text, "annotations": []}]}],
+            "usage": {"input_tokens": 200, "output_tokens": 50, "total_tokens": 250,
+                      "input_tokens_details": {"cached_tokens": 0},
+                      "output_tokens_details": {"reasoning_tokens": 0}}}
+    return _Stub(respond)
+
+def fake_github() -> _Stub:
+    counter = iter(range(1, 10**9))
+    def respond(method, path, body):
+        if path.endswith("/issues") and method == "POST":
+            n = next(counter)
+            return 201, {"number": n, "html_url": f"https://github.invalid/issues/{n}"}
+        return 200, {"default_branch": "main", "object": {"sha": "0" * 40}}
+    return _Stub(respond)
+
+def fake_vercel(bin_dir: pathlib.Path):
+    script = bin_dir / "vercel"
+    script.write_text("#!/bin/sh\necho 'https://bench.vercel.invalid'\n")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+
+# --- synthetic blueprints
+
+def synthetic_blueprint(phases: int, tasks: int = 3, width: int = 1, github_every: int = 10) -> dict:
+    """A root phase, then layers of `width` parallel phases each depending on the whole previous layer.
+
+    width=1 gives a plain chain linked by transitions. Every phase has `tasks`
+    tasks (odd ones depend on the previous task); every `github_every`th phase
+    opens an issue and the last phase deploys.
+    """
+    ids = [f"p{i}" for i in range(phases)]
+    out = []
+    for i, pid in enumerate(ids):
+        ts = []
+        for k in range(tasks):
+            t = {"id": f"t{k}", "tool_calls": ["ci.run_tests" if k % 2 else "lighthouse.audit:https://example.com"]}
+            if k % 2:
+                t["depends_on"] = [f"t{k - 1}"]
+            ts.append(t)
+        if github_every and i % github_every == github_every - 1:
+            ts.append({"id": "issue", "tool_calls": [f"github.create_issue:title=Phase {pid}"]})
+        if i == phases - 1:
+            ts.append({"id": "deploy", "tool_calls": ["deploy.vercel:prod=false"]})
+        ph = {"id": pid, "entry_prompt": "worker", "tasks": ts}
+        if width == 1:
+            ph["transitions"] = {"on_complete": ids[i + 1] if i + 1 < phases else "done"}
+        elif i:
+            layer = (i - 1) // width
+            ph["depends_on"] = ["p0"] if layer == 0 else [ids[j] for j in range(1 + (layer - 1) * width,
+                                                                                 1 + layer * width)]
+        out.append(ph)
+    return {"project": {"id": f"synthetic-{phases}", "goal": "benchmark orchestrator overhead"}, "phases": out}
+
+def _layers(phases: int, width: int) -> int:
+    return phases if width == 1 else 1 + -(-(phases - 1) // width)
+
+# --- scenarios
+
+def run_scenario(phases: int, tasks: int, width: int, concurrency: int, llm_latency: float) -> dict:
+    import yaml
+    from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+    from src import orchestrator
+    from src.models import Blueprint
+    from src.runtime import loader
+
+    bp = synthetic_blueprint(phases, tasks, width)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            pathlib.Path("run_artifacts").mkdir()
+            pathlib.Path("bp.yaml").write_text(yaml.safe_dump(bp, sort_keys=False))
+            pathlib.Path("prompts.yaml").write_text(yaml.safe_dump({"worker": "Do the phase's work. " * 20}))
+            loader.clear()
+            t = time.perf_counter()
+            model = Blueprint.model_validate(bp)
+            validate_s = time.perf_counter() - t
+            t = time.perf_counter()
+            orchestrator.compile_graph(model, {"worker": "w"})
+            compile_s = time.perf_counter() - t
+
+            # tracing allocations slows compilation down, so memory is measured on a separate pass;
+            # this one also warms the graph cache used by the run below
+            tracemalloc.start()
+            orchestrator.get_graph("bp.yaml", "prompts.yaml", orchestrator.shared_checkpointer())
+            compile_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            t = time.perf_counter()
+            with contextlib.redirect_stdout(_io.StringIO()):
+                result = orchestrator.run_blueprint("bp.yaml", "prompts.yaml", max_concurrency=concurrency,
+                                                    run_id=f"bench-{phases}-{concurrency}")
+            run_s = time.perf_counter() - t
+        finally:
+            os.chdir(cwd)
+
+    t = time.perf_counter()
+    _, blob = JsonPlusSerializer().dumps_typed(result)
+    serialize_s = time.perf_counter() - t
+    ideal_s = _layers(phases, width) * llm_latency
+    return {
+        "phases": phases, "tasks": tasks, "width": width, "concurrency": concurrency,
+        "llm_latency_ms": round(llm_latency * 1000, 1),
+        "validate_ms": round(validate_s * 1000, 2),
+        "compile_ms": round(compile_s * 1000, 2),
+        "compile_peak_mb": round(compile_peak / 2**20, 2),
+        "phases_run": len(result.get("artifacts", {})),
+        "run_s": round(run_s, 3),
+        # wall time beyond the critical path of LLM latency, spread over phases
+        "overhead_ms_per_phase": round(max(0.0, run_s - ideal_s) / phases * 1000, 3),
+        "phases_per_s": round(phases / run_s, 1),
+        "state_bytes": len(blob),
+        "serialize_ms": round(serialize_s * 1000, 3),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+def _key(r: dict) -> tuple:
+    return (r["phases"], r["tasks"], r["width"], r["concurrency"], r["llm_latency_ms"])
+
+METRICS = ("validate_ms", "compile_ms", "compile_peak_mb", "run_s", "overhead_ms_per_phase",
+           "phases_per_s", "state_bytes", "serialize_ms")
+
+def format_results(rows, baseline=None) -> str:
+    base = {_key(r): r for r in (baseline or [])}
+    cols = ("phases", "width", "concurrency", "llm_latency_ms") + METRICS
+    cells = [cols]
+    for r in rows:
+        old = base.get(_key(r))
+        cell = []
+        for c in cols:
+            v = str(r[c])
+            if old and c in METRICS and old[c]:
+                v += f" ({(r[c] - old[c]) / old[c] * 100:+.0f}%)"
+            cell.append(v)
+        cells.append(tuple(cell))
+    widths = [max(len(row[i]) for row in cells) for i in range(len(cols))]
+    lines = ["  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip() for row in cells]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+def _commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--sizes", default="10,100,1000", help="phase counts")
+    ap.add_argument("--tasks", type=int, default=3, help="tasks per phase")
+    ap.add_argument("--width", type=int, default=4, help="parallel phases per layer (1 = chain)")
+    ap.add_argument("--concurrency", default="4", help="comma-separated max_concurrency values")
+    ap.add_argument("--llm-latency-ms", type=float, default=0,
+                    help="0 = OPENAI_OFFLINE mock, else a fake LLM server with this latency")
+    ap.add_argument("--out", default=None, help="results JSON (default benchmarks/results/<commit>.json)")
+    ap.add_argument("--compare", default=None, help="earlier results JSON to diff against")
+    args = ap.parse_args()
+
+    bin_dir = pathlib.Path(tempfile.mkdtemp(prefix="bench-bin-"))
+    fake_vercel(bin_dir)
+    github = fake_github()
+    # configuration is read at import time, so set it up before importing src
+    os.environ.update(PATH=f"{bin_dir}{os.pathsep}{os.environ['PATH']}", VERCEL_TOKEN="bench",
+                      GITHUB_TOKEN="bench", GITHUB_OWNER="bench", GITHUB_REPO="bench",
+                      GITHUB_API_URL=github.url)
+    server = None
+    latency = args.llm_latency_ms / 1000
+    if latency:
+        from openai import AsyncOpenAI
+        from src.runtime import llm
+        server = fake_llm(latency)
+        os.environ.pop("OPENAI_OFFLINE", None)
+        llm._engine = llm.LLMEngine(client=AsyncOpenAI(base_url=f"{server.url}/v1", api_key="bench",
+                                                       max_retries=0),
+                                    rpm=1e9, tpm=1e12, max_in_flight=256)
+    else:
+        os.environ["OPENAI_OFFLINE"] = "1"
+
+    rows = []
+    try:
+        for phases in (int(s) for s in args.sizes.split(",")):
+            for conc in (int(c) for c in args.concurrency.split(",")):
+                row = run_scenario(phases, args.tasks, args.width, conc, latency)
+                print(f"phases={phases} concurrency={conc}: {row['run_s']}s, compile {row['compile_ms']}ms",
+                      file=sys.stderr)
+                rows.append(row)
+    finally:
+        github.close()
+        if server:
+            server.close()
+
+    baseline = json.loads(pathlib.Path(args.compare).read_text())["results"] if args.compare else None
+    print(format_results(rows, baseline))
+    commit = _commit()
+    out = pathlib.Path(args.out or ROOT / "benchmarks" / "results" / f"{commit}.json")
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps({"commit": commit, "python": platform.python_version(),
+                               "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                               "params": vars(args), "results": rows}, indent=2))
+    print(f"Results written to {out}")
+
+if __name__ == "__main__":
+    main()
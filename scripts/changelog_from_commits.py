@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import os, sys, shutil, datetime, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+from commit_log import commits_since, group, last_tag
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+CHANGELOG = ROOT / "CHANGELOG.md"
+HEADER = "# Changelog\n\n"
+
+def render(version, grouped, other):
+    today = datetime.date.today().isoformat()
+    lines = []
+    lines.append(f"## {version} - {today}\n")
+    for name, items in grouped.items():
+        if items:
+            lines.append(f"### {name}\n")
+            for it in items:
+                lines.append(f"- {it}")
+            lines.append("")
+    if other:
+        lines.append("### Other")
+        for it in other:
+            lines.append(f"- {it}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+def write_changelog(version, grouped, other, path=CHANGELOG):
+    """Put the version's section at the top of the changelog.
+
+    Re-running for the same version (e.g. the release PR refreshed after more
+    merges) replaces that section; older releases are copied through as-is,
+    streamed, so a long changelog is never held in memory or re-rendered.
+    """
+    path = pathlib.Path(path)
+    content = render(version, grouped, other)
+    if not path.exists():
+        path.write_text(HEADER + content, encoding="utf-8")
+        return
+    tmp = path.with_name(path.name + ".tmp")
+    with open(path, encoding="utf-8") as src, open(tmp, "w", encoding="utf-8") as dst:
+        line = src.readline()
+        # keep the title (and anything above the first release) in place
+        while line and not line.startswith("## "):
+            dst.write(line)
+            line = src.readline()
+        if dst.tell() == 0:
+            dst.write(HEADER)
+        dst.write(content + "\n")
+        if line.startswith(f"## {version} "):
+            # drop the stale section for this version
+            line = src.readline()
+            while line and not line.startswith("## "):
+                line = src.readline()
+        dst.write(line)
+        shutil.copyfileobj(src, dst)
+    os.replace(tmp, path)
+
+if __name__ == "__main__":
+    commits = commits_since(last_tag())
+    if not any(subject.strip() for _, _, subject in commits):
+        sys.exit(0)
+    # Version provided via env (preferred), else fallback
+    version = os.getenv("NEXT_VERSION", "0.0.0")
+    grouped, other = group(commits)
+    write_changelog(version, grouped, other)
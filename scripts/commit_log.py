@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# Shared by changelog_from_commits.py and version_bump.py: one streamed `git log`
+# per run, one regex per commit, and a per-clone cache of classified commits.
+import os, re, json, subprocess, pathlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+SECTIONS = ("Breaking", "Features", "Fixes", "Chore")
+# one pass per subject; the lookahead keeps "breaking wins over the type prefix"
+CLASSIFY = re.compile(r"^(?:(?=.*(?:BREAKING CHANGE|!:))(?P<Breaking>)|(?P<Features>feat)|(?P<Fixes>fix)"
+                      r"|(?P<Chore>build|chore|ci|docs|refactor|perf|test))")
+FORMAT = "--format=%H%x1f%s%x1f%b%x1e"
+CACHE_VERSION = 1
+
+Commit = Tuple[str, str, str]  # (sha, section or "Other", subject)
+
+def git(*args: str, cwd=None) -> str:
+    return subprocess.check_output(["git", *args], text=True, cwd=cwd, stderr=subprocess.DEVNULL).strip()
+
+def last_tag(cwd=None) -> Optional[str]:
+    try:
+        return git("describe", "--tags", "--abbrev=0", cwd=cwd)
+    except subprocess.CalledProcessError:
+        return None
+
+def classify(subject: str, body: str = "") -> str:
+    m = CLASSIFY.match(subject)
+    if (m and m.lastgroup == "Breaking") or "BREAKING CHANGE" in body:
+        return "Breaking"
+    return m.lastgroup if m else "Other"
+
+def iter_log(rng: List[str], cwd=None) -> Iterator[Commit]:
+    """Classified commits, newest first, parsed while git is still writing them."""
+    proc = subprocess.Popen(["git", "log", FORMAT, *rng], cwd=cwd, stdout=subprocess.PIPE,
+                            stderr=subprocess.DEVNULL, text=True, encoding="utf-8", errors="replace")
+    buf = ""
+    try:
+        while True:
+            chunk = proc.stdout.read(1 << 16)
+            if not chunk:
+                break
+            *records, buf = (buf + chunk).split("\x1e")
+            for rec in records:
+                sha, subject, body = rec.lstrip("\n").split("\x1f", 2)
+                yield sha, classify(subject, body), subject
+    finally:
+        proc.stdout.close()
+        if proc.wait() not in (0, -13):  # -13: we stopped reading early
+            raise subprocess.CalledProcessError(proc.returncode, ["git", "log", *rng])
+
+def _cache_path(cwd=None) -> pathlib.Path:
+    # inside .git: per clone, never committed
+    return pathlib.Path(cwd or ".") / git("rev-parse", "--git-dir", cwd=cwd) / "changelog-cache.json"
+
+def commits_since(tag: Optional[str], cwd=None, cache: bool = True) -> List[Commit]:
+    """Commits in tag..HEAD (all history without a tag), newest first.
+
+    The classified list is cached with the HEAD it was computed at; the next call
+    for the same tag only reads HEAD's new commits, as long as the old HEAD is
+    still an ancestor (no force-push / rebase in between).
+    """
+    head = git("rev-parse", "HEAD", cwd=cwd)
+    path = _cache_path(cwd)
+    saved: Dict = {}
+    if cache and path.exists():
+        try:
+            saved = json.loads(path.read_text(encoding="utf-8"))
+        except ValueError:
+            saved = {}
+    old: List[Commit] = []
+    rng = [f"{tag}..HEAD"] if tag else ["HEAD"]
+    if saved.get("version") == CACHE_VERSION and saved.get("tag") == tag and saved.get("head"):
+        if saved["head"] == head:
+            return [tuple(c) for c in saved["commits"]]
+        if subprocess.call(["git", "merge-base", "--is-ancestor", saved["head"], head], cwd=cwd,
+                           stderr=subprocess.DEVNULL) == 0:
+            old = [tuple(c) for c in saved["commits"]]
+            rng = [f"{saved['head']}..HEAD"] + ([f"^{tag}"] if tag else [])
+    commits = list(iter_log(rng, cwd)) + old
+    if cache:
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"version": CACHE_VERSION, "tag": tag, "head": head, "commits": commits}),
+                       encoding="utf-8")
+        os.replace(tmp, path)
+    return commits
+
+def group(commits: List[Commit]) -> Tuple[Dict[str, List[str]], List[str]]:
+    buckets: Dict[str, List[str]] = {k: [] for k in SECTIONS}
+    other: List[str] = []
+    for _, section, subject in commits:
+        if section in buckets:
+            buckets[section].append(subject)
+        elif subject.strip():
+            other.append(subject)
+    return buckets, other
@@ -1,11 +1,12 @@
 #!/usr/bin/env python3
-import os, re, subprocess, sys, pathlib
+import re, sys, pathlib
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent))
+from commit_log import commits_since, last_tag
 
 ROOT = pathlib.Path(__file__).resolve().parents[1]
 VERSION_FILE = ROOT / "VERSION"
 
 SEMVER = re.compile(r"^(\d+)\.(\d+)\.(\d+)$")
-BREAKING_RE = re.compile(r"BREAKING CHANGE|!:")
 
 def get_current_version():
     if VERSION_FILE.exists():
@@ -16,34 +17,14 @@ def get_current_version():
         return v
     return "0.1.0"
 
-def get_last_tag():
-    try:
-        tag = subprocess.check_output(["git", "describe", "--tags", "--abbrev=0"], text=True).strip()
-        return tag
-    except subprocess.CalledProcessError:
-        return None
-
-def get_commits_since(ref):
-    if ref:
-        rng = f"{ref}..HEAD"
-    else:
-        # no tags — use full history
-        rng = "--since=1970-01-01"
-    out = subprocess.check_output(["git", "log", "--pretty=%s%n%b", rng], text=True)
-    return out.splitlines()
-
 def detect_bump(commits):
-    bump = "patch"  # default
-    for line in commits:
-        if BREAKING_RE.search(line):
-            return "major"
-    for line in commits:
-        if line.startswith("feat"):
-            bump = "minor"
-    for line in commits:
-        if line.startswith("fix"):
-            bump = max(bump, "patch", key=["patch","minor","major"].index)
-    return bump
+    # commits are classified once (subject and BREAKING CHANGE footers) by commit_log
+    sections = {section for _, section, _ in commits}
+    if "Breaking" in sections:
+        return "major"
+    if "Features" in sections:
+        return "minor"
+    return "patch"
 
 def bump_version(v, bump):
     major, minor, patch = map(int, v.split("."))
@@ -55,9 +36,9 @@ def bump_version(v, bump):
 
 if __name__ == "__main__":
     cur = get_current_version()
-    tag = get_last_tag()
-    commits = get_commits_since(tag)
-    if not any(c.strip() for c in commits):
+    # shares the classification cache with changelog_from_commits.py, which runs next
+    commits = commits_since(last_tag())
+    if not any(subject.strip() for _, _, subject in commits):
         print(cur)  # nothing to bump
         sys.exit(0)
     bump = detect_bump(commits)
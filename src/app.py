@@ -1,25 +1,109 @@
-import os, argparse, yaml, sys
+# Subcommands import what they need when they run: `validate` must not pay for
+# openai, langgraph or requests (tests/test_startup.py holds it to that).
+import os, argparse, sys
 from pathlib import Path
 from dotenv import load_dotenv, find_dotenv
-from pydantic import ValidationError
-from .models import Blueprint
-from .orchestrator import run_blueprint
 
 def cmd_validate(args):
+    from pydantic import ValidationError
+    from .runtime.loader import load_blueprint, load_prompts
+    from .runtime.prompts import compile_prompts
+    from .runtime.routing import RouteTable
+    from .tools.registry import validate_tools
     try:
-        Blueprint.model_validate(yaml.safe_load(open(args.blueprint)))
-        print("Blueprint is valid ✅")
+        _, bp = load_blueprint(args.blueprint)
     except ValidationError as e:
         print("Blueprint validation failed ❌")
         print(e)
         sys.exit(1)
+    errors = validate_tools(bp) + RouteTable(bp).errors
+    if args.prompts:
+        errors += compile_prompts(load_prompts(args.prompts)[1])[1]
+    if errors:
+        print("Blueprint validation failed ❌")
+        print("\n".join(errors))
+        sys.exit(1)
+    print("Blueprint is valid ✅")
 
 def cmd_run(args):
+    if args.from_phase and not args.resume:
+        print("--from-phase requires --resume <run-id>")
+        sys.exit(2)
+    # approvals are part of each phase's fingerprint, so the dry run needs them too
+    approvals = {name: True for name in args.approve} or None
+    if args.dry_run:
+        from .orchestrator import dry_run
+        rows = dry_run(args.blueprint, args.prompts, approvals=approvals)
+        width = max(len(p) for p, _, _ in rows)
+        for phase, runs, reason in rows:
+            print(f"{phase.ljust(width)}  {'run ' if runs else 'skip'}  {reason}")
+        print(f"{sum(r for _, r, _ in rows)} of {len(rows)} phase(s) would run")
+        return
     if not os.getenv("OPENAI_API_KEY"):
         hint = f" (looked in: {LOADED_DOTENV})" if 'LOADED_DOTENV' in globals() and LOADED_DOTENV else ""
         print(f"OPENAI_API_KEY is not set. Add it to your .env or export it.{hint}")
         sys.exit(1)
-    run_blueprint(args.blueprint, args.prompts, approvals=None)
+    from .orchestrator import run_blueprint
+    result = run_blueprint(args.blueprint, args.prompts, approvals=approvals, max_concurrency=args.max_concurrency,
+                           cache=args.cache, resume=args.resume, from_phase=args.from_phase,
+                           stream=args.stream, incremental=args.incremental)
+    if result.get("halted"):
+        sys.exit(1)
+
+def cmd_run_batch(args):
+    from .batch import expand_blueprints, run_batch, format_table, write_summary
+    if not os.getenv("OPENAI_API_KEY"):
+        print("OPENAI_API_KEY is not set. Add it to your .env or export it.")
+        sys.exit(1)
+    blueprints = expand_blueprints(args.blueprints)
+    if not blueprints:
+        print(f"No blueprints match {args.blueprints}")
+        sys.exit(1)
+    rows = run_batch(blueprints, args.prompts, workers=args.workers, llm_concurrency=args.llm_concurrency,
+                     max_concurrency=args.max_concurrency, cache=args.cache,
+                     approvals={name: True for name in args.approve} or None)
+    print(format_table(rows))
+    write_summary(rows, args.summary)
+    print(f"Summary written to {args.summary}")
+    # like `run`, a halted run fails the command; a run waiting at a gate does not
+    if any(r["outcome"].startswith(("error", "halted")) for r in rows):
+        sys.exit(1)
+
+def cmd_report(args):
+    from .runtime.tracing import load_spans, phase_report, format_report
+    if not Path(args.trace).exists():
+        print(f"No trace file at {args.trace}")
+        sys.exit(1)
+    spans = load_spans(args.trace, args.run_id)
+    if not spans:
+        print(f"No spans for run {args.run_id} in {args.trace}")
+        sys.exit(1)
+    print(f"Run {spans[0]['run_id']}")
+    print(format_report(phase_report(spans)))
+
+def cmd_approve(args):
+    if not os.getenv("OPENAI_API_KEY"):
+        print("OPENAI_API_KEY is not set. Add it to your .env or export it.")
+        sys.exit(1)
+    from .orchestrator import run_blueprint
+    # the run continues in this process from its checkpoint, up to the next gate or the end
+    result = run_blueprint(args.blueprint, args.prompts, resume=args.run_id, max_concurrency=args.max_concurrency,
+                           decisions={args.phase: not args.reject})
+    if result.get("halted"):
+        sys.exit(1)
+
+def cmd_gc(args):
+    from .runtime.artifacts import gc
+    out = gc(args.dir, keep_runs=args.keep_runs, max_age_days=args.max_age_days, dry_run=args.dry_run)
+    verb = "Would remove" if args.dry_run else "Removed"
+    print(f"{verb} {out['runs']} run(s), {out['blobs']} blob(s), {out['bytes'] / 2**20:.1f} MiB")
+
+def cmd_serve(args):
+    from .service import serve
+    if not os.getenv("OPENAI_API_KEY"):
+        print("OPENAI_API_KEY is not set. Add it to your .env or export it.")
+        sys.exit(1)
+    serve(args.host, args.port, args.socket, args.workers, args.prompts, queue_path=args.queue, warm=args.warm)
 
 def main():
     # Load env from .env (search upward from CWD), with fallback to repo root
@@ -36,13 +120,78 @@ def main():
 
     p1 = sub.add_parser("validate")
     p1.add_argument("--blueprint", required=True)
+    p1.add_argument("--prompts", default=None, help="also check the role prompt templates")
     p1.set_defaults(func=cmd_validate)
 
     p2 = sub.add_parser("run")
     p2.add_argument("--blueprint", required=True)
     p2.add_argument("--prompts", default="prompts/role_prompts.yaml")
+    p2.add_argument("--max-concurrency", type=int, default=None,
+                    help="max phases/tasks running at once (default: $AGENT_MAX_CONCURRENCY or 4)")
+    p2.add_argument("--cache", choices=["off", "read", "readwrite"], default=os.getenv("AGENT_CACHE", "off"),
+                    help="reuse LLM outputs for identical prompts+state (default: $AGENT_CACHE or off)")
+    p2.add_argument("--resume", metavar="RUN_ID", default=None,
+                    help="continue a checkpointed run instead of starting a new one")
+    p2.add_argument("--from-phase", default=None,
+                    help="with --resume: re-run from this phase, keeping earlier phases' results")
+    p2.add_argument("--stream", action="store_true",
+                    default=os.getenv("OPENAI_STREAM", "").lower() in ("1", "true", "yes"),
+                    help="stream LLM output into artifacts and the console as it arrives")
+    p2.add_argument("--approve", action="append", default=[], metavar="APPROVER",
+                    help="approve this approver's gates up front instead of pausing at them (repeatable)")
+    p2.add_argument("--incremental", action="store_true",
+                    default=os.getenv("AGENT_INCREMENTAL", "").lower() in ("1", "true", "yes"),
+                    help="skip phases whose prompt, tools, context and upstream artifacts are unchanged")
+    p2.add_argument("--dry-run", action="store_true",
+                    help="list which phases an incremental run would re-execute, and why; runs nothing")
     p2.set_defaults(func=cmd_run)
 
+    p3 = sub.add_parser("run-batch", help="run every blueprint in a directory or glob")
+    p3.add_argument("--blueprints", required=True, help="directory of *.yaml or a glob pattern")
+    p3.add_argument("--prompts", default="prompts/role_prompts.yaml")
+    p3.add_argument("--workers", type=int, default=os.cpu_count() or 4, help="worker processes")
+    p3.add_argument("--llm-concurrency", type=int, default=8,
+                    help="total in-flight LLM requests across all workers")
+    p3.add_argument("--max-concurrency", type=int, default=None, help="phases/tasks in flight per run")
+    p3.add_argument("--cache", choices=["off", "read", "readwrite"], default=os.getenv("AGENT_CACHE", "off"))
+    p3.add_argument("--approve", action="append", default=[], metavar="APPROVER",
+                    help="approve this approver's gates up front (repeatable)")
+    p3.add_argument("--summary", default="run_artifacts/batch-summary.json")
+    p3.set_defaults(func=cmd_run_batch)
+
+    p4 = sub.add_parser("report", help="per-phase latency breakdown of a traced run")
+    p4.add_argument("--trace", default=os.getenv("AGENT_TRACE_FILE", "run_artifacts/traces.jsonl"))
+    p4.add_argument("--run-id", default=None, help="run to report on (default: the most recent in the file)")
+    p4.set_defaults(func=cmd_report)
+
+    p5 = sub.add_parser("serve", help="long-running service that runs queued blueprints")
+    p5.add_argument("--host", default="127.0.0.1")
+    p5.add_argument("--port", type=int, default=8765)
+    p5.add_argument("--socket", default=None, help="listen on a Unix socket instead of TCP")
+    p5.add_argument("--workers", type=int, default=2, help="jobs running at once")
+    p5.add_argument("--prompts", default="prompts/role_prompts.yaml", help="default prompts for submitted jobs")
+    p5.add_argument("--queue", default=None, help="job queue database (default: $AGENT_STATE_DIR/jobs.sqlite)")
+    p5.add_argument("--warm", default=None, help="glob of blueprints to precompile at startup")
+    p5.set_defaults(func=cmd_serve)
+
+    p6 = sub.add_parser("gc", help="apply artifact retention: drop old runs and unreferenced blobs")
+    p6.add_argument("--dir", default="run_artifacts")
+    p6.add_argument("--keep-runs", type=int, default=int(os.getenv("AGENT_ARTIFACT_KEEP_RUNS", "0")),
+                    help="keep only the newest N run directories (0 = no limit)")
+    p6.add_argument("--max-age-days", type=float, default=float(os.getenv("AGENT_ARTIFACT_MAX_AGE_DAYS", "0")),
+                    help="drop runs older than this (0 = no limit)")
+    p6.add_argument("--dry-run", action="store_true")
+    p6.set_defaults(func=cmd_gc)
+
+    p7 = sub.add_parser("approve", help="decide a gate a paused run is waiting on and continue the run")
+    p7.add_argument("--blueprint", required=True)
+    p7.add_argument("--prompts", default="prompts/role_prompts.yaml")
+    p7.add_argument("--run-id", required=True)
+    p7.add_argument("--phase", required=True, help="phase whose gate is waiting")
+    p7.add_argument("--reject", action="store_true", help="reject the approval / fail the checks instead")
+    p7.add_argument("--max-concurrency", type=int, default=None)
+    p7.set_defaults(func=cmd_approve)
+
     args = parser.parse_args()
     if not args.cmd:
         parser.print_help()
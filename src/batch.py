@@ -0,0 +1,100 @@
+import os, glob, json, time, pathlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple
+from .runtime import io
+
+def expand_blueprints(pattern: str) -> List[str]:
+    """A directory (its *.yaml / *.yml) or a glob, sorted for a stable order."""
+    p = pathlib.Path(pattern)
+    if p.is_dir():
+        paths = [*p.glob("*.yaml"), *p.glob("*.yml")]
+        return sorted(str(x) for x in paths)
+    return sorted(glob.glob(pattern, recursive=True))
+
+def _init_worker(llm_in_flight: int, rpm: float, tpm: float):
+    # workers live for the whole batch: imports, the OpenAI client and its
+    # limiter are set up once here rather than once per blueprint
+    from . import orchestrator
+    from .runtime import llm
+    orchestrator.WRITE_METRICS = False
+    eng = llm.get_engine()
+    eng.max_in_flight, eng.rpm, eng.tpm = llm_in_flight, rpm, tpm
+
+def _usage(result: Dict[str, Any]) -> Dict[str, int]:
+    out = {"llm_calls": 0, "tokens": 0}
+    for m in (result or {}).get("metrics", {}).values():
+        if m.get("source") == "llm":
+            out["llm_calls"] += 1
+            out["tokens"] += (m.get("usage") or {}).get("total_tokens", 0)
+    return out
+
+def _run_one(blueprint: str, prompts: str, base_dir: str, opts: Dict[str, Any]) -> Dict[str, Any]:
+    from .orchestrator import TRACE, pending_gates, run_blueprint
+    from .runtime.checkpoint import new_run_id
+    from .runtime.tracing import METRICS
+    run_id = new_run_id(pathlib.Path(blueprint).stem)
+    # the artifact store gives each run its own <base_dir>/<run-id>/
+    io.RUN_DIR = pathlib.Path(base_dir)
+    io.RUN_DIR.mkdir(parents=True, exist_ok=True)
+    row = {"blueprint": blueprint, "run_id": run_id, "artifacts": str(io.RUN_DIR / run_id)}
+    start = time.monotonic()
+    try:
+        result = run_blueprint(blueprint, prompts, run_id=run_id, **opts)
+        # a run paused at a gate is not a failure; it is resumed with `approve`
+        waiting = [g["phase"] for g in pending_gates(result)]
+        outcome = "waiting: " + ", ".join(waiting) if waiting else \
+            f"halted: {result['halted']}" if result.get("halted") else "ok"
+        row.update(outcome=outcome, **_usage(result))
+    except Exception as e:
+        row.update(outcome=f"error: {type(e).__name__}: {e}", llm_calls=0, tokens=0)
+    row["latency_s"] = round(time.monotonic() - start, 2)
+    if TRACE:
+        # this run's counters only; the parent merges them across workers
+        row["metrics"] = METRICS.snapshot(reset=True)
+    return row
+
+def split_llm_budget(workers: int, runs: int, llm_concurrency: int) -> Tuple[int, int]:
+    """(workers, in-flight LLM requests per worker) that never add up to more than
+    `llm_concurrency`; a worker needs at least one, so there are never more workers."""
+    if llm_concurrency < 1:
+        raise ValueError(f"llm_concurrency must be at least 1, got {llm_concurrency}")
+    workers = max(1, min(workers, runs, llm_concurrency))
+    return workers, llm_concurrency // workers
+
+def run_batch(blueprints: List[str], prompts: str, workers: int = 4, llm_concurrency: int = 8,
+              base_dir: str = "run_artifacts", **opts) -> List[Dict[str, Any]]:
+    """Run many blueprints on a process pool with a shared LLM concurrency budget."""
+    from .runtime import llm
+    from .runtime.tracing import Metrics
+    asked = workers
+    workers, in_flight = split_llm_budget(workers, len(blueprints), llm_concurrency)
+    if workers < min(asked, len(blueprints)):
+        io.log(f"batch: {workers} worker(s) instead of {asked}, one per LLM request allowed in flight")
+    share = (in_flight, llm.RPM / workers, llm.TPM / workers)
+    rows, metrics = [], None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=share) as pool:
+        futs = {pool.submit(_run_one, bp, prompts, base_dir, opts): bp for bp in blueprints}
+        for fut in as_completed(futs):
+            row = fut.result()
+            if "metrics" in row:
+                metrics = metrics or Metrics()
+                metrics.merge(row.pop("metrics"))
+            status = "FAILED" if row["outcome"].startswith("error") else row["outcome"].split(":")[0]
+            io.log(f"batch: {status} {row['blueprint']} in {row['latency_s']}s")
+            rows.append(row)
+    if metrics is not None:
+        metrics.write(os.getenv("AGENT_METRICS_FILE") or pathlib.Path(base_dir) / "metrics.prom")
+    order = {bp: i for i, bp in enumerate(blueprints)}
+    return sorted(rows, key=lambda r: order[r["blueprint"]])
+
+def format_table(rows: List[Dict[str, Any]]) -> str:
+    return io.format_table(rows, ("blueprint", "run_id", "outcome", "latency_s", "llm_calls", "tokens"))
+
+def write_summary(rows: List[Dict[str, Any]], path: str):
+    p = pathlib.Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    total = {"runs": len(rows), "ok": sum(r["outcome"] == "ok" for r in rows),
+             "waiting": sum(r["outcome"].startswith("waiting") for r in rows),
+             "halted": sum(r["outcome"].startswith("halted") for r in rows),
+             "tokens": sum(r["tokens"] for r in rows), "llm_calls": sum(r["llm_calls"] for r in rows)}
+    p.write_text(json.dumps({"total": total, "runs": rows}, indent=2), encoding="utf-8")
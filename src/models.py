@@ -1,29 +1,84 @@
-from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Union
+from pydantic import BaseModel, Field, model_validator
+
+def _check_deps(kind: str, deps: Dict[str, List[str]]):
+    # reject unknown ids and cycles so the scheduler never deadlocks
+    for k, ds in deps.items():
+        for d in ds:
+            if d not in deps:
+                raise ValueError(f"{kind} '{k}' depends on unknown {kind} '{d}'")
+    # iterative DFS: generated blueprints can chain thousands of ids
+    done, visiting = set(), set()
+    for root in deps:
+        if root in done:
+            continue
+        visiting.add(root)
+        stack = [(root, iter(deps[root]))]
+        while stack:
+            k, it = stack[-1]
+            for d in it:
+                if d in visiting:
+                    raise ValueError(f"{kind} dependency cycle through '{d}'")
+                if d not in done:
+                    visiting.add(d)
+                    stack.append((d, iter(deps[d])))
+                    break
+            else:
+                stack.pop()
+                visiting.discard(k)
+                done.add(k)
 
 class Task(BaseModel):
     id: str
     tool_calls: List[str] = []
+    depends_on: List[str] = []
 
 class Gate(BaseModel):
     type: Optional[str] = None
     approver: Optional[str] = None
     tools: List[str] = []
 
+class Budget(BaseModel):
+    tokens: Optional[int] = None
+    cost_usd: Optional[float] = None
+    max_output_tokens: Optional[int] = None
+    # project level: switch to this model once less than `reserve` of the budget is left
+    fallback_model: Optional[str] = None
+    reserve: float = 0.2
+
+class Transition(BaseModel):
+    to: str
+    # times this edge may be taken in one run (rework loops default to AGENT_MAX_LOOPS)
+    limit: Optional[int] = None
+
 class Phase(BaseModel):
     id: str
     entry_prompt: str
+    model: Optional[str] = None
+    budget: Optional[Budget] = None
     outputs: List[str] = []
     tasks: List[Task] = []
     gate: Optional[Gate] = None
-    transitions: Dict[str, str] = {}
+    transitions: Dict[str, Union[str, Transition]] = {}
+    depends_on: List[str] = []
+
+    @model_validator(mode="after")
+    def _tasks_acyclic(self):
+        _check_deps("task", {t.id: t.depends_on for t in self.tasks})
+        return self
 
 class Project(BaseModel):
     id: str
     goal: str
     context: Dict[str, Any] = {}
+    budget: Optional[Budget] = None
 
 class Blueprint(BaseModel):
     version: int = Field(1)
     project: Project
     phases: List[Phase]
+
+    @model_validator(mode="after")
+    def _phases_acyclic(self):
+        _check_deps("phase", {p.id: p.depends_on for p in self.phases})
+        return self
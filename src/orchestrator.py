@@ -1,204 +1,613 @@
-import os, json, yaml, time
-import openai
-from typing import TypedDict, Literal, Dict, Any
-from langgraph.graph import StateGraph, START, END
-from openai import OpenAI
-import os
-from .runtime import io
-from .tools import tool_stubs
+import os, json, threading, contextvars
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TypedDict, Literal, Dict, Any, Annotated, Callable, List
+from langgraph.channels.delta import DeltaChannel
+from langgraph.graph import StateGraph, START
+from langgraph.runtime import Runtime
+from langgraph.types import Command, interrupt
+from .runtime import artifacts, incremental, io, llm, prompts as prompt_templates
+from .runtime.artifacts import ArtifactStore, read_file
+from .runtime.budget import BudgetLedger, PhasePlan
+from .runtime.incremental import PhaseIndex, PhaseRecord
+from .runtime.prompts import Prompt, PromptError, PromptTemplate, compile_prompts
+from .runtime.routing import RouteTable
+from .runtime.cache import ResponseCache, cache_key, state_fingerprint
+from .runtime.state_context import StateContext
+from .runtime.tracing import METRICS, Tracer
+from .runtime.checkpoint import IdempotencyLedger, idempotency_key, new_run_id, shared_checkpointer, shared_ledger
+from .runtime.loader import load_blueprint, load_prompts
+from .runtime.llm import _get_openai_client, _get_async_openai_client  # noqa: F401  (re-exported)
 from .tools.github_api import GitHub
-from .tools import deploy
-from .models import Blueprint, Phase
+from .tools.registry import ToolCall, ToolSpecError, parse_call, validate_tools
+from .models import Blueprint, Phase, Task
 
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-_openai_client = None
+MAX_CONCURRENCY = int(os.getenv("AGENT_MAX_CONCURRENCY", "4"))
+GRAPH_CACHE_SIZE = int(os.getenv("AGENT_GRAPH_CACHE_SIZE", "32"))
+TRACE = os.getenv("AGENT_TRACE", "1").lower() not in ("0", "false", "no", "off")
+# batch workers hand their counters to the parent, which writes one merged file
+WRITE_METRICS = True
 
-def _get_openai_client() -> OpenAI:
-    global _openai_client
-    if _openai_client is None:
-        _openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    return _openai_client
+def _merge(left: Dict | None, right: Dict | None) -> Dict:
+    # parallel branches write disjoint keys; LangGraph applies writes in a fixed task order
+    return {**(left or {}), **(right or {})}
+
+def _merge_all(left: Dict | None, writes: List[Dict | None]) -> Dict:
+    # batch form of _merge for delta channels
+    out = dict(left or {})
+    for w in writes:
+        out.update(w or {})
+    return out
+
+def _last(left, right):
+    return right
 
 class ProjectState(TypedDict, total=False):
-    phase: str
-    ctx: Dict[str, Any]
-    artifacts: Dict[str, str]
-    approvals: Dict[str, bool]
-    last_event: str
-
-def run_prompt(role_prompt: str, state: ProjectState) -> str:
-    """Call OpenAI Responses API with plain text output."""
-    sys = f"You are a helpful project {state.get('phase','agent')}."
-    user = f"{role_prompt}\n\nSTATE:\n{json.dumps(state, indent=2)[:6000]}"
-    io.log(f"LLM ({MODEL}) <- {state.get('phase')}")
+    phase: Annotated[str, _last]
+    ctx: Annotated[Dict[str, Any], _merge]
+    artifacts: Annotated[Dict[str, str], DeltaChannel(_merge_all)]
+    approvals: Annotated[Dict[str, bool], _merge]
+    events: Annotated[Dict[str, str], DeltaChannel(_merge_all)]
+    last_event: Annotated[str, _last]
+    metrics: Annotated[Dict[str, Dict[str, Any]], DeltaChannel(_merge_all)]
+    gates: Annotated[Dict[str, Dict[str, Any]], DeltaChannel(_merge_all)]
+    loops: Annotated[Dict[str, int], DeltaChannel(_merge_all)]
+    halted: Annotated[str, _last]
+
+@dataclass
+class RunContext:
+    """Per-run settings handed to every node via LangGraph's runtime context."""
+    max_concurrency: int = MAX_CONCURRENCY
+    cache: ResponseCache = field(default_factory=lambda: ResponseCache(mode="off"))
+    run_id: str = ""
+    ledger: IdempotencyLedger | None = None
+    state_context: StateContext = field(default_factory=StateContext)
+    stream: bool = False
+    progress: Callable[[str, str], None] | None = io.progress
+    on_phase: Callable[[str], None] | None = None
+    tracer: Tracer = field(default_factory=lambda: Tracer("local"))
+    artifacts: ArtifactStore = field(default_factory=lambda: ArtifactStore("local"))
+    budget: BudgetLedger | None = None
+    phases: PhaseIndex | None = None
+    incremental: bool = False
+    _github: GitHub | None = field(default=None, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def github(self) -> GitHub:
+        """One client per run, so branch/default-branch lookups are cached across tool calls."""
+        with self._lock:
+            if self._github is None:
+                self._github = GitHub()
+            return self._github
+
+def run_prompt(role_prompt: str | Prompt, state: ProjectState, cache: ResponseCache | None = None,
+               context: StateContext | None = None, on_delta: Callable[[str], None] | None = None,
+               stats: Dict[str, Any] | None = None, tracer: Tracer | None = None,
+               plan: PhasePlan | None = None) -> str:
+    """Call OpenAI Responses API with plain text output.
+
+    With `on_delta` the output is streamed to it (cached/offline output is
+    passed in one piece); `stats` is filled with usage and timing, and each
+    API attempt is recorded as an `llm.attempt` span on `tracer`. A budget
+    `plan` picks the model, the context size and the output token cap.
+    Graph nodes pass the phase's compiled `Prompt`; a plain role prompt is
+    built into one here.
+    """
+    model = plan.model if plan else MODEL
+    prompt = role_prompt if isinstance(role_prompt, Prompt) else prompt_templates.build(role_prompt, state.get("phase", "agent"))
+    context = context or StateContext()
+    stats = {} if stats is None else stats
+    stats["model"] = model
+    io.log(f"LLM ({model}) <- {state.get('phase')}")
     if os.getenv("OPENAI_OFFLINE", "").lower() in ("1", "true", "yes"):
-        return f"[OFFLINE MOCK OUTPUT] phase={state.get('phase')}\n\n{role_prompt[:200]}..."
-    client = _get_openai_client()
-    last_err = None
-    for attempt in range(3):
+        text = f"[OFFLINE MOCK OUTPUT] phase={state.get('phase')}\n\n{prompt.instructions[:200]}..."
+        stats["source"] = "offline"
+        if on_delta:
+            on_delta(text)
+        return text
+    key = None
+    if cache is not None and cache.mode != "off":
+        key = cache_key(model, prompt.system, prompt.instructions, state_fingerprint(state))
+        hit = cache.get(key)
+        if hit is not None:
+            io.log(f"LLM cache hit <- {state.get('phase')}")
+            METRICS.inc("agent_llm_cache_hits_total", model=model)
+            stats["source"] = "cache"
+            if on_delta:
+                on_delta(hit)
+            return hit
+    extra = {"max_output_tokens": plan.max_output_tokens} if plan and plan.max_output_tokens else {}
+    # fixed prefix first, state last: repeated calls for a phase hit the provider's prompt cache
+    messages = prompt.messages(context.render(state, plan.context_tokens if plan else None))
+    try:
+        res = llm.get_engine().complete(model, messages, on_delta=on_delta, prompt_cache_key=prompt.key, **extra)
+    except Exception as e:
+        _trace_attempts(tracer, state.get("phase"), model, getattr(e, "llm_trace", []), {})
+        METRICS.inc("agent_llm_requests_total", model=model, status="error")
+        raise
+    _trace_attempts(tracer, state.get("phase"), res.model, res.trace, res.usage)
+    METRICS.inc("agent_llm_requests_total", model=res.model, status="ok")
+    cached = llm.cached_tokens(res.usage)
+    for kind in ("input_tokens", "output_tokens"):
+        METRICS.inc("agent_llm_tokens_total", res.usage.get(kind) or 0, model=res.model, kind=kind.split("_")[0])
+    METRICS.inc("agent_llm_tokens_total", cached, model=res.model, kind="cached")
+    stats.update(source="llm", model=res.model, latency=round(res.latency, 3), attempts=res.attempts,
+                 usage=res.usage, cached_tokens=cached)
+    if res.ttft is not None:
+        stats["ttft"] = round(res.ttft, 3)
+    if res.tokens_per_sec is not None:
+        stats["tokens_per_sec"] = round(res.tokens_per_sec, 1)
+    if key is not None:
+        cache.put(key, model, res.text)
+    return res.text
+
+
+def _trace_attempts(tracer: Tracer | None, phase: str | None, model: str,
+                    attempts: List[Dict[str, Any]], usage: Dict[str, Any]):
+    # attempts were timed on the engine loop thread; usage belongs to the last one
+    if tracer is None:
+        return
+    for i, a in enumerate(attempts):
+        last = i == len(attempts) - 1
+        if a["error"] and not last:
+            METRICS.inc("agent_llm_retries_total", model=model)
+        tracer.record("llm.attempt", a["start"], a.get("end", a["start"]), a["error"], phase=phase, model=model,
+                      attempt=i + 1, wait_s=a["wait"],
+                      input_tokens=usage.get("input_tokens") if last else None,
+                      output_tokens=usage.get("output_tokens") if last else None,
+                      cached_tokens=llm.cached_tokens(usage) if last else None)
+
+def call_tool(spec: str | ToolCall, state: ProjectState | None = None, ctx: RunContext | None = None):
+    """Dispatch a tool call; strings are parsed on the fly, graphs pass prepared calls."""
+    call = spec if isinstance(spec, ToolCall) else parse_call(spec)
+    if ctx is None:
+        return call(state, ctx)
+    status = "error"
+    try:
+        with ctx.tracer.span("tool", phase=(state or {}).get("phase"), tool=call.tool.name, spec=call.spec):
+            result = call(state, ctx)
+        status = "ok"
+        return result
+    finally:
+        METRICS.inc("agent_tool_calls_total", tool=call.tool.name, status=status)
+
+def _task_waves(tasks: List[Task]) -> List[List[Task]]:
+    # group tasks into waves whose dependencies all finished in earlier waves
+    waves, done, pending = [], set(), list(tasks)
+    while pending:
+        wave = [t for t in pending if all(d in done for d in t.depends_on)]
+        waves.append(wave)
+        done.update(t.id for t in wave)
+        pending = [t for t in pending if t.id not in done]
+    return waves
+
+def _call_once(call: ToolCall, state: ProjectState, ctx: RunContext, task_id: str):
+    # tools with external side effects are recorded per run so a resumed phase skips them
+    if ctx.ledger is None or not call.tool.side_effects:
+        return call_tool(call, state, ctx)
+    # loop traversals so far: a phase re-entered by a rework transition runs its tools again,
+    # while a resume restores the same counters from the checkpoint and replays nothing
+    visit = sum((state.get("loops") or {}).values())
+    key = idempotency_key(ctx.run_id, state.get("phase", ""), task_id, call.spec, visit)
+    done, result = ctx.ledger.get(key)
+    if done:
+        io.log(f"skip (already done in {ctx.run_id}): {call.spec}")
+        return result
+    result = call_tool(call, state, ctx)
+    ctx.ledger.put(key, ctx.run_id, call.spec, result)
+    return result
+
+def run_tasks(tasks: List[Task], state: ProjectState, ctx: RunContext,
+              calls: Dict[str, List[ToolCall]] | None = None) -> Dict[str, list]:
+    """Run task tool calls, overlapping independent tasks on a bounded pool."""
+    if calls is None:
+        calls = {t.id: [parse_call(s) for s in t.tool_calls] for t in tasks}
+    def run(t: Task):
+        results = []
+        for c in calls[t.id]:
+            result = _call_once(c, state, ctx, t.id)
+            # tools report red CI and the like as a status; for a task that is a failure
+            if _check_status(result) == "fail":
+                detail = "\n".join(result.get("output") or [])
+                raise RuntimeError(f"task {t.id}: {c.spec} reported {result['status']}" + (f":\n{detail}" if detail else ""))
+            results.append(result)
+        return results
+    results = {}
+    for wave in _task_waves(tasks):
+        if ctx.max_concurrency <= 1 or len(wave) == 1:
+            outs = [run(t) for t in wave]
+        else:
+            # each task gets a copy of the caller's context so its spans nest under the phase
+            with ThreadPoolExecutor(max_workers=min(ctx.max_concurrency, len(wave))) as pool:
+                futs = [pool.submit(contextvars.copy_context().run, run, t) for t in wave]
+                outs = [f.result() for f in futs]
+        results.update(zip((t.id for t in wave), outs))
+    return results
+
+def _stream_prompt(role_prompt: str | Prompt, state: ProjectState, ctx: RunContext, name: str,
+                   stats: Dict[str, Any], plan: PhasePlan | None = None) -> str:
+    # deltas land in the artifact file as they arrive; keep what we got if interrupted
+    sink = io.ArtifactStream(name, ctx.artifacts)
+    def on_delta(delta: str):
+        sink.write(delta)
+        if ctx.progress:
+            ctx.progress(state.get("phase", ""), delta)
+    try:
+        run_prompt(role_prompt, state, ctx.cache, ctx.state_context, on_delta=on_delta, stats=stats,
+                   tracer=ctx.tracer, plan=plan)
+    except BaseException:
+        io.log(f"partial artifact kept -> {sink.abort()}")
+        raise
+    path = sink.close()
+    if "ttft" in stats:
+        io.log(f"{state.get('phase')}: ttft {stats['ttft']}s, {stats.get('tokens_per_sec', '?')} tok/s")
+    return path
+
+def _reuse_phase(phase: Phase, inputs: Dict[str, str], upstream: Dict[str, str], ctx: RunContext,
+                 project_id: str) -> ProjectState | None:
+    rec = ctx.phases.get(project_id, phase.id)
+    reason = incremental.stale_reason(rec, inputs, upstream)
+    if reason is not None:
+        io.log(f"{phase.id}: running ({reason})")
+        return None
+    update: ProjectState = {"metrics": {phase.id: {"source": "reused", "from_run": rec.run_id}}}
+    if rec.event:
+        # gated phases get their event from the gate node, which always runs
+        update.update(events={phase.id: rec.event}, last_event=rec.event)
+    path = None
+    if rec.artifact:
+        # into this run's directory; the store hard-links the existing blob
+        path = ctx.artifacts.put(f"{phase.id}.md", read_file(rec.artifact))
+        ctx.artifacts.wait([path])
+        update["artifacts"] = {phase.id: path}
+    ctx.phases.put(project_id, phase.id, PhaseRecord(inputs, upstream, rec.output, path, rec.event, ctx.run_id))
+    io.log(f"{phase.id}: unchanged since run {rec.run_id}, skipped")
+    return update
+
+FAILED = ("red", "fail", "failed", "failure", "error")
+PENDING = ("pending", "queued", "in_progress", "running")
+
+def _check_status(result: Any) -> str:
+    status = str(result.get("status", "")).lower() if isinstance(result, dict) else ""
+    return "fail" if status in FAILED else "pending" if status in PENDING else "pass"
+
+def run_checks(calls: List[ToolCall], state: ProjectState, ctx: RunContext) -> Dict[str, Any]:
+    """Run a gate's check tools side by side: it fails if any check fails or raises, and is
+    pending while any check reports a pending status (e.g. CI still running)."""
+    def check(call: ToolCall) -> Dict[str, Any]:
         try:
-            res = client.responses.create(
-                model=MODEL,
-                input=[
-                    {"role": "system", "content": sys},
-                    {"role": "user", "content": user},
-                ],
-            )
-            break
-        except openai.RateLimitError as e:
-            wait = 2 ** attempt
-            io.log(f"Rate limited (429). Retry in {wait}s...")
-            time.sleep(wait)
-            last_err = e
+            result = _call_once(call, state, ctx, "gate")
         except Exception as e:
-            raise
+            io.log(f"{state.get('phase')}: check failed: {call.spec}: {e}")
+            return {"status": "fail", "error": f"{type(e).__name__}: {e}"}
+        # results go into the checkpoint
+        return {"status": _check_status(result), "result": json.loads(json.dumps(result, default=str))}
+    if ctx.max_concurrency <= 1 or len(calls) <= 1:
+        outs = [check(c) for c in calls]
     else:
-        raise last_err
-    # Extract the first text output
-    text = ""
-    for item in res.output:
-        if item.type == "message":
-            for content in item.message.content:
-                if content.type == "output_text":
-                    text += content.text
-    return text.strip()
-
-
-def _parse_args(argstr: str):
-    # format: "k1=v1|k2=v2|bare"
-    out = {}
-    if not argstr:
-        return out
-    parts = [p for p in (a.strip() for a in argstr.split("|")) if p]
-    for p in parts:
-        if "=" in p:
-            k, v = p.split("=", 1)
-            out[k.strip()] = v.strip()
-        else:
-            out[p] = True
-    return out
+        with ThreadPoolExecutor(max_workers=min(ctx.max_concurrency, len(calls))) as pool:
+            outs = list(pool.map(lambda c: contextvars.copy_context().run(check, c), calls))
+    statuses = {o["status"] for o in outs}
+    status = "fail" if "fail" in statuses else "pending" if "pending" in statuses else "pass"
+    return {"status": status, "checks": dict(zip((c.spec for c in calls), outs))}
 
+def _decision(value: Any) -> bool:
+    # resume values from the CLI, the service webhook or Command(resume=...)
+    if isinstance(value, dict):
+        value = value.get("approved", value.get("status"))
+    if isinstance(value, str):
+        return value.lower() in ("1", "true", "yes", "approved", "approve", "pass", "green", "success")
+    return bool(value)
 
-def call_tool(spec: str, state: ProjectState | None = None):
-    if ":" in spec:
-        fn, arg = spec.split(":", 1)
-    else:
-        fn, arg = spec, None
-    # --- Built-in stubs (still available)
-    if fn == "doc.create":
-        return tool_stubs.doc_create(arg or "note.md")
-    if fn == "ci.run_tests":
-        return tool_stubs.ci_run_tests()
-    if fn == "lighthouse.audit":
-        return tool_stubs.lighthouse_audit()
-    # --- GitHub tools (require env: GITHUB_TOKEN, GITHUB_OWNER, GITHUB_REPO)
-    if fn.startswith("github."):
-        gh = GitHub()
-        a = _parse_args(arg or "")
-        if fn == "github.create_issue":
-            return gh.create_issue(title=a.get("title") or "Task", body=a.get("body",""))
-        if fn == "github.create_branch":
-            return gh.create_branch(new_branch=a.get("name","feature"), from_branch=a.get("from","main"))
-        if fn == "github.commit_artifact":
-            # commit the artifact produced by a phase into repo at path
-            phase = a.get("phase")
-            path  = a.get("path", f"{phase or 'artifact'}.md")
-            branch = a.get("branch", "feature")
-            msg = a.get("message", f"chore: add artifact {phase}")
-            if not state or not phase or phase not in state.get("artifacts", {}):
-                raise RuntimeError("github.commit_artifact needs phase=<id> and an existing artifact in state")
-            artifact_path = state["artifacts"][phase]
-            content = open(artifact_path, "r", encoding="utf-8").read()
-            return gh.commit_file(path, content, msg, branch)
-        if fn == "github.open_pr":
-            title = a.get("title", "Automated PR")
-            head  = a.get("head", "feature")
-            base  = a.get("base", "main")
-            body  = a.get("body","")
-            return gh.create_pr(title=title, head=head, base=base, body=body)
-    # --- Deploy tools
-    if fn == "deploy.vercel":
-        return deploy.vercel_deploy()
-    # Fallback
-    io.log(f"Unknown tool: {spec}")
-    return None
-
-def build_nodes(prompts: Dict[str, str]):
+def gate_node_id(phase_id: str) -> str:
+    return f"{phase_id}.gate"
+
+class RoutingError(ValueError):
+    pass
+
+def _route(routes: RouteTable | None, phase_id: str, state: ProjectState, update: ProjectState):
+    """The phase's last node picks its successor: one table lookup, the loop counter goes
+    into the same checkpointed update."""
+    if routes is None:
+        return update
+    route, halted = routes.next(phase_id, (update.get("events") or {}).get(phase_id), state.get("loops") or {})
+    if halted:
+        io.log(f"{phase_id}: {halted}; halting")
+        update["halted"] = f"{phase_id}: {halted}"
+        METRICS.inc("agent_loop_halts_total")
+    if route is None:
+        return update
+    if route.limit is not None:
+        update["loops"] = {route.key: (state.get("loops") or {}).get(route.key, 0) + 1}
+    return Command(update=update, goto=route.target)
+
+class _Node:
+    # LangGraph disassembles plain function nodes at compile time looking for subgraphs
+    # (milliseconds per node); a callable object skips that, and ours never nest graphs
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __call__(self, state: ProjectState, runtime: Runtime[RunContext]):
+        return self.fn(state, runtime)
+
+def build_gate(phase: Phase, routes: RouteTable | None = None):
+    """Node that turns a phase's gate into its event, pausing the run until a decision arrives.
+
+    A missing approval or pending checks raise a LangGraph interrupt: the run is
+    checkpointed and `invoke` returns, so nothing waits in-process. Resuming with
+    `Command(resume=...)` re-enters this node, and `interrupt` returns the decision.
+    """
+    gate = phase.gate
+    def node(state: ProjectState, runtime: Runtime[RunContext]):
+        ctx = runtime.context or RunContext()
+        update: ProjectState = {"phase": phase.id}
+        waited = False
+        if gate.type == "human_approval":
+            approver = gate.approver or "PM"
+            # approvals given up front (run --approve) stand; otherwise every visit asks again
+            approved = (state.get("approvals") or {}).get(approver)
+            if approved is None:
+                io.log(f"{phase.id}: waiting for approval from {approver}")
+                approved = _decision(interrupt({"phase": phase.id, "gate": "human_approval", "approver": approver}))
+                waited = True
+            event = "approved" if approved else "rejected"
+            update["gates"] = {phase.id: {"status": event, "approver": approver}}
+        elif gate.tools or gate.type == "automated_checks":
+            checks = (state.get("gates") or {}).get(phase.id) or {"status": "pass", "checks": {}}
+            event = checks["status"]
+            if event == "pending":
+                pending = [spec for spec, c in checks["checks"].items() if c["status"] == "pending"]
+                io.log(f"{phase.id}: waiting for checks: {', '.join(pending)}")
+                event = "pass" if _decision(interrupt({"phase": phase.id, "gate": "automated_checks",
+                                                       "pending": pending})) else "fail"
+                update["gates"] = {phase.id: {**checks, "status": event}}
+                waited = True
+        else:
+            event = "complete"
+        with ctx.tracer.span("gate", phase=phase.id, run_id=ctx.run_id, type=gate.type, event=event, waited=waited):
+            METRICS.inc("agent_gate_events_total", type=gate.type, event=event)
+        io.log(f"{phase.id}: gate -> {event}")
+        update["events"] = {phase.id: event}
+        update["last_event"] = event
+        return _route(routes, phase.id, state, update)
+    return _Node(node)
+
+def build_nodes(prompts: Dict[str, PromptTemplate | str], project=None, routes: RouteTable | None = None):
     def n_factory(phase: Phase):
-        def node(state: ProjectState):
-            state["phase"] = phase.id
-            # 1) entry prompt
-            role_prompt = prompts.get(phase.entry_prompt, "")
-            if role_prompt:
-                out = run_prompt(role_prompt, state)
-                name = f"{phase.id}.md"
-                path = io.write_artifact(name, out)
-                state.setdefault("artifacts", {})[phase.id] = path
-                io.log(f"artifact -> {path}")
-            # 2) tasks tools
-            for t in phase.tasks:
-                for spec in t.tool_calls:
-                    call_tool(spec)
-            # 3) naive gating
-            if phase.gate and phase.gate.type == "human_approval":
-                approved = state.get("approvals", {}).get(phase.gate.approver or "PM", True)
-                state["last_event"] = "approved" if approved else "rejected"
-            elif phase.gate and phase.gate.type == "automated_checks":
-                state["last_event"] = "pass"
-            else:
-                state["last_event"] = "complete"
-            return state
-        return node
+        # parsed and rendered once per compile; the node only dispatches
+        calls = {t.id: [parse_call(s) for s in t.tool_calls] for t in phase.tasks}
+        gate_calls = [parse_call(s) for s in phase.gate.tools] if phase.gate else []
+        template = prompts.get(phase.entry_prompt)
+        role_prompt = (template.source if isinstance(template, PromptTemplate) else template) or ""
+        prompt = prompt_templates.build(template, phase.id, project) if role_prompt else None
+        def node(state: ProjectState, runtime: Runtime[RunContext]):
+            ctx = runtime.context or RunContext()
+            if ctx.on_phase:
+                ctx.on_phase(phase.id)
+            with ctx.tracer.span("phase", phase=phase.id, run_id=ctx.run_id) as span:
+                state = {**state, "phase": phase.id}
+                update: ProjectState = {"phase": phase.id}
+                # 0) skip the phase when nothing it reads changed since it last ran
+                fingerprint = None
+                if ctx.phases is not None and project is not None:
+                    fingerprint = (
+                        incremental.phase_inputs(phase, role_prompt, project, phase.model or MODEL,
+                                                 state.get("approvals")),
+                        ctx.phases.upstream(state.get("artifacts"), phase.id, ctx.artifacts.read))
+                    reused = _reuse_phase(phase, *fingerprint, ctx, project.id) if ctx.incremental else None
+                    if reused is not None:
+                        update.update(reused)
+                        span.set(source="reused", event=reused.get("last_event"))
+                        if gate_calls:
+                            # checks observe the outside world; they run even when the phase is reused
+                            update["gates"] = {phase.id: run_checks(gate_calls, state, ctx)}
+                        return _route(routes, phase.id, state, update) if phase.gate is None else update
+                # 1) entry prompt
+                if role_prompt:
+                    name = f"{phase.id}.md"
+                    stats: Dict[str, Any] = {}
+                    plan = ctx.budget.plan(phase, prompt.text) if ctx.budget else None
+                    if ctx.stream:
+                        path = _stream_prompt(prompt, state, ctx, name, stats, plan)
+                    else:
+                        out = run_prompt(prompt, state, ctx.cache, ctx.state_context, stats=stats,
+                                         tracer=ctx.tracer, plan=plan)
+                        path = ctx.artifacts.put(name, out)
+                    if plan:
+                        stats.setdefault("model", plan.model)
+                        row = ctx.budget.record(phase.id, stats["model"], stats.get("usage"))
+                        stats["cost_usd"] = row["cost_usd"]
+                        METRICS.inc("agent_llm_cost_usd_total", row["cost_usd"], model=stats["model"])
+                        warning = ctx.budget.check_phase(phase)
+                        if warning:
+                            io.log(f"over budget: {warning}")
+                    size = len(ctx.artifacts.read(path).encode("utf-8"))
+                    span.set(bytes=size, source=stats.get("source"), model=stats.get("model"),
+                             cost_usd=stats.get("cost_usd"), cached_tokens=stats.get("cached_tokens"))
+                    METRICS.inc("agent_artifact_bytes_total", size)
+                    update["artifacts"] = {phase.id: path}
+                    update["metrics"] = {phase.id: stats}
+                    state["artifacts"] = _merge(state.get("artifacts"), update["artifacts"])
+                    io.log(f"artifact -> {path}")
+                # 2) tasks tools
+                run_tasks(phase.tasks, state, ctx, calls)
+                # the artifact was written while tasks ran; it must be on disk before the checkpoint
+                if role_prompt:
+                    ctx.artifacts.wait([path])
+                # 3) gate checks run here; the decision is the gate node's
+                event = ""
+                if gate_calls:
+                    update["gates"] = {phase.id: run_checks(gate_calls, state, ctx)}
+                    span.set(checks=update["gates"][phase.id]["status"])
+                elif phase.gate is None:
+                    event = "complete"
+                    update["events"] = {phase.id: event}
+                    update["last_event"] = event
+                    span.set(event=event)
+                if fingerprint is not None:
+                    output = ctx.phases.digest(path, ctx.artifacts.read) if role_prompt else ""
+                    ctx.phases.put(project.id, phase.id, PhaseRecord(*fingerprint, output, path if role_prompt else None,
+                                                                     event, ctx.run_id))
+                return _route(routes, phase.id, state, update) if phase.gate is None else update
+        return _Node(node)
     return n_factory
 
-def compile_graph(bp: Blueprint, prompts: Dict[str,str]):
-    builder = StateGraph(ProjectState)
-    nodes = {}
-    make = build_nodes(prompts)
-    # add nodes
+def compile_graph(bp: Blueprint, prompts: Dict[str,str], checkpointer=None):
+    errors = validate_tools(bp)
+    if errors:
+        raise ToolSpecError("invalid tool calls:\n  " + "\n  ".join(errors))
+    templates, errors = compile_prompts(prompts)
+    if errors:
+        raise PromptError("invalid prompts:\n  " + "\n  ".join(errors))
+    routes = RouteTable(bp)
+    if routes.errors:
+        raise RoutingError("invalid transitions:\n  " + "\n  ".join(routes.errors))
+    builder = StateGraph(ProjectState, context_schema=RunContext)
+    make = build_nodes(templates, bp.project, routes)
+    # a gated phase is two nodes; what follows the phase follows its gate
+    tail = {}
     for ph in bp.phases:
-        fn = make(ph)
-        nodes[ph.id] = fn
-        builder.add_node(ph.id, fn)
-    # add edges
+        # transitions are taken with Command(goto=...) from the phase's last node
+        goto = routes.targets(ph.id)
+        if ph.gate:
+            tail[ph.id] = gate_node_id(ph.id)
+            builder.add_node(ph.id, make(ph))
+            builder.add_node(tail[ph.id], build_gate(ph, routes), destinations=goto)
+            builder.add_edge(ph.id, tail[ph.id])
+        else:
+            tail[ph.id] = ph.id
+            builder.add_node(ph.id, make(ph), destinations=goto)
     if bp.phases:
         builder.add_edge(START, bp.phases[0].id)
-    # simple transitions based on 'transitions' map
+    # fan-out/fan-in: a phase starts once every phase it depends on has finished
     for ph in bp.phases:
-        dest = ph.transitions or {}
-        # normalize special terminal aliases to END
-        def _norm_target(t):
-            if isinstance(t, str) and t.lower() in ("done", "end", "finish"):
-                return END
-            return t
-        dest2 = {k: _norm_target(v) for k, v in dest.items()}
-        # map keys -> events
-        targets = set(dest2.values())
-        if not targets:
-            continue
-        # we’ll pick the first unique target as default
-        default = list(targets)[0]
-        def route(state: ProjectState, ph=ph, dest=dest2, default=default):
-            ev = state.get("last_event","")
-            # normalize keys
-            key = None
-            if ev in ("complete","approved","pass"):
-                key = {"complete":"on_complete","approved":"on_approved","pass":"on_pass"}[ev]
-            # fallback
-            return dest.get(key, default)
-        # build choices map
-        choices = {v:v for v in targets}
-        builder.add_conditional_edges(ph.id, route, choices)
-    # end at last
-    builder.add_edge(bp.phases[-1].id, END)
-    return builder.compile()
-
-def run_blueprint(blueprint_path: str, prompts_path: str, approvals: Dict[str,bool] | None = None):
-    bp = Blueprint.model_validate(yaml.safe_load(open(blueprint_path)))
-    prompts = yaml.safe_load(open(prompts_path))
-    graph = compile_graph(bp, prompts)
-    state: ProjectState = {"ctx":{"project_id": bp.project.id}, "artifacts":{}, "approvals": approvals or {"PM": True}}
-    io.log(f"Starting run for {bp.project.id}")
-    result = graph.invoke(state)
+        if ph.depends_on:
+            deps = [tail[d] for d in ph.depends_on]
+            builder.add_edge(deps if len(deps) > 1 else deps[0], ph.id)
+    # one superstep per node on a linear path, again for every allowed loop; the loop
+    # limits, not LangGraph's recursion limit (default 25), are what stop a rework loop
+    nodes = len(bp.phases) + sum(1 for ph in bp.phases if ph.gate)
+    limit = max(25, 2 * nodes * (1 + routes.loop_budget))
+    return builder.compile(checkpointer=checkpointer).with_config(recursion_limit=limit)
+
+_graphs: "OrderedDict[tuple, Any]" = OrderedDict()
+_graphs_lock = threading.Lock()
+
+def get_graph(blueprint_path: str, prompts_path: str, checkpointer=None):
+    """(Blueprint, compiled graph), reusing a cached graph while both files are unchanged."""
+    bp_sha, bp = load_blueprint(blueprint_path)
+    prompts_sha, prompts = load_prompts(prompts_path)
+    key = (bp_sha, prompts_sha, id(checkpointer))
+    with _graphs_lock:
+        graph = _graphs.get(key)
+        if graph is not None:
+            _graphs.move_to_end(key)
+            return bp, graph
+    graph = compile_graph(bp, prompts, checkpointer=checkpointer)
+    with _graphs_lock:
+        _graphs[key] = graph
+        while len(_graphs) > GRAPH_CACHE_SIZE:
+            _graphs.popitem(last=False)
+    return bp, graph
+
+def _resume_config(graph, run_id: str, from_phase: str | None):
+    config = {"configurable": {"thread_id": run_id}}
+    if not graph.get_state(config).values:
+        raise RuntimeError(f"No checkpoints found for run {run_id}")
+    if not from_phase:
+        return config
+    # newest checkpoint at which from_phase was about to run
+    for snap in graph.get_state_history(config):
+        if from_phase in snap.next:
+            return snap.config
+    raise RuntimeError(f"Run {run_id} never reached phase {from_phase}")
+
+def run_blueprint(blueprint_path: str, prompts_path: str, approvals: Dict[str,bool] | None = None,
+                  max_concurrency: int | None = None, cache: str = "off",
+                  resume: str | None = None, from_phase: str | None = None, stream: bool = False,
+                  run_id: str | None = None, on_phase: Callable[[str], None] | None = None,
+                  incremental: bool = False, decisions: Dict[str, Any] | None = None):
+    """Run (or resume) a blueprint. A run whose gates are waiting returns early with the
+    pending gates under `__interrupt__`; resume it with `decisions` ({phase: approved})."""
+    checkpointer = shared_checkpointer()
+    bp, graph = get_graph(blueprint_path, prompts_path, checkpointer)
+    run_id = resume or run_id or new_run_id(bp.project.id)
+    # io.RUN_DIR is read per run, not at import (batch workers set it to the batch's base
+    # dir); runs share it and the store keeps each run's artifacts in <RUN_DIR>/<run_id>/
+    trace_path = os.getenv("AGENT_TRACE_FILE") or io.RUN_DIR / "traces.jsonl"
+    store = ArtifactStore(run_id)
+    context = StateContext(read=store.read)
+    ctx = RunContext(max_concurrency=max_concurrency or MAX_CONCURRENCY, cache=ResponseCache(mode=cache),
+                     run_id=run_id, ledger=shared_ledger(), state_context=context,
+                     stream=stream, on_phase=on_phase, tracer=Tracer(run_id, trace_path if TRACE else None),
+                     artifacts=store, budget=BudgetLedger(bp, MODEL, context.budget), phases=PhaseIndex(),
+                     incremental=incremental)
+    status = "error"
+    try:
+        if resume:
+            config = _resume_config(graph, run_id, from_phase)
+            # spend before the interruption still counts against the run budget
+            snap = graph.get_state(config)
+            ctx.budget.load(snap.values.get("metrics"))
+            state = None
+            if decisions:
+                waiting = {i.value.get("phase"): i.id for i in snap.interrupts}
+                resume_map = {waiting[p]: v for p, v in decisions.items() if p in waiting}
+                if not resume_map:
+                    raise RuntimeError(f"Run {run_id} is not waiting at {', '.join(decisions)} "
+                                       f"(waiting: {', '.join(waiting) or 'nothing'})")
+                state = Command(resume=resume_map)
+            elif not snap.next:
+                io.log(f"Run {run_id} already finished; nothing to resume.")
+                return snap.values
+            io.log(f"Resuming run {run_id} for {bp.project.id}" + (f" from {from_phase}" if from_phase else ""))
+        else:
+            config = {"configurable": {"thread_id": run_id}}
+            state: ProjectState = {"ctx":{"project_id": bp.project.id}, "artifacts":{}, "approvals": approvals or {}}
+            io.log(f"Starting run {run_id} for {bp.project.id}")
+        with ctx.tracer.span("run", blueprint=blueprint_path, project=bp.project.id, resumed=bool(resume)):
+            result = graph.invoke(state, context=ctx, config={**config, "max_concurrency": ctx.max_concurrency})
+        waiting = pending_gates(result)
+        status = "waiting" if waiting else "halted" if result.get("halted") else "ok"
+    finally:
+        io.log(ctx.budget.summary())
+        if cache != "off":
+            io.log("LLM cache: " + ", ".join(f"{k}={v}" for k, v in ctx.cache.stats().items()))
+        ctx.cache.close()
+        ctx.phases.close()
+        store.close()
+        METRICS.inc("agent_artifact_bytes_stored_total", store.stats["stored_bytes"])
+        if artifacts.KEEP_RUNS or artifacts.MAX_AGE_DAYS:
+            artifacts.gc()
+        METRICS.inc("agent_runs_total", status=status)
+        if TRACE and WRITE_METRICS:
+            METRICS.write(os.getenv("AGENT_METRICS_FILE") or io.RUN_DIR / "metrics.prom")
+    if waiting:
+        for gate in waiting:
+            io.log(f"Run {run_id} waiting at {gate['phase']}: " + (f"approval from {gate['approver']}"
+                   if gate["gate"] == "human_approval" else "checks " + ", ".join(gate.get("pending", []))))
+        io.log(f"Approve with: python -m src.app approve --blueprint {blueprint_path} --run-id {run_id} "
+               f"--phase {waiting[0]['phase']} (or --reject)")
+        return result
+    if result.get("halted"):
+        io.log(f"Run {run_id} halted at {result['halted']}")
+        return result
     io.log("Run complete.")
     return result
+
+def pending_gates(result: Dict[str, Any] | None) -> List[Dict[str, Any]]:
+    """Gates a paused run is waiting on: {"phase", "gate", "approver" | "pending"}."""
+    return [i.value for i in (result or {}).get("__interrupt__", [])]
+
+def dry_run(blueprint_path: str, prompts_path: str, approvals: Dict[str,bool] | None = None):
+    """(phase, runs, reason) per phase: what an incremental run would re-execute."""
+    bp = load_blueprint(blueprint_path)[1]
+    index = PhaseIndex()
+    try:
+        return incremental.plan(bp, load_prompts(prompts_path)[1], index, MODEL, approvals or {})
+    finally:
+        index.close()
@@ -0,0 +1,252 @@
+import os, gzip, time, shutil, hashlib, pathlib, threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from . import io
+
+COMPRESSION = os.getenv("AGENT_ARTIFACT_COMPRESSION", "none").lower()
+CACHE_BYTES = int(float(os.getenv("AGENT_ARTIFACT_CACHE_MB", "64")) * 1024 * 1024)
+KEEP_RUNS = int(os.getenv("AGENT_ARTIFACT_KEEP_RUNS", "0"))
+MAX_AGE_DAYS = float(os.getenv("AGENT_ARTIFACT_MAX_AGE_DAYS", "0"))
+OBJECTS = ".objects"
+# gc leaves younger unlinked blobs alone: another run may have just written one and not linked it yet
+BLOB_MIN_AGE = 600
+
+def _zstd():
+    try:
+        import zstandard
+        return zstandard
+    except ImportError:
+        return None
+
+def _codec(name: str) -> str:
+    if name in ("", "none", "off"):
+        return ""
+    if name == "gzip":
+        return ".gz"
+    if name == "zstd":
+        if _zstd() is None:
+            # optional dependency; keep compressing rather than fail the run
+            io.log("zstandard is not installed; compressing artifacts with gzip")
+            return ".gz"
+        return ".zst"
+    raise ValueError(f"artifact compression must be none, gzip or zstd, got {name!r}")
+
+def _encode(data: bytes, ext: str) -> bytes:
+    if ext == ".gz":
+        return gzip.compress(data, mtime=0)
+    if ext == ".zst":
+        return _zstd().ZstdCompressor(level=3).compress(data)
+    return data
+
+def _encode_file(src: pathlib.Path, dst: pathlib.Path, ext: str) -> int:
+    """_encode for content already on disk, streamed rather than read whole; returns dst's size."""
+    if not ext:
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copyfile(src, dst)
+    elif ext == ".gz":
+        # no file name in the header, so the blob matches gzip.compress(data, mtime=0)
+        with open(src, "rb") as fin, open(dst, "wb") as raw, \
+                gzip.GzipFile(filename="", mode="wb", fileobj=raw, mtime=0) as fout:
+            shutil.copyfileobj(fin, fout)
+    else:
+        with open(src, "rb") as fin, open(dst, "wb") as fout:
+            # with the size, the frame header records it as compress() does
+            _zstd().ZstdCompressor(level=3).copy_stream(fin, fout, size=src.stat().st_size)
+    return dst.stat().st_size
+
+def read_file(path: str | os.PathLike) -> str:
+    """Artifact text from disk, decompressed according to its suffix."""
+    raw = pathlib.Path(path).read_bytes()
+    if str(path).endswith(".gz"):
+        raw = gzip.decompress(raw)
+    elif str(path).endswith(".zst"):
+        raw = _zstd().ZstdDecompressor().decompress(raw)
+    return raw.decode("utf-8")
+
+class ArtifactStore:
+    """Run-scoped, content-addressed artifact files written off the caller's thread.
+
+    Each blob is stored once under `<root>/.objects/` (optionally gzip/zstd
+    compressed) and hard-linked into `<root>/<run_id>/<stem>-<hash><suffix>`,
+    so identical outputs across runs share disk space and names never collide.
+    `put` returns the final path at once; content stays in a bounded in-memory
+    cache, so tools reading an artifact just written do not go back to disk.
+    """
+
+    def __init__(self, run_id: str, root: str | os.PathLike | None = None, compression: str = COMPRESSION,
+                 cache_bytes: int = CACHE_BYTES):
+        self.root = pathlib.Path(root or io.RUN_DIR)
+        self.run_dir = self.root / run_id
+        self.ext = _codec(compression)
+        self.cache_bytes = cache_bytes
+        self.stats = {"writes": 0, "deduped": 0, "bytes": 0, "stored_bytes": 0, "cache_hits": 0, "disk_reads": 0}
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cached = 0
+        self._pending: Dict[str, Future] = {}
+        self._pool: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, text: str):
+        # caller holds the lock
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return
+        self._cache[key] = text
+        self._cached += len(text)
+        self._trim()
+
+    def _trim(self):
+        # least recently used first; anything not on disk yet has to stay
+        for old in list(self._cache):
+            if self._cached <= self.cache_bytes or len(self._cache) == 1:
+                break
+            if old not in self._pending:
+                self._cached -= len(self._cache.pop(old))
+
+    def put(self, name: str, content: str) -> str:
+        data = content.encode("utf-8")
+        sha = hashlib.sha256(data).hexdigest()
+        stem, suffix = os.path.splitext(name)
+        path = self.run_dir / f"{stem}-{sha[:12]}{suffix}{self.ext}"
+        key = str(path)
+        with self._lock:
+            if key in self._pending or key in self._cache or path.exists():
+                self._remember(key, content)
+                return key
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="artifact-writer")
+            self._pending[key] = self._pool.submit(self._write, path, sha, suffix, data)
+            self._remember(key, content)
+        return key
+
+    def put_file(self, name: str, src: str | os.PathLike, sha: str) -> str:
+        """put() for content already in a file (e.g. streamed), hashed by the caller.
+
+        The file is linked (or, compressed, streamed) into the store and removed,
+        without its text being read into memory or cached. Stored before returning.
+        """
+        src = pathlib.Path(src)
+        stem, suffix = os.path.splitext(name)
+        path = self.run_dir / f"{stem}-{sha[:12]}{suffix}{self.ext}"
+        key = str(path)
+        with self._lock:
+            known = key in self._pending or key in self._cache or path.exists()
+        if not known:
+            size = src.stat().st_size
+            self._link(path, sha, suffix, size, lambda dst: _encode_file(src, dst, self.ext))
+        src.unlink()
+        return key
+
+    def _write(self, path: pathlib.Path, sha: str, suffix: str, data: bytes):
+        self._link(path, sha, suffix, len(data), lambda dst: dst.write_bytes(_encode(data, self.ext)))
+        # failed writes stay pending so wait() re-raises them
+        with self._lock:
+            self._pending.pop(str(path), None)
+            self._trim()
+
+    def _link(self, path: pathlib.Path, sha: str, suffix: str, size: int, fill):
+        """Store the blob unless it exists (fill(dst) writes it encoded, returning its size),
+        then link it into the run directory."""
+        blob = self.root / OBJECTS / sha[:2] / f"{sha}{suffix}{self.ext}"
+        stored = 0
+        try:
+            # an existing blob gets a fresh mtime, so a concurrent gc keeps it until it is linked
+            os.utime(blob)
+        except FileNotFoundError:
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_name(f"{blob.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            written = fill(tmp)
+            try:
+                # link, not rename: another run that stored the same blob first keeps its inode
+                os.link(tmp, blob)
+                stored = written
+            except FileExistsError:
+                pass
+            except OSError:
+                tmp.replace(blob)
+                stored = written
+            finally:
+                tmp.unlink(missing_ok=True)
+        with self._lock:
+            self.stats["stored_bytes"] += stored
+            self.stats["deduped"] += 0 if stored else 1
+            self.stats["writes"] += 1
+            self.stats["bytes"] += size
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(blob, path)
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            # collected between our write and the link; keep a private copy
+            fill(path)
+        except OSError:
+            # no hard links on this filesystem
+            shutil.copyfile(blob, path)
+
+    def read(self, path: str | os.PathLike) -> str:
+        key = str(path)
+        with self._lock:
+            text = self._cache.get(key)
+            if text is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return text
+        self.stats["disk_reads"] += 1
+        text = read_file(key)
+        with self._lock:
+            self._remember(key, text)
+        return text
+
+    def wait(self, paths: Optional[Iterable[str]] = None):
+        """Block until the given artifacts (default: all pending ones) are on disk."""
+        with self._lock:
+            futs = list(self._pending.values()) if paths is None else \
+                [self._pending[str(p)] for p in paths if str(p) in self._pending]
+        for f in futs:
+            f.result()
+
+    def close(self):
+        self.wait()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+def gc(root: str | os.PathLike | None = None, keep_runs: int = KEEP_RUNS,
+       max_age_days: float = MAX_AGE_DAYS, dry_run: bool = False,
+       min_blob_age: float = BLOB_MIN_AGE) -> Dict[str, int]:
+    """Drop run directories beyond the newest `keep_runs` or older than `max_age_days`
+    (0 disables either rule), then blobs no run links to any more. Writes in progress
+    (temp files, blobs younger than `min_blob_age` seconds) are left alone."""
+    root = pathlib.Path(root or io.RUN_DIR)
+    out = {"runs": 0, "blobs": 0, "bytes": 0}
+    if not root.is_dir():
+        return out
+    runs = sorted((d for d in root.iterdir() if d.is_dir() and d.name != OBJECTS),
+                  key=lambda d: d.stat().st_mtime, reverse=True)
+    cutoff = time.time() - max_age_days * 86400
+    for i, d in enumerate(runs):
+        if (keep_runs and i >= keep_runs) or (max_age_days and d.stat().st_mtime < cutoff):
+            out["runs"] += 1
+            out["bytes"] += sum(f.stat().st_size for f in d.rglob("*") if f.is_file() and f.stat().st_nlink == 1)
+            if not dry_run:
+                shutil.rmtree(d)
+    objects = root / OBJECTS
+    if objects.is_dir() and not dry_run:
+        fresh = time.time() - min_blob_age
+        for blob in objects.rglob("*"):
+            if blob.name.endswith(".tmp") or not blob.is_file():
+                continue
+            try:
+                st = blob.stat()
+            except FileNotFoundError:
+                continue
+            # a blob whose only link is its own entry is unreferenced
+            if st.st_nlink == 1 and st.st_mtime < fresh:
+                out["blobs"] += 1
+                out["bytes"] += st.st_size
+                blob.unlink(missing_ok=True)
+    return out
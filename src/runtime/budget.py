@@ -0,0 +1,182 @@
+import os, json, threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+from . import io
+from .llm import cached_tokens, count_tokens
+
+# USD per 1M tokens: (input, cached input, output). Override or extend with
+# AGENT_PRICES='{"my-model": [0.5, 0.25, 1.5]}'.
+PRICES: Dict[str, Tuple[float, float, float]] = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "o4-mini": (1.10, 0.275, 4.40),
+}
+PRICES.update({k: tuple(v) for k, v in json.loads(os.getenv("AGENT_PRICES") or "{}").items()})
+# most output tokens a model accepts as max_output_tokens; extend with AGENT_OUTPUT_LIMITS='{"my-model": 8192}'
+OUTPUT_LIMITS: Dict[str, int] = {
+    "gpt-4o-mini": 16384,
+    "gpt-4o": 16384,
+    "gpt-4.1": 32768,
+    "gpt-4.1-mini": 32768,
+    "gpt-4.1-nano": 32768,
+    "o4-mini": 100000,
+}
+OUTPUT_LIMITS.update({k: int(v) for k, v in json.loads(os.getenv("AGENT_OUTPUT_LIMITS") or "{}").items()})
+# context is never trimmed below this, however tight the budget
+MIN_CONTEXT_TOKENS = 200
+
+class BudgetExceeded(RuntimeError):
+    pass
+
+def _lookup(table: Dict[str, Any], model: str) -> Any:
+    if model in table:
+        return table[model]
+    # dated snapshots, e.g. gpt-4o-mini-2024-07-18
+    base = max((m for m in table if model.startswith(m + "-")), key=len, default=None)
+    return table.get(base) if base else None
+
+def _price(model: str) -> Optional[Tuple[float, float, float]]:
+    return _lookup(PRICES, model)
+
+def cost(model: str, usage: Dict[str, Any]) -> Optional[float]:
+    """USD for one response's usage, or None for a model without a known price."""
+    price = _price(model)
+    if price is None:
+        return None
+    cached = cached_tokens(usage)
+    fresh = (usage.get("input_tokens") or 0) - cached
+    out = usage.get("output_tokens") or 0
+    return (fresh * price[0] + cached * price[1] + out * price[2]) / 1e6
+
+@dataclass(frozen=True)
+class PhasePlan:
+    model: str
+    context_tokens: int
+    max_output_tokens: Optional[int] = None
+
+class BudgetLedger:
+    """Per-run token/cost accounting that plans each phase's LLM call.
+
+    Budgets come from the blueprint: `project.budget` for the whole run and
+    `phase.budget` per phase. Before a phase runs, `plan` picks its model
+    (`phase.model`, or the project's `fallback_model` once less than `reserve`
+    of the run budget is left), trims the state context to what the budget
+    still allows, and refuses to start when the run budget is spent.
+    """
+
+    def __init__(self, blueprint=None, default_model: str = "gpt-4o-mini", context_tokens: int = 1500):
+        self.project_budget = getattr(getattr(blueprint, "project", None), "budget", None)
+        self.default_model = default_model
+        self.context_tokens = context_tokens
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self._unpriced: set = set()
+        self._lock = threading.Lock()
+
+    # --- accounting
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            rows = list(self.phases.values())
+        return {"input_tokens": sum(r["input_tokens"] for r in rows),
+                "cached_tokens": sum(r["cached_tokens"] for r in rows),
+                "output_tokens": sum(r["output_tokens"] for r in rows),
+                "tokens": sum(r["tokens"] for r in rows),
+                "cost_usd": round(sum(r["cost_usd"] for r in rows), 6)}
+
+    def record(self, phase: str, model: str, usage: Dict[str, Any] | None) -> Dict[str, Any]:
+        usage = usage or {}
+        c = cost(model, usage) if usage else 0.0
+        if c is None:
+            if model not in self._unpriced:
+                self._unpriced.add(model)
+                io.log(f"no price known for {model}; its cost is not counted (set AGENT_PRICES)")
+            c = 0.0
+        row = {"model": model, "input_tokens": usage.get("input_tokens") or 0,
+               "cached_tokens": cached_tokens(usage),
+               "output_tokens": usage.get("output_tokens") or 0,
+               "tokens": usage.get("total_tokens") or 0, "cost_usd": round(c, 6)}
+        with self._lock:
+            # a phase re-run (rework, --from-phase) spends on top of earlier attempts
+            acc = self.phases.setdefault(phase, {k: 0 for k in row if k != "model"})
+            for k, v in row.items():
+                acc[k] = v if k == "model" else acc[k] + v
+        return row
+
+    def load(self, metrics: Dict[str, Dict[str, Any]] | None):
+        """Rebuild the ledger from checkpointed phase metrics when a run is resumed."""
+        for phase, m in (metrics or {}).items():
+            if m.get("usage"):
+                self.record(phase, m.get("model", self.default_model), m["usage"])
+
+    # --- planning
+    def _remaining(self) -> Tuple[Optional[float], Optional[float]]:
+        b, t = self.project_budget, self.totals()
+        if b is None:
+            return None, None
+        tokens = None if b.tokens is None else b.tokens - t["tokens"]
+        usd = None if b.cost_usd is None else b.cost_usd - t["cost_usd"]
+        return tokens, usd
+
+    def plan(self, phase, role_prompt: str = "") -> PhasePlan:
+        tokens_left, usd_left = self._remaining()
+        if (tokens_left is not None and tokens_left <= 0) or (usd_left is not None and usd_left <= 0):
+            t = self.totals()
+            raise BudgetExceeded(f"run budget spent before phase '{phase.id}' "
+                                 f"({t['tokens']} tokens, ${t['cost_usd']:.4f})")
+        model = phase.model or self.default_model
+        b = self.project_budget
+        if b is not None and b.fallback_model and model != b.fallback_model:
+            fractions = [left / total for left, total in ((tokens_left, b.tokens), (usd_left, b.cost_usd))
+                         if left is not None and total]
+            if fractions and min(fractions) < b.reserve:
+                io.log(f"{phase.id}: run budget below {b.reserve:.0%}, using {b.fallback_model} instead of {model}")
+                model = b.fallback_model
+        pb = phase.budget
+        max_out = pb.max_output_tokens if pb else None
+        # tokens this call may use: the phase budget, capped by what the run has left
+        allowed = [x for x in (pb.tokens if pb else None, tokens_left) if x is not None]
+        usd = [x for x in (pb.cost_usd if pb else None, usd_left) if x is not None]
+        price = _price(model)
+        if usd and price:
+            # dollars left, as tokens at the output price (the dearest kind)
+            allowed.append(min(usd) * 1e6 / price[2])
+        context = self.context_tokens
+        if allowed:
+            spare = int(min(allowed)) - count_tokens(role_prompt, model) - (max_out or 1024)
+            context = max(MIN_CONTEXT_TOKENS, min(context, spare))
+            if max_out is None:
+                # a cap derived from the budget never exceeds what the model accepts; from the run
+                # budget alone it is only sent once it binds (a $5 run is not an 8M-token reply)
+                max_out = max(256, int(min(allowed)) - count_tokens(role_prompt, model) - context)
+                limit = _lookup(OUTPUT_LIMITS, model)
+                if limit is not None:
+                    max_out = min(max_out, limit)
+                phase_budget = pb is not None and (pb.tokens is not None or pb.cost_usd is not None)
+                if not phase_budget and (limit is None or max_out >= limit):
+                    max_out = None
+        return PhasePlan(model, context, max_out)
+
+    def check_phase(self, phase) -> Optional[str]:
+        """A warning when a phase used more than its own budget (the run goes on)."""
+        row, pb = self.phases.get(phase.id), phase.budget
+        if not row or pb is None:
+            return None
+        if pb.tokens is not None and row["tokens"] > pb.tokens:
+            return f"{phase.id} used {row['tokens']} tokens (budget {pb.tokens})"
+        if pb.cost_usd is not None and row["cost_usd"] > pb.cost_usd:
+            return f"{phase.id} cost ${row['cost_usd']:.4f} (budget ${pb.cost_usd:.4f})"
+        return None
+
+    def summary(self) -> str:
+        t = self.totals()
+        line = (f"usage: {t['tokens']} tokens ({t['input_tokens']} in, {t['cached_tokens']} cached, "
+                f"{t['output_tokens']} out), ${t['cost_usd']:.4f}")
+        b = self.project_budget
+        if b is not None:
+            limits = [f"{b.tokens} tokens" if b.tokens is not None else "",
+                      f"${b.cost_usd:.2f}" if b.cost_usd is not None else ""]
+            if any(limits):
+                line += " of " + " / ".join(x for x in limits if x)
+        return line
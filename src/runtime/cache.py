@@ -0,0 +1,108 @@
+import os, json, time, sqlite3, hashlib, pathlib, threading
+from typing import Any, Dict, Optional
+
+CACHE_DIR = pathlib.Path(os.getenv("AGENT_CACHE_DIR", ".agent_cache"))
+MAX_BYTES = int(float(os.getenv("AGENT_CACHE_MAX_MB", "256")) * 1024 * 1024)
+MAX_AGE = float(os.getenv("AGENT_CACHE_MAX_AGE_DAYS", "30")) * 86400
+MODES = ("off", "read", "readwrite")
+# per-run bookkeeping (timings, cost, cache source, check results, loop counters) never
+# reaches the prompt; keying on it would miss every downstream phase on a re-run
+RUN_FIELDS = ("metrics", "gates", "loops", "halted")
+
+def _digest_file(path: str) -> str:
+    try:
+        return hashlib.sha256(pathlib.Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return path
+
+def state_fingerprint(state: Dict[str, Any]) -> str:
+    """Canonical state text for cache keys: artifacts by content, not by timestamped path."""
+    canon = {k: v for k, v in state.items() if k not in RUN_FIELDS}
+    if canon.get("artifacts"):
+        canon["artifacts"] = {k: _digest_file(v) for k, v in canon["artifacts"].items()}
+    return json.dumps(canon, sort_keys=True, separators=(",", ":"), default=str)
+
+def cache_key(model: str, system: str, role_prompt: str, state_text: str) -> str:
+    h = hashlib.sha256()
+    for part in (model, system, role_prompt, state_text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+class ResponseCache:
+    """Content-addressed SQLite store of LLM outputs with size/age LRU eviction."""
+
+    def __init__(self, path: str | os.PathLike | None = None, mode: str = "readwrite",
+                 max_bytes: int = MAX_BYTES, max_age: float = MAX_AGE):
+        if mode not in MODES:
+            raise ValueError(f"cache mode must be one of {MODES}, got {mode!r}")
+        self.mode = mode
+        self.max_bytes, self.max_age = max_bytes, max_age
+        self.hits = self.misses = self.writes = self.evictions = 0
+        self._lock = threading.Lock()
+        self._db = None
+        if mode != "off":
+            path = pathlib.Path(path or CACHE_DIR / "responses.sqlite")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("""CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY, model TEXT, text TEXT, size INTEGER,
+                created_at REAL, last_access REAL)""")
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_access)")
+            self._db.commit()
+
+    @property
+    def readable(self) -> bool:
+        return self.mode in ("read", "readwrite")
+
+    @property
+    def writable(self) -> bool:
+        return self.mode == "readwrite"
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.readable:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT text, created_at FROM responses WHERE key=?", (key,)).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET last_access=? WHERE key=?", (now, key))
+            self._db.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model: str, text: str):
+        if not self.writable:
+            return
+        now = time.time()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO responses VALUES (?,?,?,?,?,?)",
+                             (key, model, text, len(text.encode("utf-8")), now, now))
+            self.writes += 1
+            self._evict(now)
+            self._db.commit()
+
+    def _evict(self, now: float):
+        cur = self._db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age,))
+        self.evictions += cur.rowcount
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute(
+                "SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key=?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "writes": self.writes, "evictions": self.evictions}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
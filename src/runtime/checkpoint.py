@@ -0,0 +1,75 @@
+import os, json, time, uuid, sqlite3, hashlib, pathlib, threading
+import datetime as dt
+from typing import TYPE_CHECKING, Any, Tuple
+if TYPE_CHECKING:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+STATE_DIR = pathlib.Path(os.getenv("AGENT_STATE_DIR", ".agent_state"))
+
+def _connect(path: str | os.PathLike | None) -> sqlite3.Connection:
+    path = pathlib.Path(path or STATE_DIR / "runs.sqlite")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def new_run_id(project_id: str) -> str:
+    ts = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%d-%H%M%S")
+    return f"{project_id}-{ts}-{uuid.uuid4().hex[:6]}"
+
+def open_checkpointer(path: str | os.PathLike | None = None) -> "SqliteSaver":
+    """SQLite checkpointer for StateGraph.compile; one checkpoint per finished node."""
+    from langgraph.checkpoint.sqlite import SqliteSaver
+    return SqliteSaver(_connect(path))
+
+_shared: dict = {}
+_shared_lock = threading.Lock()
+
+def shared_checkpointer(path: str | os.PathLike | None = None) -> "SqliteSaver":
+    # process-wide, so compiled graphs bound to it can be cached and reused across runs
+    key = ("saver", str(pathlib.Path(path or STATE_DIR / "runs.sqlite").resolve()))
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = open_checkpointer(path)
+        return _shared[key]
+
+def has_checkpoint(run_id: str, path: str | os.PathLike | None = None) -> bool:
+    """Whether a run has been checkpointed, i.e. can be resumed."""
+    return shared_checkpointer(path).get_tuple({"configurable": {"thread_id": run_id}}) is not None
+
+def shared_ledger(path: str | os.PathLike | None = None) -> "IdempotencyLedger":
+    key = ("ledger", str(pathlib.Path(path or STATE_DIR / "runs.sqlite").resolve()))
+    with _shared_lock:
+        if key not in _shared:
+            _shared[key] = IdempotencyLedger(path)
+        return _shared[key]
+
+def idempotency_key(run_id: str, phase: str, task_id: str, spec: str, visit: int = 0) -> str:
+    # `visit` tells a pass around a rework loop apart from a resumed replay of the same pass
+    if visit:
+        phase = f"{phase}#{visit}"
+    return hashlib.sha256(f"{run_id}\0{phase}\0{task_id}\0{spec}".encode("utf-8")).hexdigest()
+
+class IdempotencyLedger:
+    """Results of side-effecting tool calls, so a resumed phase does not repeat them."""
+
+    def __init__(self, path: str | os.PathLike | None = None):
+        self._db = _connect(path)
+        self._lock = threading.Lock()
+        self._db.execute("""CREATE TABLE IF NOT EXISTS tool_calls (
+            key TEXT PRIMARY KEY, run_id TEXT, spec TEXT, result TEXT, created_at REAL)""")
+        self._db.commit()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        with self._lock:
+            row = self._db.execute("SELECT result FROM tool_calls WHERE key=?", (key,)).fetchone()
+        return (True, json.loads(row[0])) if row else (False, None)
+
+    def put(self, key: str, run_id: str, spec: str, result: Any):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO tool_calls VALUES (?,?,?,?,?)",
+                             (key, run_id, spec, json.dumps(result, default=str), time.time()))
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
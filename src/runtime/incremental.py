@@ -0,0 +1,123 @@
+import os, json, time, hashlib, threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .checkpoint import _connect
+
+def _sha(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def _canon(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+def phase_inputs(phase, role_prompt: str, project, model: str, approvals: Dict[str, bool] | None) -> Dict[str, str]:
+    """Digests of everything a phase reads besides upstream artifacts, by kind.
+
+    Kept apart so a dry run can say which one changed.
+    """
+    return {
+        "prompt": _sha(role_prompt),
+        "model": model,
+        "tools": _sha(_canon([(t.id, t.tool_calls, t.depends_on) for t in phase.tasks])),
+        "gate": _sha(_canon(phase.gate.model_dump() if phase.gate else None)),
+        "project": _sha(_canon({"id": project.id, "goal": project.goal, "context": project.context})),
+        "approvals": _sha(_canon(approvals or {})),
+    }
+
+@dataclass
+class PhaseRecord:
+    inputs: Dict[str, str]
+    upstream: Dict[str, str]
+    output: str
+    artifact: Optional[str]
+    event: str
+    run_id: str
+
+class PhaseIndex:
+    """Input fingerprints of each project's last successful phase runs.
+
+    A phase whose own inputs (`phase_inputs`) and upstream artifact contents
+    match its record can be skipped and its artifact reused, like a build
+    target whose sources are unchanged. Stored next to the checkpoints.
+    """
+
+    def __init__(self, path: str | os.PathLike | None = None):
+        self._db = _connect(path)
+        self._lock = threading.Lock()
+        self._digests: Dict[str, str] = {}
+        self._db.execute("""CREATE TABLE IF NOT EXISTS phase_inputs (
+            project TEXT, phase TEXT, inputs TEXT, upstream TEXT, output TEXT, artifact TEXT,
+            event TEXT, run_id TEXT, updated_at REAL, PRIMARY KEY (project, phase))""")
+        self._db.commit()
+
+    def digest(self, path: str, read: Callable[[str], str]) -> str:
+        # artifact paths are content-addressed, so a path's digest never changes
+        hit = self._digests.get(path)
+        if hit is None:
+            hit = self._digests[path] = _sha(read(path))
+        return hit
+
+    def upstream(self, artifacts: Dict[str, str], phase_id: str, read: Callable[[str], str]) -> Dict[str, str]:
+        return {p: self.digest(path, read) for p, path in (artifacts or {}).items() if p != phase_id}
+
+    def get(self, project: str, phase: str) -> Optional[PhaseRecord]:
+        with self._lock:
+            row = self._db.execute("SELECT inputs, upstream, output, artifact, event, run_id FROM phase_inputs "
+                                   "WHERE project=? AND phase=?", (project, phase)).fetchone()
+        if row is None:
+            return None
+        return PhaseRecord(json.loads(row[0]), json.loads(row[1]), row[2], row[3], row[4], row[5])
+
+    def put(self, project: str, phase: str, rec: PhaseRecord):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO phase_inputs VALUES (?,?,?,?,?,?,?,?,?)",
+                             (project, phase, _canon(rec.inputs), _canon(rec.upstream), rec.output,
+                              rec.artifact, rec.event, rec.run_id, time.time()))
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+def stale_reason(rec: Optional[PhaseRecord], inputs: Dict[str, str], upstream: Dict[str, str]) -> Optional[str]:
+    """Why a phase has to run again, or None when its record still holds."""
+    if rec is None:
+        return "never ran"
+    changed = [k for k in inputs if rec.inputs.get(k) != inputs[k]]
+    if changed:
+        return ", ".join(changed) + " changed"
+    if rec.upstream != upstream:
+        diff = sorted(set(rec.upstream) ^ set(upstream) | {p for p in upstream if rec.upstream.get(p) != upstream[p]})
+        return "upstream " + ", ".join(diff) + " changed"
+    if rec.artifact and not os.path.exists(rec.artifact):
+        return "artifact missing"
+    return None
+
+def plan(bp, prompts: Dict[str, str], index: PhaseIndex, default_model: str,
+         approvals: Dict[str, bool] | None = None) -> List[Tuple[str, bool, str]]:
+    """(phase, runs, reason) for every phase, without running anything.
+
+    A phase runs when its own inputs changed or an upstream phase it read
+    last time runs too (it may still be skipped if that phase's output comes
+    out identical).
+    """
+    records = {ph.id: index.get(bp.project.id, ph.id) for ph in bp.phases}
+    phases = {ph.id: ph for ph in bp.phases}
+    verdicts: Dict[str, Tuple[bool, str]] = {}
+    def visit(pid: str) -> Tuple[bool, str]:
+        if pid in verdicts:
+            return verdicts[pid]
+        verdicts[pid] = (False, "")  # cycle guard for rework loops
+        ph, rec = phases[pid], records[pid]
+        inputs = phase_inputs(ph, prompts.get(ph.entry_prompt, ""), bp.project, ph.model or default_model,
+                              approvals)
+        reason = stale_reason(rec, inputs, rec.upstream if rec else {})
+        if reason is None:
+            for up, digest in rec.upstream.items():
+                if up in phases and visit(up)[0]:
+                    reason = f"upstream {up} re-runs"
+                    break
+                if records.get(up) is None or records[up].output != digest:
+                    reason = f"upstream {up} changed"
+                    break
+        verdicts[pid] = (reason is not None, reason or "unchanged")
+        return verdicts[pid]
+    return [(ph.id, *visit(ph.id)) for ph in bp.phases]
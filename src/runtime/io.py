@@ -1,12 +1,70 @@
-import os, json, pathlib, datetime as dt
+import os, sys, json, hashlib, pathlib, threading, datetime as dt
 RUN_DIR = pathlib.Path("run_artifacts")
-RUN_DIR.mkdir(exist_ok=True)
 
-def write_artifact(name: str, content: str) -> str:
+def _artifact_path(name: str) -> pathlib.Path:
+    # created on first write, not at import: read-only commands leave no trace
+    RUN_DIR.mkdir(parents=True, exist_ok=True)
     ts = dt.datetime.utcnow().strftime("%Y%m%d-%H%M%S")
-    path = RUN_DIR / f"{ts}-{name}"
+    return RUN_DIR / f"{ts}-{name}"
+
+def write_artifact(name: str, content: str) -> str:
+    path = _artifact_path(name)
     path.write_text(content, encoding="utf-8")
     return str(path)
 
+class ArtifactStream:
+    """Artifact file written incrementally as output arrives.
+
+    With a `store` (an ArtifactStore) the working file is hashed as it is
+    written and moved into the store on close; the path it returns is the
+    artifact's. The text is never held in memory as a whole.
+    """
+
+    def __init__(self, name: str, store=None):
+        self.name, self.store = name, store
+        if store is not None:
+            store.run_dir.mkdir(parents=True, exist_ok=True)
+            self.path = store.run_dir / name
+        else:
+            self.path = _artifact_path(name)
+        self._fh = open(self.path, "wb")
+        self._sha = hashlib.sha256()
+        self._lock = threading.Lock()
+
+    def write(self, text: str):
+        with self._lock:
+            if not self._fh.closed:
+                data = text.encode("utf-8")
+                self._fh.write(data)
+                self._fh.flush()
+                self._sha.update(data)
+
+    def close(self) -> str:
+        with self._lock:
+            self._fh.close()
+        if self.store is None:
+            return str(self.path)
+        return self.store.put_file(self.name, self.path, self._sha.hexdigest())
+
+    def abort(self) -> str:
+        """Close and keep what was received as <name>.partial<ext>."""
+        with self._lock:
+            self._fh.close()
+        partial = self.path.with_name(f"{self.path.stem}.partial{self.path.suffix}")
+        self.path.replace(partial)
+        return str(partial)
+
 def log(msg: str):
     print(f"[agent] {msg}")
+
+def format_table(rows, cols) -> str:
+    """Rows (dicts) as left-aligned text columns under a header rule."""
+    cells = [tuple(cols)] + [tuple(str(r.get(c, "")) for c in cols) for r in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(cols))]
+    lines = ["  ".join(v.ljust(w) for v, w in zip(row, widths)).rstrip() for row in cells]
+    lines.insert(1, "  ".join("-" * w for w in widths))
+    return "\n".join(lines)
+
+def progress(phase: str, delta: str):
+    sys.stdout.write(delta)
+    sys.stdout.flush()
@@ -0,0 +1,300 @@
+import os, time, random, asyncio, threading, functools, email.utils
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+import openai
+from openai import OpenAI, AsyncOpenAI
+from . import io
+
+RPM = float(os.getenv("OPENAI_RPM", "500"))
+TPM = float(os.getenv("OPENAI_TPM", "200000"))
+MAX_IN_FLIGHT = int(os.getenv("OPENAI_MAX_IN_FLIGHT", "8"))
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+# rough output allowance charged against the TPM bucket until real usage is known
+OUTPUT_TOKENS_ESTIMATE = 1024
+
+_openai_client = None
+_async_openai_client = None
+
+def _get_openai_client() -> OpenAI:
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _openai_client
+
+def _get_async_openai_client() -> AsyncOpenAI:
+    # retries are owned by the engine so they share its limiter and backoff
+    global _async_openai_client
+    if _async_openai_client is None:
+        _async_openai_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    return _async_openai_client
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    # tiktoken is optional and fetches its BPE tables on first use; fall back quietly
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+def count_tokens(text: str, model: str | None = None) -> int:
+    enc = _encoding(model or os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+    return len(enc.encode(text, disallowed_special=())) if enc else estimate_tokens(text)
+
+def truncate_tokens(text: str, limit: int, model: str | None = None) -> str:
+    """Cut text to at most `limit` tokens, on a token boundary."""
+    enc = _encoding(model or os.getenv("OPENAI_MODEL", "gpt-4o-mini"))
+    if enc is None:
+        return text[:limit * 4]
+    toks = enc.encode(text, disallowed_special=())
+    return text if len(toks) <= limit else enc.decode(toks[:limit])
+
+class TokenBucket:
+    """Async token bucket refilled continuously at `per_minute` tokens/min."""
+
+    def __init__(self, per_minute: float, capacity: float | None = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    async def acquire(self, n: float = 1):
+        # oversized requests are let through once the bucket is full
+        n = min(n, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                await asyncio.sleep((n - self.tokens) / self.rate)
+
+    def adjust(self, delta: float):
+        """Charge (delta > 0) or refund (delta < 0) tokens after the fact."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+    def drain(self, seconds: float):
+        # a server-side 429 means our view of the budget is stale; stop everyone briefly
+        self._refill()
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+@dataclass
+class LLMResult:
+    text: str
+    model: str
+    usage: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 1
+    latency: float = 0.0
+    ttft: Optional[float] = None
+    # one entry per attempt: start/end (ns since epoch), limiter wait (s), error
+    trace: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def tokens_per_sec(self) -> Optional[float]:
+        out = self.usage.get("output_tokens")
+        gen = self.latency - (self.ttft or 0.0)
+        return out / gen if out and gen > 0 else None
+
+class _PartialOutput(Exception):
+    # streamed text already reached the sink; retrying would duplicate it
+    pass
+
+def extract_text(res) -> str:
+    text = ""
+    for item in getattr(res, "output", None) or []:
+        if item.type == "message":
+            for content in item.content:
+                if content.type == "output_text":
+                    text += content.text
+    return text.strip()
+
+def usage_dict(res) -> Dict[str, Any]:
+    usage = getattr(res, "usage", None)
+    if usage is None:
+        return {}
+    return usage.model_dump() if hasattr(usage, "model_dump") else dict(usage)
+
+def cached_tokens(usage: Dict[str, Any]) -> int:
+    """Input tokens the provider served from its prompt cache."""
+    return ((usage or {}).get("input_tokens_details") or {}).get("cached_tokens") or 0
+
+def retry_after(err: Exception) -> Optional[float]:
+    """Seconds the server asked us to wait, from Retry-After(-ms) headers."""
+    resp = getattr(err, "response", None)
+    headers = getattr(resp, "headers", None) or {}
+    ms = headers.get("retry-after-ms")
+    if ms:
+        try:
+            return float(ms) / 1000
+        except ValueError:
+            pass
+    ra = headers.get("retry-after")
+    if not ra:
+        return None
+    try:
+        return float(ra)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(ra)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+def _retryable(err: Exception) -> bool:
+    if isinstance(err, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(err, openai.APIStatusError) and err.status_code >= 500
+
+class LLMEngine:
+    """Asyncio engine multiplexing Responses API calls from all phases and runs.
+
+    Coroutines run on a private event loop thread so sync callers (graph nodes
+    on worker threads) and async callers share one client, one connection pool
+    and the same per-model limits: requests/min, tokens/min and in-flight cap.
+    """
+
+    def __init__(self, client: AsyncOpenAI | None = None, rpm: float = RPM, tpm: float = TPM,
+                 max_in_flight: int = MAX_IN_FLIGHT, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = 1.0, backoff_cap: float = 30.0):
+        self._client = client
+        self.rpm, self.tpm = rpm, tpm
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base, self.backoff_cap = backoff_base, backoff_cap
+        self._limits: Dict[str, tuple] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def client(self) -> AsyncOpenAI:
+        if self._client is None:
+            self._client = _get_async_openai_client()
+        return self._client
+
+    def _limits_for(self, model: str):
+        if model not in self._limits:
+            self._limits[model] = (TokenBucket(self.rpm), TokenBucket(self.tpm),
+                                   asyncio.Semaphore(self.max_in_flight))
+        return self._limits[model]
+
+    def _backoff(self, attempt: int, err: Exception) -> float:
+        hinted = retry_after(err)
+        if hinted is not None:
+            return hinted + random.uniform(0, 0.25 * max(hinted, 0.1))
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _stream(self, model: str, input, on_delta: Callable[[str], None], start: float, **kwargs):
+        parts, final, ttft = [], None, None
+        stream = await self.client.responses.create(model=model, input=input, stream=True, **kwargs)
+        try:
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    if ttft is None:
+                        ttft = time.monotonic() - start
+                    parts.append(event.delta)
+                    on_delta(event.delta)
+                elif event.type == "response.completed":
+                    final = event.response
+        except Exception as e:
+            if parts:
+                raise _PartialOutput(str(e)) from e
+            raise
+        finally:
+            await stream.close()
+        return "".join(parts).strip(), final, ttft
+
+    async def acomplete(self, model: str, input: List[Dict[str, str]],
+                        on_delta: Callable[[str], None] | None = None, **kwargs) -> LLMResult:
+        """Run one Responses API call on the current loop, honoring limits.
+
+        With `on_delta`, the response is streamed and each text delta is passed
+        to it as it arrives; the result then also carries time-to-first-token.
+        """
+        requests_bucket, tokens_bucket, in_flight = self._limits_for(model)
+        est = sum(estimate_tokens(m.get("content", "")) for m in input) + OUTPUT_TOKENS_ESTIMATE
+        start = time.monotonic()
+        trace: List[Dict[str, Any]] = []
+        for attempt in range(self.max_retries + 1):
+            queued = time.monotonic()
+            await requests_bucket.acquire(1)
+            await tokens_bucket.acquire(est)
+            ttft = None
+            trace.append({"start": time.time_ns(), "wait": round(time.monotonic() - queued, 4), "error": None})
+            try:
+                async with in_flight:
+                    if on_delta is None:
+                        res = await self.client.responses.create(model=model, input=input, **kwargs)
+                        text = extract_text(res)
+                    else:
+                        text, res, ttft = await self._stream(model, input, on_delta, start, **kwargs)
+            except Exception as e:
+                tokens_bucket.adjust(-est)
+                trace[-1].update(end=time.time_ns(), error=f"{type(e).__name__}: {e}")
+                if not _retryable(e) or attempt == self.max_retries:
+                    e.llm_trace = trace
+                    raise
+                wait = self._backoff(attempt, e)
+                if isinstance(e, openai.RateLimitError):
+                    requests_bucket.drain(wait)
+                io.log(f"LLM retry {attempt + 1}/{self.max_retries} in {wait:.1f}s ({type(e).__name__})")
+                await asyncio.sleep(wait)
+                continue
+            trace[-1]["end"] = time.time_ns()
+            usage = usage_dict(res)
+            if usage.get("total_tokens"):
+                tokens_bucket.adjust(usage["total_tokens"] - est)
+            return LLMResult(text, model, usage, attempt + 1, time.monotonic() - start, ttft, trace)
+
+    # --- loop plumbing
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-engine", daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+    def submit(self, model: str, input: List[Dict[str, str]], **kwargs):
+        """Schedule a call on the engine loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(self.acomplete(model, input, **kwargs), self._ensure_loop())
+
+    def complete(self, model: str, input: List[Dict[str, str]], **kwargs) -> LLMResult:
+        fut = self.submit(model, input, **kwargs)
+        try:
+            return fut.result()
+        except BaseException:
+            # Ctrl-C / caller cancellation: stop the request on the engine loop too
+            fut.cancel()
+            raise
+
+    async def acomplete_threadsafe(self, model: str, input: List[Dict[str, str]], **kwargs) -> LLMResult:
+        """Await a call from any event loop without binding the client to it."""
+        return await asyncio.wrap_future(self.submit(model, input, **kwargs))
+
+    def complete_many(self, calls: List[Dict[str, Any]]) -> List[LLMResult]:
+        """Fan a batch of calls ({"model", "input", ...}) out concurrently, results in order."""
+        futures = [self.submit(**c) for c in calls]
+        return [f.result() for f in futures]
+
+    def close(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+_engine = None
+
+def get_engine() -> LLMEngine:
+    global _engine
+    if _engine is None:
+        _engine = LLMEngine()
+    return _engine
@@ -0,0 +1,123 @@
+import os, hashlib, pathlib, threading, functools
+from typing import Any, Dict, Tuple
+import yaml
+from yaml import events
+from yaml.nodes import ScalarNode
+
+# libyaml's C loader when PyYAML was built with it; same safe semantics, much faster
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+_resolver = yaml.resolver.Resolver()
+_constructor = yaml.constructor.SafeConstructor()
+
+class _Unsupported(Exception):
+    pass
+
+@functools.lru_cache(maxsize=4096)
+def _plain(value: str) -> Any:
+    # PyYAML's own implicit typing (null, bool, int, float, timestamp); generated
+    # blueprints repeat the same few scalars, so each is resolved once
+    tag = _resolver.resolve(ScalarNode, value, (True, False))
+    construct = _constructor.yaml_constructors.get(tag)
+    if construct is None or tag.endswith(":merge"):
+        raise _Unsupported(tag)
+    return construct(_constructor, ScalarNode(tag, value))
+
+def _stream(text: str) -> Any:
+    """Build plain dicts and lists straight from the parser's events.
+
+    PyYAML's loader composes a node graph before constructing anything, which
+    costs memory and grows faster than the document on large blueprints.
+    """
+    parser = YamlLoader(text)
+    stack, keys, anchors = [], [], {}
+    root, docs = None, 0
+    try:
+        while True:
+            ev = parser.get_event()
+            kind = type(ev)
+            if kind is events.ScalarEvent:
+                if ev.tag not in (None, "!"):
+                    raise _Unsupported(ev.tag)
+                value = _plain(ev.value) if ev.implicit[0] else ev.value
+            elif kind is events.MappingStartEvent or kind is events.SequenceStartEvent:
+                if ev.tag not in (None, "!"):
+                    raise _Unsupported(ev.tag)
+                value = {} if kind is events.MappingStartEvent else []
+            elif kind is events.MappingEndEvent or kind is events.SequenceEndEvent:
+                stack.pop()
+                keys.pop()
+                continue
+            elif kind is events.AliasEvent:
+                if ev.anchor not in anchors:
+                    raise _Unsupported(ev.anchor)
+                value = anchors[ev.anchor]
+            elif kind is events.DocumentStartEvent:
+                docs += 1
+                if docs > 1:
+                    raise _Unsupported("several documents")
+                continue
+            elif kind is events.StreamEndEvent:
+                return root
+            else:
+                continue
+            if getattr(ev, "anchor", None) and kind is not events.AliasEvent:
+                anchors[ev.anchor] = value
+            if not stack:
+                root = value
+            elif type(stack[-1]) is list:
+                stack[-1].append(value)
+            elif keys[-1] is None:
+                try:
+                    hash(value)
+                except TypeError:
+                    raise _Unsupported("complex key")
+                keys[-1] = (value,)
+            else:
+                stack[-1][keys[-1][0]] = value
+                keys[-1] = None
+            if kind is events.MappingStartEvent or kind is events.SequenceStartEvent:
+                stack.append(value)
+                keys.append(None)
+    finally:
+        parser.dispose()
+
+def load_yaml(text: str) -> Any:
+    """Same result as yaml.safe_load, streamed; explicit tags, merge keys and other
+    rarely used features go through PyYAML's full loader."""
+    try:
+        return _stream(text)
+    except _Unsupported:
+        return yaml.load(text, Loader=YamlLoader)
+
+_files: Dict[Tuple[str, str], Tuple[Tuple[int, int], str, Any]] = {}
+_lock = threading.Lock()
+
+def _cached(path: str | os.PathLike, kind: str, parse) -> Tuple[str, Any]:
+    """(sha256, parsed) for a file, re-read only when its mtime or size changes."""
+    p = str(pathlib.Path(path).resolve())
+    st = os.stat(p)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        hit = _files.get((kind, p))
+    if hit and hit[0] == stamp:
+        return hit[1], hit[2]
+    raw = pathlib.Path(p).read_bytes()
+    digest = hashlib.sha256(raw).hexdigest()
+    # a generator rewriting the same blueprint touches mtime but not content
+    parsed = hit[2] if hit and hit[1] == digest else parse(raw.decode("utf-8"))
+    with _lock:
+        _files[(kind, p)] = (stamp, digest, parsed)
+    return digest, parsed
+
+def load_prompts(path: str | os.PathLike) -> Tuple[str, Dict[str, str]]:
+    return _cached(path, "prompts", lambda text: load_yaml(text) or {})
+
+def load_blueprint(path: str | os.PathLike):
+    """(sha256, Blueprint) with the validated model cached until the file changes."""
+    from ..models import Blueprint
+    return _cached(path, "blueprint", lambda text: Blueprint.model_validate(load_yaml(text)))
+
+def clear():
+    with _lock:
+        _files.clear()
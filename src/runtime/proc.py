@@ -0,0 +1,148 @@
+import os, sys, time, signal, asyncio, threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+from . import io
+from .tracing import current_span
+
+# how long a process gets to exit after SIGTERM before it is killed
+KILL_GRACE = float(os.getenv("AGENT_PROC_KILL_GRACE_S", "5"))
+TAIL_LINES = 50
+READ_CHUNK = 64 * 1024
+
+class ProcessError(RuntimeError):
+    def __init__(self, msg: str, result: "ProcResult"):
+        super().__init__(msg)
+        self.result = result
+
+class ProcessTimeout(ProcessError):
+    pass
+
+@dataclass
+class ProcResult:
+    args: List[str]
+    returncode: Optional[int]
+    seconds: float
+    lines: int
+    # last lines of each stream; the full output went to the log as it arrived
+    stdout: List[str]
+    stderr: List[str]
+
+def _log_line(name: str):
+    def on_line(stream: str, line: str):
+        io.log(f"[{name}{' !' if stream == 'stderr' else ''}] {line}")
+    return on_line
+
+async def _pump(reader: asyncio.StreamReader, stream: str, tail: deque, on_line, counter: List[int]):
+    # chunks, not readline(): minified build output easily exceeds StreamReader's 64 KiB line limit
+    def emit(raw: bytes):
+        line = raw.decode("utf-8", "replace").rstrip("\r")
+        tail.append(line)
+        counter[0] += 1
+        on_line(stream, line)
+    buf = bytearray()
+    while True:
+        chunk = await reader.read(READ_CHUNK)
+        if not chunk:
+            break
+        buf += chunk
+        if b"\n" in chunk:
+            *lines, rest = bytes(buf).split(b"\n")
+            buf = bytearray(rest)
+            for raw in lines:
+                emit(raw)
+    if buf:
+        emit(bytes(buf))
+
+def _signal(proc: asyncio.subprocess.Process, sig: int):
+    # the CLI's children (node workers, builds) go with it: it leads its own process group
+    try:
+        if sys.platform != "win32":
+            os.killpg(proc.pid, sig)
+        elif sig == signal.SIGTERM:
+            proc.terminate()
+        else:
+            proc.kill()
+    except ProcessLookupError:
+        pass
+
+async def _stop(proc: asyncio.subprocess.Process):
+    if proc.returncode is not None:
+        return
+    _signal(proc, signal.SIGTERM)
+    try:
+        await asyncio.wait_for(proc.wait(), KILL_GRACE)
+    except asyncio.TimeoutError:
+        _signal(proc, getattr(signal, "SIGKILL", signal.SIGTERM))
+        await proc.wait()
+
+async def arun(cmd: List[str], cwd: str | None = None, env: Dict[str, str] | None = None,
+               timeout: float | None = None, on_line: Callable[[str, str], None] | None = None,
+               check: bool = True) -> ProcResult:
+    """Run a command without buffering its output: each line goes to `on_line(stream, line)`
+    as it is printed (default: the run log). Timeouts and cancellation stop the whole
+    process group."""
+    on_line = on_line or _log_line(os.path.basename(cmd[0]))
+    start = time.monotonic()
+    proc = await asyncio.create_subprocess_exec(
+        *cmd, cwd=cwd, env=env, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE, start_new_session=sys.platform != "win32")
+    out, err, counter = deque(maxlen=TAIL_LINES), deque(maxlen=TAIL_LINES), [0]
+    pumps = asyncio.gather(_pump(proc.stdout, "stdout", out, on_line, counter),
+                           _pump(proc.stderr, "stderr", err, on_line, counter), proc.wait())
+    timed_out = False
+    try:
+        await asyncio.wait_for(asyncio.shield(pumps), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+    finally:
+        # timeout, cancellation or a failing callback: don't leave the process behind
+        if proc.returncode is None:
+            await _stop(proc)
+        if not pumps.done():
+            pumps.cancel()
+            try:
+                await pumps
+            except (asyncio.CancelledError, Exception):
+                pass
+    res = ProcResult(list(cmd), proc.returncode, time.monotonic() - start, counter[0], list(out), list(err))
+    if timed_out:
+        raise ProcessTimeout(f"{cmd[0]} timed out after {timeout:g}s", res)
+    if check and res.returncode != 0:
+        detail = "\n".join(res.stderr[-10:] or res.stdout[-10:])
+        raise ProcessError(f"{cmd[0]} exited with {res.returncode}" + (f":\n{detail}" if detail else ""), res)
+    return res
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+def _ensure_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="proc-runner", daemon=True).start()
+    return _loop
+
+def run(cmd: List[str], cwd: str | None = None, env: Dict[str, str] | None = None, timeout: float | None = None,
+        on_line: Callable[[str, str], None] | None = None, check: bool = True) -> ProcResult:
+    """Blocking front for `arun`, callable from any thread (tools run on worker threads).
+
+    Processes from many threads share one event loop, so concurrent deploys and
+    test runs cost no extra threads. The result is noted on the current span.
+    """
+    fut = asyncio.run_coroutine_threadsafe(arun(cmd, cwd, env, timeout, on_line, check), _ensure_loop())
+    span = current_span()
+    try:
+        res = fut.result()
+    except ProcessError as e:
+        if span is not None:
+            span.set(exit_code=e.result.returncode, output_lines=e.result.lines)
+        raise
+    except BaseException:
+        # Ctrl-C or the run being torn down: stop the process too
+        fut.cancel()
+        raise
+    if span is not None:
+        span.set(exit_code=res.returncode, output_lines=res.lines)
+    return res
@@ -0,0 +1,78 @@
+import re, json, hashlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Tuple
+
+# {{name}} placeholders; single braces stay literal (role prompts quote JSON and code)
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+# fixed for a phase of a project, so a rendered prompt is byte-identical on every call
+VARIABLES = ("phase", "project_id", "goal", "context")
+SYSTEM = "You are a helpful project {{phase}}."
+
+class PromptError(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """A prompt split once into literal text and declared variables."""
+    name: str
+    source: str
+    parts: Tuple[str, ...]  # literal, variable, literal, ..., literal
+    variables: Tuple[str, ...]
+
+    @classmethod
+    def compile(cls, name: str, source: str, allowed: Iterable[str] = VARIABLES) -> "PromptTemplate":
+        parts = PLACEHOLDER.split(source or "")
+        unknown = sorted(set(parts[1::2]) - set(allowed))
+        if unknown:
+            raise PromptError(f"prompt '{name}': unknown variable(s) {', '.join(unknown)} "
+                              f"(available: {', '.join(allowed)})")
+        return cls(name, source or "", tuple(parts), tuple(dict.fromkeys(parts[1::2])))
+
+    def render(self, values: Dict[str, str]) -> str:
+        parts = list(self.parts)
+        parts[1::2] = [values[v] for v in parts[1::2]]
+        return "".join(parts)
+
+_SYSTEM = PromptTemplate.compile("system", SYSTEM)
+
+def compile_prompts(prompts: Dict[str, str]) -> Tuple[Dict[str, PromptTemplate], List[str]]:
+    """(templates, errors) for a role prompts file; templates with errors are left out."""
+    templates, errors = {}, []
+    for name, source in (prompts or {}).items():
+        try:
+            templates[name] = PromptTemplate.compile(name, source)
+        except PromptError as e:
+            errors.append(str(e))
+    return templates, errors
+
+@dataclass(frozen=True)
+class Prompt:
+    """A phase's messages up to the state: the same bytes on every call and every run, so
+    the provider can serve them from its prompt cache. The state always goes last."""
+    system: str
+    instructions: str
+    key: str  # digest of the prefix, sent as prompt_cache_key
+
+    @property
+    def text(self) -> str:
+        return f"{self.system}\n\n{self.instructions}"
+
+    def messages(self, state: str) -> List[Dict[str, str]]:
+        return [{"role": "system", "content": self.system},
+                {"role": "user", "content": self.instructions},
+                {"role": "user", "content": f"STATE:\n{state}"}]
+
+def build(template: PromptTemplate | str, phase: str, project=None) -> Prompt:
+    """Render a phase's prefix: system line, role prompt, then the project's goal and context."""
+    if isinstance(template, str):
+        template = PromptTemplate.compile(phase, template)
+    values = {"phase": phase, "project_id": "", "goal": "", "context": "{}"}
+    project_block = ""
+    if project is not None:
+        context = json.dumps(project.context or {}, sort_keys=True, ensure_ascii=False, default=str)
+        values.update(project_id=project.id, goal=project.goal, context=context)
+        project_block = f"\n\nPROJECT:\n{project.id}: {project.goal}" + (f"\n{context}" if project.context else "")
+    system = _SYSTEM.render(values)
+    instructions = template.render(values) + project_block
+    key = hashlib.sha256(f"{system}\0{instructions}".encode("utf-8")).hexdigest()[:32]
+    return Prompt(system, instructions, key)
@@ -0,0 +1,163 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+# a transition to one of these ends the phase's branch
+TERMINALS = ("done", "end", "finish")
+# traversals allowed per run for an edge on a cycle (a rework loop) without its own `limit`
+MAX_LOOPS = int(os.getenv("AGENT_MAX_LOOPS", "3"))
+# tasks raise on failure, so a phase that completes had all its tasks green
+ALIASES = {"all_tasks_green": "complete"}
+# a gate saying no with nowhere to go stops the run instead of quietly ending the branch
+FAILURES = ("rejected", "fail")
+
+def phase_events(phase) -> Tuple[str, ...]:
+    """Events a phase can end with; its gate decides which."""
+    gate = phase.gate
+    if gate is None:
+        return ("complete",)
+    if gate.type == "human_approval":
+        return ("approved", "rejected")
+    if gate.tools or gate.type == "automated_checks":
+        return ("pass", "fail")
+    return ("complete",)
+
+@dataclass(frozen=True)
+class Route:
+    target: Optional[str]  # None: the branch ends here
+    key: str  # "src->dst", the traversal counter in run state
+    limit: Optional[int] = None  # traversals per run; None: uncounted
+
+class RouteTable:
+    """Where each phase goes on each event, resolved once per compile.
+
+    Unmapped events end the phase's branch; a rejected or failed gate without a
+    transition halts the run. Transitions that close a cycle are rework loops and are
+    counted: once one was taken `limit` times the run halts there instead of
+    calling the LLM around the loop again. `errors`
+    lists transitions that can never fire or go nowhere, phases the first
+    phase cannot reach, and phases that can never finish.
+    """
+
+    def __init__(self, bp, max_loops: int = MAX_LOOPS):
+        self.routes: Dict[str, Dict[str, Route]] = {}
+        self.errors: List[str] = []
+        ids = {ph.id for ph in bp.phases}
+        pending: Dict[str, List[Tuple[str, Optional[str], Optional[int]]]] = {}
+        for ph in bp.phases:
+            events = phase_events(ph)
+            rows = pending[ph.id] = []
+            for key, t in (ph.transitions or {}).items():
+                target, limit = (t, None) if isinstance(t, str) else (t.to, t.limit)
+                event = ALIASES.get(key[3:], key[3:]) if key.startswith("on_") else None
+                if event not in events:
+                    self.errors.append(f"{ph.id}: transition '{key}' never fires "
+                                       f"(the phase ends with {', '.join('on_' + e for e in events)})")
+                elif target.lower() in TERMINALS:
+                    rows.append((event, None, limit))
+                elif target not in ids:
+                    self.errors.append(f"{ph.id}: transition '{key}' goes to unknown phase '{target}'")
+                elif limit is not None and limit < 1:
+                    self.errors.append(f"{ph.id}: transition '{key}' has limit {limit}; it must be at least 1")
+                else:
+                    rows.append((event, target, limit))
+        # successors: transitions, and dependents once their dependencies finished
+        succ: Dict[str, List[str]] = {ph.id: [t for _, t, _ in pending[ph.id] if t] for ph in bp.phases}
+        dependents = {ph.id: False for ph in bp.phases}
+        for ph in bp.phases:
+            for d in ph.depends_on:
+                succ[d].append(ph.id)
+                dependents[d] = True
+        # a rework loop is a transition back to an earlier (or the same) phase on a cycle;
+        # a cycle closed by a dependency instead has all its transitions counted
+        scc = _components(succ)
+        pos = {ph.id: i for i, ph in enumerate(bp.phases)}
+        looped = [(src, t) for src, rows in pending.items() for _, t, _ in rows if t and scc[t] == scc[src]]
+        closed = {scc[src] for src, t in looped if pos[t] <= pos[src]}
+        counted = {(src, t) for src, t in looped if pos[t] <= pos[src] or scc[src] not in closed}
+        self.loop_budget = 0
+        for ph in bp.phases:
+            table = self.routes[ph.id] = {}
+            for event, target, limit in pending[ph.id]:
+                if limit is None and (ph.id, target) in counted:
+                    limit = max_loops
+                if target is not None:
+                    self.loop_budget += limit or 0
+                table[event] = Route(target, f"{ph.id}->{target or 'done'}", limit)
+        if not bp.phases:
+            return
+        seen, stack = {bp.phases[0].id}, [bp.phases[0].id]
+        while stack:
+            for nxt in succ[stack.pop()]:
+                if nxt not in seen:
+                    seen.add(nxt)
+                    stack.append(nxt)
+        self.errors += [f"{ph.id}: unreachable from '{bp.phases[0].id}'" for ph in bp.phases if ph.id not in seen]
+        # a branch can end at a phase with an unmapped (or terminal) event and nothing depending on it
+        pred: Dict[str, List[str]] = {pid: [] for pid in succ}
+        for pid, nxts in succ.items():
+            for nxt in nxts:
+                pred[nxt].append(pid)
+        stack = [ph.id for ph in bp.phases if not dependents[ph.id] and any(
+            self.routes[ph.id].get(e) is None or self.routes[ph.id][e].target is None for e in phase_events(ph))]
+        finishes = set(stack)
+        while stack:
+            for prev in pred[stack.pop()]:
+                if prev not in finishes:
+                    finishes.add(prev)
+                    stack.append(prev)
+        self.errors += [f"{ph.id}: never finishes (every event loops back; add a transition to done)"
+                        for ph in bp.phases if ph.id in seen and ph.id not in finishes]
+
+    def targets(self, phase_id: str) -> Tuple[str, ...]:
+        return tuple(dict.fromkeys(r.target for r in self.routes[phase_id].values() if r.target))
+
+    def next(self, phase_id: str, event: str, loops: Dict[str, int]) -> Tuple[Optional[Route], Optional[str]]:
+        """(route to take or None, reason the run halts here or None)."""
+        route = self.routes[phase_id].get(event)
+        if route is None:
+            return None, f"gate {event}, no transition" if event in FAILURES else None
+        if route.target is None:
+            return None, None
+        if route.limit is not None and loops.get(route.key, 0) >= route.limit:
+            return None, f"loop {route.key} already taken {route.limit} time(s)"
+        return route, None
+
+def _components(succ: Dict[str, List[str]]) -> Dict[str, int]:
+    """Strongly connected component id per node (iterative Tarjan; blueprints can be long chains)."""
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    comp: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack = set()
+    for root in succ:
+        if root in index:
+            continue
+        work = [(root, iter(succ[root]))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, it = work[-1]
+            for nxt in it:
+                if nxt not in index:
+                    index[nxt] = low[nxt] = len(index)
+                    stack.append(nxt)
+                    on_stack.add(nxt)
+                    work.append((nxt, iter(succ[nxt])))
+                    break
+                if nxt in on_stack:
+                    low[node] = min(low[node], index[nxt])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        comp[member] = index[node]
+                        if member == node:
+                            break
+    return comp
@@ -0,0 +1,73 @@
+import os, json, threading
+from typing import Any, Callable, Dict, List, Tuple
+from .artifacts import read_file
+from .llm import count_tokens, truncate_tokens
+
+CONTEXT_TOKENS = int(os.getenv("AGENT_CONTEXT_TOKENS", "1500"))
+ARTIFACT_SUMMARY_TOKENS = int(os.getenv("AGENT_ARTIFACT_SUMMARY_TOKENS", "400"))
+# always sent, in this order; artifacts fill whatever budget is left
+CORE_FIELDS = ("phase", "ctx", "approvals", "events", "last_event")
+
+def _enc(value: Any) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def summarize_artifact(text: str, limit: int, model: str | None = None) -> str:
+    """Headings first (the outline survives), then body text, cut on a token boundary."""
+    lines = [l for l in text.splitlines() if l.strip()]
+    heads = [l for l in lines if l.lstrip().startswith("#")]
+    body = [l for l in lines if not l.lstrip().startswith("#")]
+    return truncate_tokens("\n".join(heads + body), limit, model)
+
+class StateContext:
+    """Builds the STATE block of a prompt as compact JSON within a token budget.
+
+    Each artifact is read, summarized and tokenized once, when the phase that
+    produced it first shows up in state; later phases only encode what is new.
+    Newest artifacts win when the budget runs out, and the JSON is always whole.
+    """
+
+    def __init__(self, budget: int = CONTEXT_TOKENS, summary_tokens: int = ARTIFACT_SUMMARY_TOKENS,
+                 model: str | None = None, read: Callable[[str], str] = read_file):
+        self.budget = budget
+        self.read = read
+        self.summary_tokens = summary_tokens
+        self.model = model
+        self._pieces: Dict[Tuple[str, str], Tuple[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def _artifact_piece(self, phase: str, path: str) -> Tuple[str, int]:
+        key = (phase, path)
+        with self._lock:
+            hit = self._pieces.get(key)
+        if hit is not None:
+            return hit
+        try:
+            text = self.read(path)
+        except OSError:
+            text = ""
+        piece = f"{_enc(phase)}:{_enc(summarize_artifact(text, self.summary_tokens, self.model))}"
+        hit = (piece, count_tokens(piece, self.model))
+        with self._lock:
+            self._pieces[key] = hit
+        return hit
+
+    def render(self, state: Dict[str, Any], budget: int | None = None) -> str:
+        budget = self.budget if budget is None else budget
+        core = [f"{_enc(k)}:{_enc(state[k])}" for k in CORE_FIELDS if state.get(k)]
+        used = count_tokens("{" + ",".join(core) + "}", self.model)
+        kept: List[str] = []
+        omitted: List[str] = []
+        artifacts = list((state.get("artifacts") or {}).items())
+        for phase, path in reversed(artifacts):
+            piece, n = self._artifact_piece(phase, path)
+            if used + n + 1 <= budget:
+                kept.append(piece)
+                used += n + 1
+            else:
+                omitted.append(phase)
+        parts = list(core)
+        if kept:
+            parts.append('"artifacts":{' + ",".join(reversed(kept)) + "}")
+        if omitted:
+            parts.append(f'"omitted_artifacts":{_enc(list(reversed(omitted)))}')
+        return "{" + ",".join(parts) + "}"
@@ -0,0 +1,240 @@
+import os, json, time, uuid, bisect, hashlib, pathlib, tempfile, threading, contextlib, contextvars
+from collections import defaultdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from . import io
+
+SERVICE_NAME = "ai-project-agent"
+# Prometheus histogram buckets for durations, in seconds
+BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_current: contextvars.ContextVar = contextvars.ContextVar("agent_span", default=None)
+_write_lock = threading.Lock()
+
+def _otlp_value(v: Any) -> Dict[str, Any]:
+    if isinstance(v, bool):
+        return {"boolValue": v}
+    if isinstance(v, int):
+        return {"intValue": str(v)}
+    if isinstance(v, float):
+        return {"doubleValue": v}
+    return {"stringValue": str(v)}
+
+def _from_otlp(v: Dict[str, Any]) -> Any:
+    if "intValue" in v:
+        return int(v["intValue"])
+    return next(iter(v.values()), None)
+
+def _attributes(attrs: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attrs.items() if v is not None]
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], start: int, attributes: Dict[str, Any]):
+        self.name, self.parent_id, self.start = name, parent_id, start
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = dict(attributes)
+        self.end: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set(self, **attrs):
+        self.attributes.update(attrs)
+
+    @property
+    def seconds(self) -> float:
+        return ((self.end or time.time_ns()) - self.start) / 1e9
+
+class Metrics:
+    """Process-wide counters and duration histograms in Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, tuple], float] = defaultdict(float)
+        self._hists: Dict[Tuple[str, tuple], List[float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None)))
+        with self._lock:
+            self._counters[key] += value
+
+    def observe(self, name: str, seconds: float, **labels):
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None)))
+        with self._lock:
+            # per-bucket counts (the last one is +Inf), then sum and count
+            h = self._hists.setdefault(key, [0.0] * (len(BUCKETS) + 3))
+            h[bisect.bisect_left(BUCKETS, seconds)] += 1
+            h[-2] += seconds
+            h[-1] += 1
+
+    def snapshot(self, reset: bool = False) -> Tuple[dict, dict]:
+        """(counters, histograms), picklable for merge() in another process."""
+        with self._lock:
+            snap = dict(self._counters), {k: list(h) for k, h in self._hists.items()}
+            if reset:
+                self._counters.clear()
+                self._hists.clear()
+        return snap
+
+    def merge(self, snap: Tuple[dict, dict]):
+        counters, hists = snap
+        with self._lock:
+            for key, value in counters.items():
+                self._counters[key] += value
+            for key, h in hists.items():
+                mine = self._hists.setdefault(key, [0.0] * len(h))
+                for i, n in enumerate(h):
+                    mine[i] += n
+
+    def render(self) -> str:
+        def fmt(labels, extra=()):
+            pairs = [*labels, *extra]
+            return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}" if pairs else ""
+        lines, seen = [], set()
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{fmt(labels)} {value:g}")
+            for (name, labels), h in sorted(self._hists.items()):
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                cum = 0.0
+                for bound, n in zip((*BUCKETS, "+Inf"), h[:-2]):
+                    cum += n
+                    lines.append(f"{name}_bucket{fmt(labels, [('le', bound)])} {cum:g}")
+                lines.append(f"{name}_sum{fmt(labels)} {h[-2]:.6f}")
+                lines.append(f"{name}_count{fmt(labels)} {h[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str | os.PathLike):
+        p = pathlib.Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        text = self.render()
+        # serve threads and batch processes share the target: each write gets its own temp file
+        with _write_lock:
+            fd, tmp = tempfile.mkstemp(dir=p.parent, prefix=p.name + ".", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                    fh.write(text)
+                os.chmod(tmp, 0o644)
+                os.replace(tmp, p)
+            except BaseException:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp)
+                raise
+
+METRICS = Metrics()
+
+class Tracer:
+    """Spans for one run, appended as OTLP/JSON lines (one export request per span).
+
+    The file can be fed to an OpenTelemetry collector's `otlpjsonfile` receiver;
+    every span's duration also lands in `agent_span_seconds` in METRICS.
+    """
+
+    def __init__(self, run_id: str, path: str | os.PathLike | None = None):
+        self.run_id = run_id
+        self.trace_id = hashlib.sha256(run_id.encode("utf-8")).hexdigest()[:32]
+        self.path = pathlib.Path(path) if path else None
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attrs) -> Iterator[Span]:
+        parent = _current.get()
+        s = Span(name, parent.span_id if parent else None, time.time_ns(), attrs)
+        token = _current.set(s)
+        try:
+            yield s
+        except BaseException as e:
+            s.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current.reset(token)
+            s.end = time.time_ns()
+            self._export(s)
+
+    def record(self, name: str, start: int, end: int, error: str | None = None, **attrs):
+        """Export an already-finished span (e.g. timed on another thread) under the current one."""
+        parent = _current.get()
+        s = Span(name, parent.span_id if parent else None, start, attrs)
+        s.end, s.error = end, error
+        self._export(s)
+
+    def _export(self, s: Span):
+        METRICS.observe("agent_span_seconds", s.seconds, span=s.name, phase=s.attributes.get("phase"))
+        if self.path is None:
+            return
+        span = {"traceId": self.trace_id, "spanId": s.span_id, "name": s.name, "kind": 1,
+                "startTimeUnixNano": str(s.start), "endTimeUnixNano": str(s.end),
+                "attributes": _attributes(s.attributes),
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1}}
+        if s.parent_id:
+            span["parentSpanId"] = s.parent_id
+        line = json.dumps({"resourceSpans": [{
+            "resource": {"attributes": _attributes({"service.name": SERVICE_NAME, "run.id": self.run_id})},
+            "scopeSpans": [{"scope": {"name": "src.orchestrator"}, "spans": [span]}]}]},
+            separators=(",", ":"))
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(line + "\n")
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def load_spans(path: str | os.PathLike, run_id: str | None = None) -> List[Dict[str, Any]]:
+    """Flatten a trace file into span dicts; without run_id, only the newest run's spans."""
+    spans = []
+    for line in pathlib.Path(path).read_text(encoding="utf-8").splitlines():
+        if not line.strip():
+            continue
+        for rs in json.loads(line).get("resourceSpans", []):
+            res = {a["key"]: _from_otlp(a["value"]) for a in rs.get("resource", {}).get("attributes", [])}
+            for ss in rs.get("scopeSpans", []):
+                for sp in ss.get("spans", []):
+                    spans.append({"run_id": res.get("run.id"), "name": sp["name"],
+                                  "seconds": (int(sp["endTimeUnixNano"]) - int(sp["startTimeUnixNano"])) / 1e9,
+                                  "error": sp.get("status", {}).get("message"),
+                                  **{a["key"]: _from_otlp(a["value"]) for a in sp.get("attributes", [])}})
+    if run_id is None and spans:
+        run_id = spans[-1]["run_id"]
+    return [s for s in spans if s["run_id"] == run_id]
+
+def phase_report(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-phase latency breakdown: wall time, LLM time/attempts/tokens (incl. prompt-cache hits)/cost,
+    tool time/calls, bytes."""
+    rows: Dict[str, Dict[str, Any]] = {}
+    for s in spans:
+        phase = s.get("phase")
+        if not phase:
+            continue
+        r = rows.setdefault(phase, {"phase": phase, "total_s": 0.0, "llm_s": 0.0, "attempts": 0, "retries": 0,
+                                    "tool_s": 0.0, "tool_calls": 0, "tokens_in": 0, "tokens_cached": 0, "tokens_out": 0,
+                                    "cost_usd": 0.0, "bytes": 0, "errors": 0})
+        if s["name"] == "phase":
+            r["total_s"] += s["seconds"]
+            r["bytes"] += s.get("bytes", 0)
+            r["cost_usd"] += s.get("cost_usd") or 0.0
+        elif s["name"] == "llm.attempt":
+            r["llm_s"] += s["seconds"]
+            r["attempts"] += 1
+            r["retries"] += 1 if s["error"] else 0
+            r["tokens_in"] += s.get("input_tokens", 0)
+            r["tokens_cached"] += s.get("cached_tokens") or 0
+            r["tokens_out"] += s.get("output_tokens", 0)
+        elif s["name"] == "tool":
+            r["tool_s"] += s["seconds"]
+            r["tool_calls"] += 1
+        if s["name"] == "phase" and s["error"]:
+            r["errors"] += 1
+    for r in rows.values():
+        for k in ("total_s", "llm_s", "tool_s"):
+            r[k] = round(r[k], 3)
+        r["cost_usd"] = round(r["cost_usd"], 6)
+    return list(rows.values())
+
+def format_report(rows: List[Dict[str, Any]]) -> str:
+    return io.format_table(rows, ("phase", "total_s", "llm_s", "attempts", "retries", "tool_s", "tool_calls",
+                                  "tokens_in", "tokens_cached", "tokens_out", "cost_usd", "bytes", "errors"))
@@ -0,0 +1,291 @@
+import os, json, time, sqlite3, pathlib, threading, uuid, glob
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from .runtime import io
+from .runtime.checkpoint import STATE_DIR, has_checkpoint, new_run_id
+from .runtime.tracing import METRICS
+
+# run_blueprint settings a submitted job may choose; the service owns the rest
+JOB_OPTIONS = ("approvals", "max_concurrency", "cache", "incremental")
+JOB_FIELDS = ("id", "blueprint", "prompts", "options", "status", "phase", "run_id", "error", "result",
+              "created_at", "started_at", "finished_at")
+
+class JobQueue:
+    """Durable FIFO of blueprint runs in SQLite; survives service restarts."""
+
+    def __init__(self, path: str | os.PathLike | None = None):
+        path = pathlib.Path(path or STATE_DIR / "jobs.sqlite")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY, blueprint TEXT, prompts TEXT, options TEXT, status TEXT,
+            phase TEXT, run_id TEXT, error TEXT, result TEXT,
+            created_at REAL, started_at REAL, finished_at REAL)""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at)")
+        self._lock = threading.Lock()
+        self.wakeup = threading.Event()
+
+    def _row(self, row) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(zip(JOB_FIELDS, row))
+        for k in ("options", "result"):
+            job[k] = json.loads(job[k]) if job[k] else None
+        return job
+
+    def submit(self, blueprint: str, prompts: str, options: Dict[str, Any] | None = None) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        with self._lock:
+            self._db.execute("INSERT INTO jobs (id, blueprint, prompts, options, status, created_at) "
+                             "VALUES (?,?,?,?, 'queued', ?)",
+                             (job_id, blueprint, prompts, json.dumps(options or {}), time.time()))
+        self.wakeup.set()
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT * FROM jobs WHERE status='queued' "
+                                       "ORDER BY created_at LIMIT 1").fetchone()
+                if row is None:
+                    return None
+                job = self._row(row)
+                # a job re-queued after a crash keeps its run id and resumes from checkpoints
+                job["run_id"] = job["run_id"] or new_run_id(pathlib.Path(job["blueprint"]).stem)
+                job["status"], job["started_at"] = "running", time.time()
+                self._db.execute("UPDATE jobs SET status='running', run_id=?, started_at=? WHERE id=?",
+                                 (job["run_id"], job["started_at"], job["id"]))
+            finally:
+                self._db.execute("COMMIT")
+        return job
+
+    def set_phase(self, job_id: str, phase: str):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET phase=? WHERE id=?", (phase, job_id))
+
+    def finish(self, job_id: str, result: Dict[str, Any] | None = None, error: str | None = None,
+               waiting: bool = False):
+        status = "failed" if error else "waiting" if waiting else "halted" if (result or {}).get("halted") else "done"
+        with self._lock:
+            # gate decisions are used once, by the run that just ended
+            self._db.execute("UPDATE jobs SET status=?, result=?, error=?, finished_at=?, "
+                             "options=json_remove(options, '$.decisions') WHERE id=?",
+                             (status, json.dumps(result, default=str) if result else None,
+                              error, time.time(), job_id))
+
+    def decide(self, job_id: str, phase: str, approved: bool) -> bool:
+        """Record a gate decision for a waiting job and queue it to resume; False if it is not
+        waiting at that phase. A waiting job holds no worker, only its row and checkpoint."""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._row(self._db.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone())
+                waiting = [g["phase"] for g in ((job or {}).get("result") or {}).get("waiting", [])]
+                if job is None or job["status"] not in ("waiting", "queued") or phase not in waiting:
+                    return False
+                options = job["options"] or {}
+                options.setdefault("decisions", {})[phase] = approved
+                self._db.execute("UPDATE jobs SET status='queued', options=? WHERE id=?",
+                                 (json.dumps(options), job_id))
+            finally:
+                self._db.execute("COMMIT")
+        self.wakeup.set()
+        return True
+
+    def requeue_running(self) -> int:
+        """Put jobs orphaned by a previous process back in the queue."""
+        with self._lock:
+            return self._db.execute("UPDATE jobs SET status='queued' WHERE status='running'").rowcount
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._row(self._db.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone())
+
+    def list(self, limit: int = 100) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def close(self):
+        self._db.close()
+
+def warm_up(blueprints: List[str], prompts: str):
+    """Pay one-off costs at startup so the first job runs at steady-state latency."""
+    from . import orchestrator
+    from .runtime import llm
+    from .tools.registry import load_tools
+    load_tools()
+    if os.getenv("OPENAI_API_KEY"):
+        llm.get_engine().client
+    llm.get_engine()._ensure_loop()
+    checkpointer = orchestrator.shared_checkpointer()
+    orchestrator.shared_ledger()
+    for bp in blueprints:
+        try:
+            orchestrator.get_graph(bp, prompts, checkpointer)
+        except Exception as e:
+            io.log(f"warm-up skipped {bp}: {e}")
+
+class Service:
+    def __init__(self, queue: JobQueue, workers: int = 2, prompts: str = "prompts/role_prompts.yaml"):
+        self.queue = queue
+        self.workers = workers
+        self.prompts = prompts
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _run_job(self, job: Dict[str, Any]):
+        from .orchestrator import pending_gates, run_blueprint
+        opts = dict(job["options"] or {})
+        decisions = opts.pop("decisions", None)
+        on_phase = lambda phase: self.queue.set_phase(job["id"], phase)
+        io.log(f"job {job['id']}: {job['blueprint']} (run {job['run_id']})")
+        try:
+            # re-queued after a restart or a gate decision: continue from the checkpoint
+            if has_checkpoint(job["run_id"]):
+                result = run_blueprint(job["blueprint"], job["prompts"], resume=job["run_id"],
+                                       on_phase=on_phase, decisions=decisions, **opts)
+            else:
+                result = run_blueprint(job["blueprint"], job["prompts"], run_id=job["run_id"],
+                                       on_phase=on_phase, **opts)
+        except Exception as e:
+            self.queue.finish(job["id"], error=f"{type(e).__name__}: {e}")
+            return
+        waiting = pending_gates(result)
+        out = {k: result.get(k) for k in ("artifacts", "events", "metrics")}
+        if result.get("halted"):
+            io.log(f"job {job['id']}: halted at {result['halted']}")
+            out["halted"] = result["halted"]
+        if waiting:
+            io.log(f"job {job['id']}: waiting at " + ", ".join(g["phase"] for g in waiting))
+            out["waiting"] = waiting
+        self.queue.finish(job["id"], out, waiting=bool(waiting))
+
+    def _worker(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self.queue.wakeup.wait(1.0)
+                self.queue.wakeup.clear()
+                continue
+            self._run_job(job)
+
+    def start(self):
+        n = self.queue.requeue_running()
+        if n:
+            io.log(f"re-queued {n} interrupted job(s)")
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self):
+        self._stop.set()
+        self.queue.wakeup.set()
+
+def make_handler(service: Service):
+    queue = service.queue
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, payload: Any):
+            data = json.dumps(payload, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+            if parts == ["metrics"]:
+                data = METRICS.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                return self.wfile.write(data)
+            if parts == ["health"]:
+                return self._send(200, {"status": "ok", "workers": service.workers, "jobs": queue.counts()})
+            if parts == ["jobs"]:
+                return self._send(200, queue.list())
+            if len(parts) == 2 and parts[0] == "jobs":
+                job = queue.get(parts[1])
+                return self._send(200, job) if job else self._send(404, {"error": "no such job"})
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            parts = [p for p in self.path.split("?")[0].split("/") if p]
+            if len(parts) == 3 and parts[0] == "jobs" and parts[2] == "approve":
+                return self._approve(parts[1])
+            if parts != ["jobs"]:
+                return self._send(404, {"error": "not found"})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                blueprint = body["blueprint"]
+            except (ValueError, KeyError):
+                return self._send(400, {"error": "expected JSON with a 'blueprint' path"})
+            if not pathlib.Path(blueprint).is_file():
+                return self._send(400, {"error": f"blueprint not found: {blueprint}"})
+            options = body.get("options") or {}
+            if not isinstance(options, dict):
+                return self._send(400, {"error": "options must be an object"})
+            unknown = sorted(set(options) - set(JOB_OPTIONS))
+            if unknown:
+                return self._send(400, {"error": f"unknown option(s) {', '.join(unknown)} "
+                                                 f"(allowed: {', '.join(JOB_OPTIONS)})"})
+            job_id = queue.submit(blueprint, body.get("prompts") or service.prompts, options)
+            self._send(202, {"id": job_id, "status": "queued"})
+
+        def _approve(self, job_id: str):
+            # webhook for reviewers and CI: {"phase": "review", "approved": false}
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                phase = body["phase"]
+            except (ValueError, KeyError):
+                return self._send(400, {"error": "expected JSON with a 'phase'"})
+            if not queue.decide(job_id, phase, bool(body.get("approved", True))):
+                return self._send(409, {"error": f"job {job_id} is not waiting at {phase}"})
+            self._send(202, {"id": job_id, "status": "queued"})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        conn, _ = super().get_request()
+        return conn, ("unix", 0)
+
+def make_server(service: Service, host: str = "127.0.0.1", port: int = 8765, socket_path: str | None = None):
+    handler = make_handler(service)
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        return _UnixHTTPServer(socket_path, handler)
+    return ThreadingHTTPServer((host, port), handler)
+
+def serve(host: str, port: int, socket_path: str | None, workers: int, prompts: str,
+          queue_path: str | None = None, warm: str | None = None):
+    warm_up(sorted(glob.glob(warm)) if warm else [], prompts)
+    service = Service(JobQueue(queue_path), workers=workers, prompts=prompts)
+    service.start()
+    server = make_server(service, host, port, socket_path)
+    where = socket_path or f"http://{host}:{server.server_address[1]}"
+    io.log(f"serving on {where} with {workers} worker(s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.stop()
+        server.server_close()
@@ -0,0 +1,84 @@
+# Built-in tools. Implementations are imported lazily so validating a
+# blueprint only needs the schemas declared here.
+import os
+from .registry import tool
+
+def _read_artifact(state, ctx, phase, name: str) -> str:
+    if not state or not phase or phase not in state.get("artifacts", {}):
+        raise RuntimeError(f"{name} needs phase=<id> and an existing artifact in state")
+    # the run's store usually still holds the text in memory
+    if ctx is not None:
+        return ctx.artifacts.read(state["artifacts"][phase])
+    from ..runtime.artifacts import read_file
+    return read_file(state["artifacts"][phase])
+
+def _github(ctx):
+    # one client per run when called from the graph (cached refs), else a fresh view
+    if ctx is not None:
+        return ctx.github()
+    from .github_api import GitHub
+    return GitHub()
+
+# --- Built-in stubs
+@tool("doc.create", args={"name": str, "body": str}, positional="name")
+def doc_create(a, state, ctx):
+    from . import tool_stubs
+    return tool_stubs.doc_create(a.get("name", "note.md"), a.get("body", "Draft"),
+                                 store=ctx.artifacts if ctx is not None else None)
+
+@tool("ci.run_tests", args={"cmd": str, "cwd": str, "timeout": int}, positional="cmd")
+def ci_run_tests(a, state, ctx):
+    # a real command (here or $AGENT_CI_COMMAND) runs through the subprocess runner; else the stub
+    cmd = a.get("cmd") or os.getenv("AGENT_CI_COMMAND")
+    if not cmd:
+        from . import tool_stubs
+        return tool_stubs.ci_run_tests()
+    from . import ci
+    return ci.run_tests(cmd, cwd=a.get("cwd", "."), timeout=a.get("timeout"))
+
+@tool("lighthouse.audit", args={"url": str}, positional="url")
+def lighthouse_audit(a, state, ctx):
+    from . import tool_stubs
+    return tool_stubs.lighthouse_audit(a.get("url", "https://example.com"))
+
+# --- GitHub tools (require env: GITHUB_TOKEN, GITHUB_OWNER, GITHUB_REPO)
+@tool("github.create_issue", args={"title": str, "body": str}, side_effects=True)
+def github_create_issue(a, state, ctx):
+    return _github(ctx).create_issue(title=a.get("title") or "Task", body=a.get("body", ""))
+
+@tool("github.create_branch", args={"name": str, "from": str}, side_effects=True)
+def github_create_branch(a, state, ctx):
+    return _github(ctx).create_branch(new_branch=a.get("name", "feature"), from_branch=a.get("from", "main"))
+
+@tool("github.commit_artifact", args={"phase": str, "path": str, "branch": str, "message": str},
+      required=("phase",), side_effects=True)
+def github_commit_artifact(a, state, ctx):
+    # commit the artifact produced by a phase into repo at path
+    phase = a["phase"]
+    content = _read_artifact(state, ctx, phase, "github.commit_artifact")
+    return _github(ctx).commit_file(a.get("path", f"{phase}.md"), content,
+                                    a.get("message", f"chore: add artifact {phase}"), a.get("branch", "feature"))
+
+@tool("github.commit_artifacts", args={"phases": list, "dir": str, "paths": list, "branch": str, "message": str},
+      required=("phases",), side_effects=True)
+def github_commit_artifacts(a, state, ctx):
+    # several phases' artifacts in a single commit:
+    # phases=design,implement|dir=docs|paths=design:docs/spec.md|branch=..|message=..
+    folder = a.get("dir", "docs").rstrip("/")
+    paths = dict(p.split(":", 1) for p in a.get("paths", []) if ":" in p)
+    files = {paths.get(ph, f"{folder}/{ph}.md"): _read_artifact(state, ctx, ph, "github.commit_artifacts")
+             for ph in a["phases"]}
+    msg = a.get("message", f"chore: add artifacts {', '.join(a['phases'])}")
+    return _github(ctx).commit_files(files, msg, a.get("branch", "feature"))
+
+@tool("github.open_pr", args={"title": str, "head": str, "base": str, "body": str}, side_effects=True)
+def github_open_pr(a, state, ctx):
+    return _github(ctx).create_pr(title=a.get("title", "Automated PR"), head=a.get("head", "feature"),
+                                  base=a.get("base", "main"), body=a.get("body", ""))
+
+# --- Deploy tools
+@tool("deploy.vercel", args={"cwd": str, "prod": bool, "timeout": int}, side_effects=True)
+def deploy_vercel(a, state, ctx):
+    from . import deploy
+    return deploy.vercel_deploy(cwd=a.get("cwd", "."), prod=a.get("prod", True),
+                                timeout=a.get("timeout", deploy.TIMEOUT))
@@ -0,0 +1,15 @@
+import os, shlex
+from ..runtime import io, proc
+
+TIMEOUT = float(os.getenv("AGENT_CI_TIMEOUT_S", "1800"))
+
+def run_tests(cmd: str, cwd: str = ".", timeout: float | None = None):
+    io.log(f"Running: {cmd} in {cwd}")
+    res = proc.run(shlex.split(cmd), cwd=cwd, timeout=timeout or TIMEOUT, check=False)
+    status = "green" if res.returncode == 0 else "red"
+    io.log(f"ci.run_tests -> {status} ({res.seconds:.1f}s)")
+    # red is a result, not an error: a gate turns it into `fail`, a task into a failed phase
+    out = {"status": status, "seconds": round(res.seconds, 1)}
+    if status == "red":
+        out.update(exit_code=res.returncode, output=(res.stderr[-20:] + res.stdout[-20:])[-20:])
+    return out
@@ -1,7 +1,9 @@
-import os, subprocess, shutil
-from ..runtime import io
+import os, shutil
+from ..runtime import io, proc
 
-def vercel_deploy(cwd: str = ".", prod: bool = True):
+TIMEOUT = float(os.getenv("AGENT_DEPLOY_TIMEOUT_S", "900"))
+
+def vercel_deploy(cwd: str = ".", prod: bool = True, timeout: float = TIMEOUT):
     token = os.getenv("VERCEL_TOKEN")
     if not token:
         raise RuntimeError("VERCEL_TOKEN is required for deploy.vercel")
@@ -10,9 +12,9 @@ def vercel_deploy(cwd: str = ".", prod: bool = True):
     cmd = ["vercel", "--token", token, "-y"]
     if prod:
         cmd.append("--prod")
-    io.log(f"Running: {' '.join(cmd)} in {cwd}")
-    res = subprocess.run(cmd, cwd=cwd, capture_output=True, text=True)
-    io.log(res.stdout.strip())
-    if res.returncode != 0:
-        raise RuntimeError(res.stderr.strip())
-    return {"ok": True}
+    io.log(f"Running: vercel -y{' --prod' if prod else ''} in {cwd}")
+    # output is streamed to the log line by line; only the tail is kept
+    res = proc.run(cmd, cwd=cwd, timeout=timeout or None)
+    # vercel prints the deployment URL as the last line of stdout
+    url = next((l.strip() for l in reversed(res.stdout) if l.strip().startswith("https://")), None)
+    return {"ok": True, "url": url, "seconds": round(res.seconds, 1)}
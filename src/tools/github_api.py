@@ -1,42 +1,170 @@
-import os, base64, json, typing as t
+import os, time, base64, json, random, threading, typing as t
+from collections import OrderedDict
+from urllib.parse import urlencode
 import requests
+from requests.adapters import HTTPAdapter
 
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_OWNER = os.getenv("GITHUB_OWNER")
 GITHUB_REPO  = os.getenv("GITHUB_REPO")
 
-API = "https://api.github.com"
+API = os.getenv("GITHUB_API_URL", "https://api.github.com")
+MAX_RETRIES = int(os.getenv("GITHUB_MAX_RETRIES", "4"))
+POOL_SIZE = int(os.getenv("GITHUB_POOL_SIZE", "16"))
+# start pacing requests when fewer than this many remain in the rate-limit window
+MIN_REMAINING = int(os.getenv("GITHUB_MIN_REMAINING", "50"))
+ETAG_CACHE_SIZE = 512
+# a 5xx may come after the write went through: replaying a PUT/PATCH with a stale
+# sha or ref fails (409/422) or repeats it, so only reads are retried on 5xx
+RETRY_5XX = ("GET", "HEAD")
+
+class GitHubSession(requests.Session):
+    """Keep-alive session with ETag caching, rate-limit pacing and retries.
+
+    GETs are sent with If-None-Match when we hold an ETag; a 304 returns the
+    cached response and does not count against the primary rate limit.
+    Secondary/abuse limits (403/429) are retried after Retry-After, and 5xx on
+    GET/HEAD requests with jittered backoff.
+    """
+
+    def __init__(self, max_retries: int = MAX_RETRIES, pool_size: int = POOL_SIZE,
+                 min_remaining: int = MIN_REMAINING, sleep: t.Callable[[float], None] = time.sleep):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.max_retries = max_retries
+        self.min_remaining = min_remaining
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._etags: OrderedDict[str, tuple[str, requests.Response]] = OrderedDict()
+        self.remaining: int | None = None
+        self.reset_at: float | None = None
+        self.stats = {"requests": 0, "not_modified": 0, "retries": 0, "throttled": 0}
+
+    def _throttle(self):
+        with self._lock:
+            remaining, reset_at = self.remaining, self.reset_at
+        if remaining is None or reset_at is None or remaining >= self.min_remaining:
+            return
+        window = reset_at - time.time()
+        if window <= 0:
+            return
+        # spread what is left of the window; wait it out entirely once exhausted
+        delay = window if remaining <= 0 else window / remaining
+        self.stats["throttled"] += 1
+        self._sleep(delay)
+
+    def _record_limits(self, r: requests.Response):
+        rem, reset = r.headers.get("X-RateLimit-Remaining"), r.headers.get("X-RateLimit-Reset")
+        if rem is not None and reset is not None:
+            with self._lock:
+                self.remaining, self.reset_at = int(rem), float(reset)
+
+    def _rate_limited_wait(self, r: requests.Response) -> float | None:
+        if r.status_code not in (403, 429):
+            return None
+        if r.headers.get("Retry-After"):
+            return float(r.headers["Retry-After"])
+        if r.headers.get("X-RateLimit-Remaining") == "0" and r.headers.get("X-RateLimit-Reset"):
+            return max(0.0, float(r.headers["X-RateLimit-Reset"]) - time.time()) + 1
+        text = r.text.lower()
+        if "secondary rate limit" in text or "abuse" in text:
+            return 60.0
+        return None
+
+    def request(self, method, url, params=None, headers=None, **kwargs):
+        method = method.upper()
+        key = f"{url}?{urlencode(sorted((params or {}).items()))}" if method == "GET" else None
+        headers = dict(headers or {})
+        cached = None
+        if key:
+            with self._lock:
+                cached = self._etags.get(key)
+            if cached:
+                headers["If-None-Match"] = cached[0]
+        for attempt in range(self.max_retries + 1):
+            self._throttle()
+            try:
+                r = super().request(method, url, params=params, headers=headers, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                self.stats["retries"] += 1
+                self._sleep(random.uniform(0, 2 ** attempt))
+                continue
+            self.stats["requests"] += 1
+            self._record_limits(r)
+            wait = self._rate_limited_wait(r)
+            if wait is None and r.status_code >= 500 and method in RETRY_5XX:
+                wait = random.uniform(0, 2 ** attempt)
+            if wait is not None and attempt < self.max_retries:
+                self.stats["retries"] += 1
+                self._sleep(wait)
+                continue
+            break
+        if key and r.status_code == 304 and cached:
+            self.stats["not_modified"] += 1
+            return cached[1]
+        if key and r.status_code == 200 and r.headers.get("ETag"):
+            with self._lock:
+                self._etags[key] = (r.headers["ETag"], r)
+                self._etags.move_to_end(key)
+                while len(self._etags) > ETAG_CACHE_SIZE:
+                    self._etags.popitem(last=False)
+        return r
+
+_sessions: dict[tuple, GitHubSession] = {}
+_sessions_lock = threading.Lock()
+
+def shared_session(token: str, owner: str, repo: str, api: str = API) -> GitHubSession:
+    """Process-wide session per (token, owner, repo): one connection pool and rate budget."""
+    key = (token, owner, repo, api)
+    with _sessions_lock:
+        if key not in _sessions:
+            sess = GitHubSession()
+            sess.headers.update({
+                "Authorization": f"Bearer {token}",
+                "Accept": "application/vnd.github+json",
+                "X-GitHub-Api-Version": "2022-11-28"
+            })
+            _sessions[key] = sess
+        return _sessions[key]
 
 class GitHub:
-    def __init__(self, token: str | None = None, owner: str | None = None, repo: str | None = None):
+    def __init__(self, token: str | None = None, owner: str | None = None, repo: str | None = None,
+                 api: str = API):
         self.token = token or GITHUB_TOKEN
         self.owner = owner or GITHUB_OWNER
         self.repo  = repo or GITHUB_REPO
+        self.api = api
         if not self.token:
             raise RuntimeError("GITHUB_TOKEN is required")
         if not self.owner or not self.repo:
             raise RuntimeError("GITHUB_OWNER and GITHUB_REPO are required")
-        self.session = requests.Session()
-        self.session.headers.update({
-            "Authorization": f"Bearer {self.token}",
-            "Accept": "application/vnd.github+json",
-            "X-GitHub-Api-Version": "2022-11-28"
-        })
+        self.session = shared_session(self.token, self.owner, self.repo, self.api)
+        # lookups cached for the lifetime of this client (one per run)
+        self._default_branch: str | None = None
+        self._branch_sha: dict[str, str] = {}
 
     # --- helpers
     def _url(self, path: str) -> str:
-        return f"{API}/repos/{self.owner}/{self.repo}{path}"
+        return f"{self.api}/repos/{self.owner}/{self.repo}{path}"
 
     def get_default_branch(self) -> str:
-        r = self.session.get(self._url(""))
-        r.raise_for_status()
-        return r.json().get("default_branch", "main")
+        if self._default_branch is None:
+            r = self.session.get(self._url(""))
+            r.raise_for_status()
+            self._default_branch = r.json().get("default_branch", "main")
+        return self._default_branch
 
     # --- branches
-    def get_branch_sha(self, branch: str) -> str:
-        r = self.session.get(self._url(f"/git/ref/heads/{branch}"))
-        r.raise_for_status()
-        return r.json()["object"]["sha"]
+    def get_branch_sha(self, branch: str, fresh: bool = False) -> str:
+        if fresh or branch not in self._branch_sha:
+            r = self.session.get(self._url(f"/git/ref/heads/{branch}"))
+            r.raise_for_status()
+            self._branch_sha[branch] = r.json()["object"]["sha"]
+        return self._branch_sha[branch]
 
     def create_branch(self, new_branch: str, from_branch: str | None = None) -> dict:
         from_branch = from_branch or self.get_default_branch()
@@ -45,6 +173,7 @@ class GitHub:
         if r.status_code == 422 and "Reference already exists" in r.text:
             return {"message": "exists", "ref": new_branch}
         r.raise_for_status()
+        self._branch_sha[new_branch] = sha
         return r.json()
 
     # --- contents
@@ -58,8 +187,30 @@ class GitHub:
             payload["sha"] = sha
         r = self.session.put(self._url(f"/contents/{path}"), json=payload)
         r.raise_for_status()
+        self._branch_sha.pop(branch, None)
         return r.json()
 
+    def commit_files(self, files: dict[str, str], message: str, branch: str) -> dict:
+        """Commit many files at once: one tree, one commit, one ref update."""
+        head = self.get_branch_sha(branch)
+        r = self.session.get(self._url(f"/git/commits/{head}"))
+        r.raise_for_status()
+        base_tree = r.json()["tree"]["sha"]
+        entries = [{"path": p, "mode": "100644", "type": "blob", "content": c} for p, c in files.items()]
+        r = self.session.post(self._url("/git/trees"), json={"base_tree": base_tree, "tree": entries})
+        r.raise_for_status()
+        tree = r.json()["sha"]
+        r = self.session.post(self._url("/git/commits"), json={"message": message, "tree": tree, "parents": [head]})
+        r.raise_for_status()
+        commit = r.json()
+        r = self.session.patch(self._url(f"/git/refs/heads/{branch}"), json={"sha": commit["sha"]})
+        if r.status_code == 422:
+            # branch moved under us; drop the cached head so a retry starts fresh
+            self._branch_sha.pop(branch, None)
+        r.raise_for_status()
+        self._branch_sha[branch] = commit["sha"]
+        return commit
+
     # --- issues & PRs
     def create_issue(self, title: str, body: str = "") -> dict:
         r = self.session.post(self._url("/issues"), json={"title": title, "body": body})
@@ -0,0 +1,119 @@
+# Tool registry: specs like "github.open_pr:title=x|head=y" are parsed and
+# checked against each tool's declared arguments once, when the graph is
+# compiled, and dispatched at run time without re-parsing.
+#
+# Plugins register extra tools through the `ai_project_agent.tools` entry
+# point group; each entry point resolves to a `Tool` or an iterable of them.
+import threading
+from dataclasses import dataclass, field
+from importlib.metadata import entry_points
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+ENTRY_POINT_GROUP = "ai_project_agent.tools"
+
+class ToolSpecError(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class Tool:
+    name: str
+    fn: Callable[..., Any]  # fn(args, state, ctx)
+    args: Mapping[str, type] = field(default_factory=dict)
+    required: Tuple[str, ...] = ()
+    positional: Optional[str] = None  # key for a bare value, e.g. "doc.create:spec.md"
+    side_effects: bool = False  # external effects; recorded for idempotent resume
+
+@dataclass(frozen=True)
+class ToolCall:
+    spec: str
+    tool: Tool
+    args: Mapping[str, Any]
+
+    def __call__(self, state=None, ctx=None):
+        return self.tool.fn(self.args, state, ctx)
+
+TOOLS: Dict[str, Tool] = {}
+_loaded = False
+_load_lock = threading.Lock()
+
+def register(t: Tool) -> Tool:
+    TOOLS[t.name] = t
+    return t
+
+def tool(name: str, **schema):
+    """Decorator form of `register` for functions taking (args, state, ctx)."""
+    def deco(fn):
+        register(Tool(name, fn, **schema))
+        return fn
+    return deco
+
+def load_tools():
+    global _loaded
+    with _load_lock:
+        if _loaded:
+            return
+        from . import builtin  # noqa: F401  (registers on import)
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            obj = ep.load()
+            for t in ([obj] if isinstance(obj, Tool) else obj):
+                register(t)
+        _loaded = True
+
+def _coerce(typ: type, raw: Any) -> Any:
+    if typ is bool:
+        return raw if isinstance(raw, bool) else str(raw).lower() in ("1", "true", "yes")
+    if raw is True:
+        raise ValueError("a value is required")
+    if typ is int:
+        return int(raw)
+    if typ is list:
+        return [p.strip() for p in str(raw).split(",") if p.strip()]
+    return str(raw)
+
+def parse_call(spec: str) -> ToolCall:
+    """Parse "name:k1=v1|k2=v2|bare" and validate it against the tool's schema."""
+    load_tools()
+    name, _, argstr = spec.partition(":")
+    name = name.strip()
+    t = TOOLS.get(name)
+    if t is None:
+        raise ToolSpecError(f"unknown tool '{name}' in '{spec}'")
+    args: Dict[str, Any] = {}
+    for part in (p.strip() for p in argstr.split("|")):
+        if not part:
+            continue
+        if "=" in part:
+            k, v = (x.strip() for x in part.split("=", 1))
+        elif t.positional and t.positional not in args:
+            k, v = t.positional, part
+        else:
+            k, v = part, True
+        if k not in t.args:
+            raise ToolSpecError(f"{name}: unexpected argument '{k}' in '{spec}'")
+        try:
+            args[k] = _coerce(t.args[k], v)
+        except ValueError as e:
+            raise ToolSpecError(f"{name}: bad value for '{k}' in '{spec}': {e}") from None
+    missing = [k for k in t.required if k not in args]
+    if missing:
+        raise ToolSpecError(f"{name}: missing required argument(s) {', '.join(missing)} in '{spec}'")
+    return ToolCall(spec, t, MappingProxyType(args))
+
+def blueprint_specs(bp) -> Iterable[Tuple[str, str]]:
+    for ph in bp.phases:
+        for t in ph.tasks:
+            for spec in t.tool_calls:
+                yield f"{ph.id}.{t.id}", spec
+        for spec in (ph.gate.tools if ph.gate else []):
+            yield f"{ph.id}.gate", spec
+
+def validate_tools(bp) -> List[str]:
+    """Every tool spec problem in the blueprint, as 'phase.task: message'."""
+    errors = []
+    for where, spec in blueprint_specs(bp):
+        try:
+            parse_call(spec)
+        except ToolSpecError as e:
+            errors.append(f"{where}: {e}")
+    return errors
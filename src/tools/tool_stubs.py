@@ -1,8 +1,8 @@
 # Replace these with real MCP/connector calls.
 from ..runtime import io
 
-def doc_create(name: str, body: str = "Draft"):
-    path = io.write_artifact(name, body)
+def doc_create(name: str, body: str = "Draft", store=None):
+    path = store.put(name, body) if store is not None else io.write_artifact(name, body)
     io.log(f"doc.create -> {path}")
     return path
 
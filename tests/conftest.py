@@ -0,0 +1,104 @@
+import dataclasses, json, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import yaml
+
+class StubServer:
+    """Local HTTP server; `handler(method, path, headers, body)` -> (status, headers, body)."""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        stub = self
+
+        class H(BaseHTTPRequestHandler):
+            def _serve(self):
+                n = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(n) if n else b""
+                body = json.loads(raw) if raw else None
+                stub.requests.append((self.command, self.path, dict(self.headers), body))
+                status, headers, payload = stub.handler(self.command, self.path, self.headers, body)
+                data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+                headers = {"Content-Type": "application/json", **(headers or {})}
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, str(v))
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _serve
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), H)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def stub_server():
+    servers = []
+    def start(handler):
+        servers.append(StubServer(handler))
+        return servers[-1]
+    yield start
+    for s in servers:
+        s.close()
+
+@pytest.fixture
+def run_env(tmp_path, monkeypatch):
+    """Factory for an orchestrator run in tmp_path (the cwd, so run_artifacts/ lands there).
+
+    run_env(blueprint, prompts, ...) writes bp.yaml and prompts.yaml. `prompt=True` fakes
+    run_prompt with "out <phase> <role prompt>", a callable replaces it; `tools` maps names
+    to a registry.Tool, or to a fn for a built-in tool; `run_id` pins new_run_id.
+    Returns the phases the fake prompt ran for.
+    """
+    def make(blueprint, prompts, *, prompt=False, tools=None, run_id=None, offline=False):
+        from src import orchestrator
+        from src.tools import registry
+        monkeypatch.chdir(tmp_path)
+        (tmp_path / "run_artifacts").mkdir(exist_ok=True)
+        (tmp_path / "bp.yaml").write_text(yaml.safe_dump(blueprint))
+        (tmp_path / "prompts.yaml").write_text(yaml.safe_dump(prompts))
+        if offline:
+            monkeypatch.setenv("OPENAI_OFFLINE", "1")
+        prompted = []
+        if prompt is True:
+            def prompt(role_prompt, state, *args, **kwargs):
+                prompted.append(state["phase"])
+                return f"out {state['phase']} {role_prompt}"
+        if prompt:
+            monkeypatch.setattr(orchestrator, "run_prompt", prompt)
+        registry.load_tools()
+        for name, tool in (tools or {}).items():
+            if not isinstance(tool, registry.Tool):
+                tool = dataclasses.replace(registry.TOOLS[name], fn=tool)
+            monkeypatch.setitem(registry.TOOLS, name, tool)
+        if run_id:
+            monkeypatch.setattr(orchestrator, "new_run_id", lambda project_id: run_id)
+        return prompted
+    return make
+
+def openai_response(text: str, input_tokens: int = 10, output_tokens: int = 5, cached_tokens: int = 0) -> dict:
+    return {
+        "id": "resp_test", "object": "response", "created_at": 0, "model": "fake-model",
+        "status": "completed", "parallel_tool_calls": False, "tool_choice": "auto", "tools": [],
+        "output": [{"type": "message", "id": "msg_test", "role": "assistant", "status": "completed",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}]}],
+        "usage": {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                  "total_tokens": input_tokens + output_tokens,
+                  "input_tokens_details": {"cached_tokens": cached_tokens},
+                  "output_tokens_details": {"reasoning_tokens": 0}},
+    }
+
+def openai_sse(chunks, **usage) -> bytes:
+    """Server-sent events for a streamed Responses API call emitting `chunks`."""
+    events = [{"type": "response.output_text.delta", "item_id": "msg_test", "output_index": 0,
+               "content_index": 0, "delta": c, "logprobs": []} for c in chunks]
+    events.append({"type": "response.completed", "response": openai_response("".join(chunks), **usage)})
+    return "".join(f"data: {json.dumps(dict(e, sequence_number=i))}\n\n" for i, e in enumerate(events)).encode()
@@ -0,0 +1,92 @@
+import gzip, os, pathlib, shutil, time
+import pytest
+from src.runtime import io
+from src.runtime.artifacts import ArtifactStore, gc, read_file
+
+def test_put_dedupes_across_runs(tmp_path):
+    a, b = ArtifactStore("run-a", root=tmp_path), ArtifactStore("run-b", root=tmp_path)
+    pa, pb = a.put("design.md", "# Design\n"), b.put("design.md", "# Design\n")
+    a.close(), b.close()
+    assert pathlib.Path(pa).parent.name == "run-a" and pathlib.Path(pb).parent.name == "run-b"
+    assert pathlib.Path(pa).name == pathlib.Path(pb).name
+    assert os.path.samefile(pa, pb)
+    assert a.stats["deduped"] + b.stats["deduped"] == 1
+    assert len([p for p in (tmp_path / ".objects").rglob("*") if p.is_file()]) == 1
+
+def test_read_served_from_memory_until_evicted(tmp_path):
+    store = ArtifactStore("r", root=tmp_path, cache_bytes=10)
+    path = store.put("a.md", "x" * 8)
+    assert store.read(path) == "x" * 8
+    store.put("b.md", "y" * 8)
+    store.wait()
+    assert store.read(path) == "x" * 8
+    assert store.stats["cache_hits"] == 1 and store.stats["disk_reads"] == 1
+
+def test_gzip_compression_round_trip(tmp_path):
+    store = ArtifactStore("r", root=tmp_path, compression="gzip")
+    text = "# Spec\n" + "lorem ipsum " * 500
+    path = store.put("spec.md", text)
+    store.close()
+    assert path.endswith(".md.gz")
+    assert gzip.decompress(pathlib.Path(path).read_bytes()).decode() == text
+    assert read_file(path) == text
+    assert store.stats["stored_bytes"] < len(text) / 10
+
+def test_stream_hands_text_to_store(tmp_path, monkeypatch):
+    store = ArtifactStore("r", root=tmp_path)
+    # the streamed file moves into the store; its text is never joined back together
+    monkeypatch.setattr(store, "put", lambda *a: pytest.fail("stream rebuilt its text for put()"))
+    sink = io.ArtifactStream("ship.md", store)
+    sink.write("# Ship\n")
+    sink.write("done")
+    path = sink.close()
+    store.close()
+    assert read_file(path) == "# Ship\ndone"
+    assert [p.name for p in (tmp_path / "r").iterdir()] == [pathlib.Path(path).name]
+    # the working file itself became the blob, and a put() of the same text dedupes to it
+    other = ArtifactStore("s", root=tmp_path)
+    again = other.put("ship.md", "# Ship\ndone")
+    other.close()
+    assert os.path.samefile(again, path) and other.stats["deduped"] == 1
+
+def test_compressed_stream_matches_put(tmp_path):
+    text = "# Spec\n" + "lorem ipsum " * 500
+    for compression in ("gzip", "zstd"):
+        store = ArtifactStore(compression, root=tmp_path, compression=compression)
+        sink = io.ArtifactStream("spec.md", store)
+        for i in range(0, len(text), 100):
+            sink.write(text[i:i + 100])
+        streamed = sink.close()
+        other = ArtifactStore(compression + "-put", root=tmp_path, compression=compression)
+        put = other.put("spec.md", text)
+        other.close()
+        assert read_file(streamed) == text
+        assert pathlib.Path(streamed).read_bytes() == pathlib.Path(put).read_bytes()
+
+def test_gc_keeps_newest_runs_and_drops_orphan_blobs(tmp_path):
+    for i in range(3):
+        store = ArtifactStore(f"run-{i}", root=tmp_path)
+        store.put("shared.md", "same")
+        store.put("own.md", f"only in {i}")
+        store.close()
+        old = time.time() - (3 - i) * 3600
+        os.utime(tmp_path / f"run-{i}", (old, old))
+    out = gc(tmp_path, keep_runs=1, min_blob_age=0)
+    assert out["runs"] == 2 and out["blobs"] == 2
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".objects", "run-2"]
+    assert len([p for p in (tmp_path / ".objects").rglob("*") if p.is_file()]) == 2
+
+def test_gc_spares_writes_in_progress(tmp_path):
+    store = ArtifactStore("run-0", root=tmp_path)
+    store.put("a.md", "just written")
+    store.close()
+    shutil.rmtree(tmp_path / "run-0")
+    # an unlinked blob another run may be about to link, and a half-written temp file
+    (blob,) = (p for p in (tmp_path / ".objects").rglob("*") if p.is_file())
+    tmp = blob.with_name(blob.name + ".123.456.tmp")
+    tmp.write_text("partial")
+    old = time.time() - 3600
+    os.utime(tmp, (old, old))
+    assert gc(tmp_path)["blobs"] == 0 and blob.exists() and tmp.exists()
+    os.utime(blob, (old, old))
+    assert gc(tmp_path)["blobs"] == 1 and not blob.exists() and tmp.exists()
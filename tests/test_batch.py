@@ -0,0 +1,34 @@
+import json, shutil, pathlib
+import pytest
+from src.batch import expand_blueprints, run_batch, format_table, split_llm_budget, write_summary
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+def test_run_batch_isolates_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("OPENAI_OFFLINE", "1")
+    (tmp_path / "bps").mkdir()
+    shutil.copy(ROOT / "examples/website_redesign.yaml", tmp_path / "bps/a.yaml")
+    shutil.copy(ROOT / "examples/website_redesign.yaml", tmp_path / "bps/b.yml")
+    (tmp_path / "bps/broken.yaml").write_text("project: {id: x}\n")
+    bps = expand_blueprints("bps")
+    assert [pathlib.Path(b).name for b in bps] == ["a.yaml", "b.yml", "broken.yaml"]
+    rows = run_batch(bps, str(ROOT / "prompts/role_prompts.yaml"), workers=2, approvals={"PM": True})
+    assert [r["outcome"] == "ok" for r in rows] == [True, True, False]
+    dirs = {r["artifacts"] for r in rows}
+    assert len(dirs) == 3
+    assert any(p.name.startswith("ship-") for p in pathlib.Path(rows[0]["artifacts"]).iterdir())
+    assert "latency_s" in format_table(rows).splitlines()[0]
+    # one metrics file with both workers' counters, not whichever process wrote last
+    assert 'agent_runs_total{status="ok"} 2' in (tmp_path / "run_artifacts" / "metrics.prom").read_text()
+    write_summary(rows, "out/summary.json")
+    assert json.loads(pathlib.Path("out/summary.json").read_text())["total"]["ok"] == 2
+
+def test_llm_budget_is_never_oversubscribed():
+    assert split_llm_budget(4, 10, 8) == (4, 2)
+    assert split_llm_budget(3, 10, 8) == (3, 2)
+    # more workers than requests allowed in flight: fewer workers, one request each
+    assert split_llm_budget(4, 10, 2) == (2, 1)
+    assert split_llm_budget(4, 1, 8) == (1, 8)
+    with pytest.raises(ValueError):
+        split_llm_budget(4, 10, 0)
@@ -1,8 +1,35 @@
+import os, pytest, yaml
 from src.models import Blueprint
-import yaml
 
 def test_example_blueprint_loads():
     data = yaml.safe_load(open("examples/website_redesign.yaml"))
     bp = Blueprint.model_validate(data)
     assert bp.project.id == "website-redesign"
     assert len(bp.phases) >= 3
+
+def test_streamed_yaml_matches_safe_load():
+    from src.runtime.loader import load_yaml
+    docs = [open(f"examples/{name}").read() for name in ("website_redesign.yaml", "gh_automation.yaml")]
+    docs.append("a: &x {n: 1, f: 1.5, b: yes, q: '1', d: 2024-01-02, z: ~}\nb: *x\nc:\n  <<: *x\n  n: 2\n"
+                "t: !!str 3\nl: [0x1f, .inf, '', null]\n")
+    for text in docs:
+        assert load_yaml(text) == yaml.safe_load(text)
+
+def test_long_dependency_chain_validates():
+    phases = [{"id": f"p{i}", "entry_prompt": "w", "depends_on": [f"p{i - 1}"] if i else []} for i in range(3000)]
+    bp = Blueprint.model_validate({"project": {"id": "big", "goal": "g"}, "phases": phases})
+    assert bp.phases[-1].depends_on == ["p2998"]
+    phases[0]["depends_on"] = ["p2999"]
+    with pytest.raises(ValueError, match="dependency cycle"):
+        Blueprint.model_validate({"project": {"id": "big", "goal": "g"}, "phases": phases})
+
+def test_rewritten_blueprint_reuses_validated_model(tmp_path):
+    from src.runtime import loader
+    path = tmp_path / "bp.yaml"
+    text = open("examples/website_redesign.yaml").read()
+    path.write_text(text)
+    sha, bp = loader.load_blueprint(path)
+    os.utime(path, ns=(0, 0))
+    assert loader.load_blueprint(path) == (sha, bp) and loader.load_blueprint(path)[1] is bp
+    path.write_text(text + "\n# changed\n")
+    assert loader.load_blueprint(path)[1] is not bp
@@ -0,0 +1,59 @@
+import pytest
+from src import orchestrator
+from src.models import Blueprint
+from src.runtime.budget import BudgetExceeded, BudgetLedger, cost
+
+USAGE = {"input_tokens": 1000, "input_tokens_details": {"cached_tokens": 400}, "output_tokens": 500,
+         "total_tokens": 1500}
+
+def _bp(budget=None, **phase):
+    return Blueprint.model_validate({
+        "project": {"id": "b", "goal": "test", **({"budget": budget} if budget else {})},
+        "phases": [{"id": "intake", "entry_prompt": "curator", **phase}],
+    })
+
+def test_cost_counts_cached_tokens_at_their_price():
+    assert cost("gpt-4o-mini", USAGE) == pytest.approx((600 * 0.15 + 400 * 0.075 + 500 * 0.60) / 1e6)
+    assert cost("gpt-4o-mini-2024-07-18", USAGE) == cost("gpt-4o-mini", USAGE)
+    assert cost("unknown-model", USAGE) is None
+
+def test_plan_uses_phase_model_then_falls_back_below_reserve():
+    bp = _bp({"tokens": 10000, "fallback_model": "gpt-4.1-nano"}, model="gpt-4.1")
+    ledger = BudgetLedger(bp, "gpt-4o-mini")
+    assert ledger.plan(bp.phases[0], "Curate.").model == "gpt-4.1"
+    ledger.record("intake", "gpt-4.1", {**USAGE, "total_tokens": 8500})
+    assert ledger.plan(bp.phases[0], "Curate.").model == "gpt-4.1-nano"
+    ledger.record("intake", "gpt-4.1-nano", USAGE)
+    with pytest.raises(BudgetExceeded, match="intake"):
+        ledger.plan(bp.phases[0], "Curate.")
+
+def test_plan_trims_context_and_caps_output_to_phase_budget():
+    bp = _bp(budget={"tokens": 1000})
+    plan = BudgetLedger(bp, "gpt-4o-mini", context_tokens=1500).plan(bp.phases[0], "Curate.")
+    assert plan.context_tokens < 1000 and plan.max_output_tokens >= 256
+    assert BudgetLedger(_bp(), "gpt-4o-mini").plan(_bp().phases[0]).max_output_tokens is None
+
+def test_output_cap_stays_within_the_model_limit():
+    # a roomy run budget alone sends no cap; a roomy phase budget is clamped to the model's limit
+    for budget in ({"cost_usd": 5}, {"tokens": 500000}):
+        assert BudgetLedger(_bp(budget), "gpt-4o-mini").plan(_bp().phases[0]).max_output_tokens is None
+        bp = Blueprint.model_validate({"project": {"id": "b", "goal": "test"},
+                                       "phases": [{"id": "intake", "entry_prompt": "curator", "budget": budget}]})
+        assert BudgetLedger(bp, "gpt-4o-mini").plan(bp.phases[0]).max_output_tokens == 16384
+    # once the run budget binds, the cap follows it
+    bp = _bp({"tokens": 3000})
+    assert 256 <= BudgetLedger(bp, "gpt-4o-mini").plan(bp.phases[0]).max_output_tokens < 3000
+
+def test_run_stops_when_budget_is_spent(run_env):
+    seen = []
+    def fake_prompt(role_prompt, state, *args, stats=None, plan=None, **kwargs):
+        seen.append((state["phase"], plan.model))
+        stats.update(model=plan.model, usage=USAGE)
+        return "out"
+    run_env({"project": {"id": "b", "goal": "test", "budget": {"cost_usd": 0.0005}},
+             "phases": [{"id": p, "entry_prompt": "curator", "transitions": {"on_complete": n}}
+                        for p, n in (("intake", "design"), ("design", "ship"), ("ship", "done"))]},
+            {"curator": "c"}, prompt=fake_prompt)
+    with pytest.raises(BudgetExceeded, match="before phase 'ship'"):
+        orchestrator.run_blueprint("bp.yaml", "prompts.yaml")
+    assert seen == [("intake", orchestrator.MODEL), ("design", orchestrator.MODEL)]
@@ -0,0 +1,65 @@
+import time
+from src import orchestrator
+from src.runtime import llm
+from src.runtime.cache import ResponseCache, cache_key, state_fingerprint
+
+def test_hits_misses_and_read_only_mode(tmp_path):
+    db = tmp_path / "c.sqlite"
+    c = ResponseCache(db, mode="readwrite")
+    assert c.get("k") is None
+    c.put("k", "m", "text")
+    assert c.get("k") == "text"
+    assert c.stats() == {"hits": 1, "misses": 1, "writes": 1, "evictions": 0}
+    c.close()
+    ro = ResponseCache(db, mode="read")
+    ro.put("other", "m", "x")
+    assert ro.get("k") == "text" and ro.get("other") is None
+
+def test_lru_eviction_by_size_and_age(tmp_path):
+    c = ResponseCache(tmp_path / "c.sqlite", max_bytes=10)
+    c.put("a", "m", "aaaa")
+    c.put("b", "m", "bbbb")
+    time.sleep(0.01)
+    c.get("a")  # a is now more recently used than b
+    c.put("c", "m", "cccc")
+    assert c.get("b") is None and c.get("a") == "aaaa" and c.get("c") == "cccc"
+    c.max_age = 0
+    c.put("d", "m", "d")
+    assert c.get("a") is None
+
+def test_key_ignores_artifact_paths(tmp_path):
+    (tmp_path / "one.md").write_text("same")
+    (tmp_path / "two.md").write_text("same")
+    s1 = {"phase": "review", "artifacts": {"design": str(tmp_path / "one.md")}}
+    s2 = {"phase": "review", "artifacts": {"design": str(tmp_path / "two.md")}}
+    assert cache_key("m", "s", "r", state_fingerprint(s1)) == cache_key("m", "s", "r", state_fingerprint(s2))
+
+def test_run_prompt_reuses_cached_output(tmp_path, monkeypatch):
+    calls = []
+    class FakeEngine:
+        def complete(self, model, input, **kwargs):
+            calls.append(input)
+            return llm.LLMResult("fresh", model)
+    monkeypatch.delenv("OPENAI_OFFLINE", raising=False)
+    monkeypatch.setattr(llm, "get_engine", lambda: FakeEngine())
+    cache = ResponseCache(tmp_path / "c.sqlite")
+    state = {"phase": "intake", "artifacts": {}}
+    assert orchestrator.run_prompt("Curate.", state, cache) == "fresh"
+    assert orchestrator.run_prompt("Curate.", state, cache) == "fresh"
+    assert len(calls) == 1 and cache.hits == 1
+
+def test_second_cached_run_makes_no_llm_calls(run_env, monkeypatch):
+    calls = []
+    class FakeEngine:
+        def complete(self, model, input, **kwargs):
+            calls.append(input)
+            return llm.LLMResult(f"out {len(calls)}", model, {"input_tokens": 10, "output_tokens": 5})
+    phases = [{"id": p, "entry_prompt": "w", "transitions": {"on_complete": n}}
+              for p, n in (("a", "b"), ("b", "c"), ("c", "d"), ("d", "done"))]
+    run_env({"project": {"id": "c", "goal": "g"}, "phases": phases}, {"w": "Work."})
+    monkeypatch.delenv("OPENAI_OFFLINE", raising=False)
+    monkeypatch.setattr(llm, "get_engine", lambda: FakeEngine())
+    orchestrator.run_blueprint("bp.yaml", "prompts.yaml", cache="readwrite")
+    assert len(calls) == 4
+    out = orchestrator.run_blueprint("bp.yaml", "prompts.yaml", cache="readwrite")
+    assert len(calls) == 4 and {m["source"] for m in out["metrics"].values()} == {"cache"}
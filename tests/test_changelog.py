@@ -0,0 +1,60 @@
+import pathlib, subprocess, sys
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "scripts"))
+import commit_log  # noqa: E402
+from changelog_from_commits import write_changelog  # noqa: E402
+from version_bump import detect_bump  # noqa: E402
+
+def _git(repo, *args):
+    subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@example.com", *args], cwd=repo, check=True,
+                   capture_output=True)
+
+def _commit(repo, msg):
+    _git(repo, "commit", "-q", "--allow-empty", "-m", msg)
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, "init", "-q")
+    _commit(tmp_path, "chore: init")
+    _git(tmp_path, "tag", "v0.1.0")
+    for msg in ("feat: add search", "fix(ui): align header", "docs: readme", "Merge pull request #3"):
+        _commit(tmp_path, msg)
+    return tmp_path
+
+def test_classify():
+    assert commit_log.classify("feat: x") == "Features"
+    assert commit_log.classify("feat!: drop py3.9") == "Breaking"
+    assert commit_log.classify("fix: y", "details\n\nBREAKING CHANGE: config moved") == "Breaking"
+    assert commit_log.classify("perf: z") == "Chore"
+    assert commit_log.classify("Update README") == "Other"
+
+def test_commits_since_reads_only_new_commits(repo, monkeypatch):
+    tag = commit_log.last_tag(repo)
+    assert tag == "v0.1.0"
+    commits = commit_log.commits_since(tag, cwd=repo)
+    assert [c[1] for c in commits] == ["Other", "Chore", "Fixes", "Features"]
+    _commit(repo, "feat: export\n\nBREAKING CHANGE: new format")
+    ranges = []
+    real = commit_log.iter_log
+    monkeypatch.setattr(commit_log, "iter_log", lambda rng, cwd=None: ranges.append(rng) or real(rng, cwd))
+    commits = commit_log.commits_since(tag, cwd=repo)
+    assert len(ranges[0]) == 2 and ranges[0][1] == "^v0.1.0" and ranges[0][0].endswith("..HEAD")
+    assert [c[1] for c in commits][:2] == ["Breaking", "Other"] and len(commits) == 5
+    assert commit_log.commits_since(tag, cwd=repo) == commits and len(ranges) == 1
+    assert commit_log.commits_since(tag, cwd=repo, cache=False) == commits
+    assert detect_bump(commits) == "major" and detect_bump(commits[1:]) == "minor"
+    assert detect_bump([("x", "Fixes", "fix: y")]) == "patch"
+
+def test_write_changelog_replaces_the_release_section(repo):
+    grouped, other = commit_log.group(commit_log.commits_since("v0.1.0", cwd=repo))
+    assert grouped["Features"] == ["feat: add search"] and other == ["Merge pull request #3"]
+    path = repo / "CHANGELOG.md"
+    path.write_text("# Changelog\n\n## 0.1.0 - 2020-01-01\n\n### Fixes\n\n- fix: old\n")
+    write_changelog("0.2.0", grouped, other, path)
+    grouped["Fixes"].append("fix: late merge")
+    write_changelog("0.2.0", grouped, other, path)
+    text = path.read_text()
+    assert text.startswith("# Changelog\n\n## 0.2.0 - ")
+    assert text.count("## 0.2.0 ") == 1 and "- fix: late merge" in text
+    assert text.endswith("## 0.1.0 - 2020-01-01\n\n### Fixes\n\n- fix: old\n")
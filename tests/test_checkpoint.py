@@ -0,0 +1,54 @@
+import pytest
+from src import orchestrator
+
+BLUEPRINT = {
+    "project": {"id": "resumable", "goal": "test"},
+    "phases": [
+        {"id": "intake", "entry_prompt": "curator", "transitions": {"on_complete": "design"}},
+        {"id": "design", "entry_prompt": "designer", "transitions": {"on_complete": "ship"}},
+        {"id": "ship", "entry_prompt": "release",
+         "tasks": [{"id": "issue", "tool_calls": ["github.create_issue:title=Ship"]},
+                   {"id": "deploy", "depends_on": ["issue"], "tool_calls": ["deploy.vercel"]}],
+         "transitions": {"on_complete": "done"}},
+    ],
+}
+
+@pytest.fixture
+def env(run_env):
+    log = {"tools": [], "fail_deploy": True}
+    def fake_tool(name):
+        def fn(args, state, ctx):
+            log["tools"].append(name)
+            if name == "deploy.vercel" and log["fail_deploy"]:
+                raise RuntimeError("vercel failed")
+            return {"ok": name}
+        return fn
+    log["prompts"] = run_env(BLUEPRINT, {"curator": "c", "designer": "d", "release": "r"}, prompt=True, run_id="run-1",
+                             tools={name: fake_tool(name) for name in ("github.create_issue", "deploy.vercel")})
+    return log
+
+def _run(**kw):
+    return orchestrator.run_blueprint("bp.yaml", "prompts.yaml", **kw)
+
+def test_resume_skips_finished_phases_and_side_effects(env):
+    with pytest.raises(RuntimeError, match="vercel failed"):
+        _run()
+    assert env["prompts"] == ["intake", "design", "ship"]
+    env["fail_deploy"] = False
+    out = _run(resume="run-1")
+    assert env["prompts"] == ["intake", "design", "ship", "ship"]
+    # the issue was created before the crash and must not be created again
+    assert env["tools"].count("github.create_issue") == 1
+    assert env["tools"].count("deploy.vercel") == 2
+    assert set(out["artifacts"]) == {"intake", "design", "ship"}
+
+def test_resume_from_phase(env):
+    env["fail_deploy"] = False
+    _run()
+    out = _run(resume="run-1", from_phase="design")
+    assert env["prompts"] == ["intake", "design", "ship", "design", "ship"]
+    assert out["events"]["ship"] == "complete"
+
+def test_resume_unknown_run(env):
+    with pytest.raises(RuntimeError, match="No checkpoints"):
+        _run(resume="missing")
@@ -0,0 +1,86 @@
+import argparse, threading, time
+import pytest
+from src import orchestrator
+from src.tools import registry
+
+BLUEPRINT = {
+    "project": {"id": "gated", "goal": "test"},
+    "phases": [
+        {"id": "design", "entry_prompt": "designer", "gate": {"type": "human_approval", "approver": "PM"},
+         "transitions": {"on_approved": "review"}},
+        {"id": "review", "entry_prompt": "qa", "gate": {"type": "automated_checks", "tools": ["check:a", "check:b"]},
+         "transitions": {"on_pass": "ship", "on_fail": "design"}},
+        {"id": "ship", "entry_prompt": "release", "transitions": {"on_complete": "done"}},
+    ],
+}
+
+@pytest.fixture
+def env(run_env):
+    log = {"checks": [], "status": {"a": "green", "b": "green"}}
+    def check(args, state, ctx):
+        log["checks"].append((args["id"], threading.current_thread().name))
+        time.sleep(0.3)
+        return {"status": log["status"][args["id"]]}
+    log["prompts"] = run_env(BLUEPRINT, {"designer": "d", "qa": "q", "release": "r"}, prompt=True, run_id="run-g",
+                             tools={"check": registry.Tool("check", check, args={"id": str}, positional="id")})
+    return log
+
+def _run(**kw):
+    return orchestrator.run_blueprint("bp.yaml", "prompts.yaml", max_concurrency=4, **kw)
+
+def test_approval_pauses_the_run_until_a_decision(env):
+    out = _run()
+    assert orchestrator.pending_gates(out) == [{"phase": "design", "gate": "human_approval", "approver": "PM"}]
+    assert env["prompts"] == ["design"]
+    out = _run(resume="run-g", decisions={"design": True})
+    assert not orchestrator.pending_gates(out)
+    # the design phase itself was not run again, only its gate
+    assert env["prompts"] == ["design", "review", "ship"]
+    assert out["events"] == {"design": "approved", "review": "pass", "ship": "complete"}
+    assert out["gates"]["design"] == {"status": "approved", "approver": "PM"}
+    with pytest.raises(RuntimeError, match="not waiting"):
+        _run(resume="run-g", decisions={"design": True})
+
+def test_rejection_without_a_transition_halts_the_run(env, monkeypatch):
+    _run()
+    out = _run(resume="run-g", decisions={"design": "rejected"})
+    assert out["events"] == {"design": "rejected"} and env["prompts"] == ["design"]
+    assert out["halted"] == "design: gate rejected, no transition"
+    # the CLI reports it as a failure
+    from src import app
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(orchestrator, "run_blueprint", lambda *a, **kw: out)
+    with pytest.raises(SystemExit) as exit:
+        app.cmd_approve(argparse.Namespace(blueprint="bp.yaml", prompts="prompts.yaml", run_id="run-g",
+                                           max_concurrency=4, phase="design", reject=True))
+    assert exit.value.code == 1
+    from src import batch
+    row = {"blueprint": "bp.yaml", "run_id": "run-g", "outcome": f"halted: {out['halted']}", "latency_s": 0.1,
+           "llm_calls": 1, "tokens": 0}
+    monkeypatch.setattr(batch, "run_batch", lambda *a, **kw: [row])
+    with pytest.raises(SystemExit) as exit:
+        app.cmd_run_batch(argparse.Namespace(blueprints="bp.yaml", prompts="prompts.yaml", workers=1,
+                                             llm_concurrency=1, max_concurrency=4, cache="off", approve=[],
+                                             summary="summary.json"))
+    assert exit.value.code == 1
+
+def test_checks_run_in_parallel_and_wait_while_pending(env):
+    env["status"]["b"] = "pending"
+    start = time.monotonic()
+    out = _run(approvals={"PM": True})
+    assert time.monotonic() - start < 0.55
+    assert len({name for _, name in env["checks"]}) == 2
+    assert orchestrator.pending_gates(out) == [{"phase": "review", "gate": "automated_checks", "pending": ["check:b"]}]
+    out = _run(resume="run-g", decisions={"review": "pass"})
+    assert out["events"]["review"] == "pass" and "ship" in out["artifacts"]
+    assert out["gates"]["review"]["checks"]["check:a"]["status"] == "pass"
+
+def test_failed_check_sends_the_run_back_for_rework(env):
+    env["status"]["a"] = "red"
+    _run()
+    out = _run(resume="run-g", decisions={"design": True})
+    # review failed, so design runs again and waits for a fresh approval
+    assert env["prompts"] == ["design", "review", "design"]
+    assert out["gates"]["review"]["status"] == "fail"
+    assert out["gates"]["review"]["checks"]["check:a"]["status"] == "fail"
+    assert [g["phase"] for g in orchestrator.pending_gates(out)] == ["design"]
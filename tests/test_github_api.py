@@ -0,0 +1,99 @@
+from src import orchestrator
+from src.tools.github_api import GitHub
+
+def _repo_handler(method, path, headers, body):
+    base = "/repos/o/r"
+    if method == "GET" and path == f"{base}/git/ref/heads/feat":
+        return 200, {}, {"object": {"sha": "head0"}}
+    if method == "GET" and path.startswith(f"{base}/git/commits/"):
+        return 200, {}, {"sha": path.rsplit("/", 1)[1], "tree": {"sha": "tree0"}}
+    if method == "POST" and path == f"{base}/git/trees":
+        return 201, {}, {"sha": "tree1"}
+    if method == "POST" and path == f"{base}/git/commits":
+        return 201, {}, {"sha": "commit-" + body["parents"][0]}
+    if method == "PATCH" and path == f"{base}/git/refs/heads/feat":
+        return 200, {}, {"object": {"sha": body["sha"]}}
+    return 404, {}, {"message": "not found"}
+
+def _gh(server):
+    return GitHub(token="t", owner="o", repo="r", api=server.url)
+
+def test_commit_files_single_tree_commit_and_ref_update(stub_server):
+    server = stub_server(_repo_handler)
+    gh = _gh(server)
+    out = gh.commit_files({"docs/a.md": "A", "docs/b.md": "B"}, "docs: add", "feat")
+    assert out["sha"] == "commit-head0"
+    calls = [(m, p) for m, p, _, _ in server.requests]
+    assert calls == [("GET", "/repos/o/r/git/ref/heads/feat"), ("GET", "/repos/o/r/git/commits/head0"),
+                     ("POST", "/repos/o/r/git/trees"), ("POST", "/repos/o/r/git/commits"),
+                     ("PATCH", "/repos/o/r/git/refs/heads/feat")]
+    tree = server.requests[2][3]
+    assert tree["base_tree"] == "tree0" and [e["path"] for e in tree["tree"]] == ["docs/a.md", "docs/b.md"]
+    # the new head is cached, so a follow-up commit builds on it without a ref lookup
+    gh.commit_files({"docs/c.md": "C"}, "docs: more", "feat")
+    assert server.requests[5][1] == "/repos/o/r/git/commits/commit-head0"
+    assert server.requests[7][3]["parents"] == ["commit-head0"]
+
+def test_commit_artifacts_tool(stub_server, tmp_path, monkeypatch):
+    server = stub_server(_repo_handler)
+    gh = _gh(server)
+    ctx = orchestrator.RunContext()
+    monkeypatch.setattr(ctx, "github", lambda: gh)
+    for ph in ("design", "implement"):
+        (tmp_path / f"{ph}.md").write_text(ph.upper())
+    state = {"artifacts": {ph: str(tmp_path / f"{ph}.md") for ph in ("design", "implement")}}
+    orchestrator.call_tool(
+        "github.commit_artifacts:phases=design,implement|paths=design:docs/spec.md|branch=feat", state, ctx)
+    tree = [r for r in server.requests if r[1].endswith("/git/trees")][0][3]["tree"]
+    assert {e["path"]: e["content"] for e in tree} == {"docs/spec.md": "DESIGN", "docs/implement.md": "IMPLEMENT"}
+    assert len(server.requests) == 5
+
+def _session(server, sleeps):
+    from src.tools.github_api import GitHubSession
+    return GitHubSession(sleep=sleeps.append), server.url + "/repos/o/r"
+
+def test_etag_conditional_get(stub_server):
+    def handler(method, path, headers, body):
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, {}, b""
+        return 200, {"ETag": '"v1"'}, {"default_branch": "trunk"}
+    server = stub_server(handler)
+    sess, base = _session(server, [])
+    assert sess.get(base).json() == {"default_branch": "trunk"}
+    assert sess.get(base).json() == {"default_branch": "trunk"}
+    assert server.requests[1][2]["If-None-Match"] == '"v1"'
+    assert sess.stats["not_modified"] == 1
+
+def test_retries_5xx_and_secondary_rate_limit(stub_server):
+    codes = iter([(502, {}), (403, {"Retry-After": "7"}), (200, {})])
+    def handler(method, path, headers, body):
+        status, hdrs = next(codes)
+        return status, hdrs, {"message": "You have exceeded a secondary rate limit"} if status == 403 else {"ok": 1}
+    sleeps = []
+    sess, base = _session(stub_server(handler), sleeps)
+    assert sess.get(base + "/issues").json() == {"ok": 1}
+    assert sleeps[1] == 7.0 and sess.stats["retries"] == 2
+
+def test_writes_not_retried_on_5xx(stub_server):
+    server = stub_server(lambda *a: (502, {}, {"message": "bad gateway"}))
+    sess, base = _session(server, [])
+    assert sess.post(base + "/issues", json={"title": "x"}).status_code == 502
+    # the write may have landed: a replayed PUT would carry a stale sha
+    assert sess.put(base + "/contents/a.md", json={"sha": "old"}).status_code == 502
+    assert sess.patch(base + "/git/refs/heads/main", json={"sha": "old"}).status_code == 502
+    assert len(server.requests) == 3
+
+def test_throttles_when_rate_limit_low(stub_server):
+    import time
+    reset = time.time() + 10
+    server = stub_server(lambda *a: (200, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset)}, {}))
+    sleeps = []
+    sess, base = _session(server, sleeps)
+    sess.get(base)
+    sess.get(base + "/pulls")
+    assert len(sleeps) == 1 and 8 < sleeps[0] <= 10
+
+def test_clients_share_pooled_session(stub_server):
+    server = stub_server(_repo_handler)
+    assert _gh(server).session is _gh(server).session
+    assert GitHub(token="other", owner="o", repo="r", api=server.url).session is not _gh(server).session
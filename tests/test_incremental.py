@@ -0,0 +1,60 @@
+import argparse
+import pytest
+import yaml
+from src import app, orchestrator
+
+BLUEPRINT = {
+    "project": {"id": "incr", "goal": "test"},
+    "phases": [
+        {"id": "intake", "entry_prompt": "curator", "transitions": {"on_complete": "design"}},
+        {"id": "design", "entry_prompt": "designer", "transitions": {"on_complete": "ship"}},
+        {"id": "ship", "entry_prompt": "release",
+         "tasks": [{"id": "issue", "tool_calls": ["github.create_issue:title=Ship"]}],
+         "transitions": {"on_complete": "done"}},
+    ],
+}
+PROMPTS = {"curator": "c", "designer": "d", "release": "r"}
+
+@pytest.fixture
+def env(run_env):
+    log = {"tools": []}
+    def fake_issue(args, state, ctx):
+        log["tools"].append(args["title"])
+    log["prompts"] = run_env(BLUEPRINT, PROMPTS, prompt=True, tools={"github.create_issue": fake_issue})
+    return log
+
+def _run(**kw):
+    return orchestrator.run_blueprint("bp.yaml", "prompts.yaml", incremental=True, **kw)
+
+def _prompts(tmp_path, **changes):
+    (tmp_path / "prompts.yaml").write_text(yaml.safe_dump({**PROMPTS, **changes}))
+
+def test_unchanged_phases_are_skipped_and_artifacts_reused(env, tmp_path):
+    first = _run()
+    assert env["prompts"] == ["intake", "design", "ship"] and env["tools"] == ["Ship"]
+    env["prompts"].clear(), env["tools"].clear()
+    second = _run()
+    assert env["prompts"] == [] and env["tools"] == []
+    assert second["metrics"]["ship"]["source"] == "reused"
+    for phase, path in first["artifacts"].items():
+        assert open(second["artifacts"][phase]).read() == open(path).read()
+    _prompts(tmp_path, designer="d2")
+    _run()
+    # design's output changed, so ship (which reads it) runs again; intake does not
+    assert env["prompts"] == ["design", "ship"] and env["tools"] == ["Ship"]
+
+def test_dry_run_reports_what_would_run(env, tmp_path):
+    assert [r[1] for r in orchestrator.dry_run("bp.yaml", "prompts.yaml")] == [True, True, True]
+    _run()
+    assert [r[1] for r in orchestrator.dry_run("bp.yaml", "prompts.yaml")] == [False, False, False]
+    _prompts(tmp_path, designer="d2")
+    assert orchestrator.dry_run("bp.yaml", "prompts.yaml") == [
+        ("intake", False, "unchanged"), ("design", True, "prompt changed"), ("ship", True, "upstream design re-runs")]
+    assert env["prompts"] == ["intake", "design", "ship"]
+
+def test_cli_dry_run_uses_the_run_approvals(env, capsys):
+    _run(approvals={"PM": True})
+    args = argparse.Namespace(blueprint="bp.yaml", prompts="prompts.yaml", approve=["PM"], dry_run=True,
+                              resume=None, from_phase=None)
+    app.cmd_run(args)
+    assert capsys.readouterr().out.splitlines()[-1] == "0 of 3 phase(s) would run"
@@ -0,0 +1,75 @@
+import asyncio, threading, time
+import pytest
+from openai import AsyncOpenAI
+from src.runtime.llm import LLMEngine, TokenBucket
+from conftest import openai_response, openai_sse
+
+def _engine(server, **kw):
+    client = AsyncOpenAI(api_key="test", base_url=server.url + "/v1", max_retries=0)
+    return LLMEngine(client=client, **kw)
+
+def test_complete_returns_text_and_usage(stub_server):
+    server = stub_server(lambda *a: (200, {}, openai_response("hello", 12, 3)))
+    eng = _engine(server)
+    res = eng.complete("fake-model", [{"role": "user", "content": "hi"}])
+    assert res.text == "hello"
+    assert res.usage["total_tokens"] == 15
+    assert server.requests[0][1] == "/v1/responses"
+    eng.close()
+
+def test_rate_limit_honors_retry_after(stub_server):
+    calls = []
+    def handler(*a):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            return 429, {"Retry-After": "0.3"}, {"error": {"message": "slow down", "type": "rate_limit"}}
+        return 200, {}, openai_response("ok")
+    eng = _engine(stub_server(handler), backoff_base=0.01)
+    res = eng.complete("fake-model", [{"role": "user", "content": "hi"}])
+    assert res.text == "ok" and res.attempts == 2
+    assert calls[1] - calls[0] >= 0.3
+    eng.close()
+
+def test_in_flight_requests_capped_per_model(stub_server):
+    lock, state = threading.Lock(), {"now": 0, "peak": 0}
+    def handler(*a):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        time.sleep(0.05)
+        with lock:
+            state["now"] -= 1
+        return 200, {}, openai_response("ok")
+    eng = _engine(stub_server(handler), max_in_flight=2)
+    results = eng.complete_many([{"model": "fake-model", "input": [{"role": "user", "content": str(i)}]}
+                                 for i in range(6)])
+    assert [r.text for r in results] == ["ok"] * 6
+    assert state["peak"] == 2
+    eng.close()
+
+def test_token_bucket_throttles():
+    async def go():
+        bucket = TokenBucket(per_minute=600, capacity=2)  # 10/s after a burst of 2
+        start = time.monotonic()
+        for _ in range(4):
+            await bucket.acquire(1)
+        return time.monotonic() - start
+    assert asyncio.run(go()) >= 0.18
+
+def test_streaming_passes_deltas_and_records_ttft(stub_server):
+    server = stub_server(lambda *a: (200, {"Content-Type": "text/event-stream"},
+                                     openai_sse(["Hel", "lo ", "world"], output_tokens=3)))
+    eng = _engine(server)
+    seen = []
+    res = eng.complete("fake-model", [{"role": "user", "content": "hi"}], on_delta=seen.append)
+    assert seen == ["Hel", "lo ", "world"]
+    assert res.text == "Hello world" and res.usage["output_tokens"] == 3
+    assert res.ttft is not None and res.ttft <= res.latency
+    assert server.requests[0][3]["stream"] is True
+    eng.close()
+
+def test_client_getters_stay_importable_from_orchestrator():
+    from src import orchestrator
+    from src.runtime import llm
+    assert orchestrator._get_openai_client is llm._get_openai_client
+    assert orchestrator._get_async_openai_client is llm._get_async_openai_client
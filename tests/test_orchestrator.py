@@ -0,0 +1,105 @@
+import pathlib, threading, time
+import pytest
+from pydantic import ValidationError
+from src import orchestrator
+from src.models import Blueprint
+from src.tools import registry
+
+PROMPTS = {"curator": "Curate.", "designer": "Design.", "implementer": "Implement."}
+
+def _bp(**overrides):
+    data = {
+        "project": {"id": "fanout", "goal": "test"},
+        "phases": [
+            {"id": "intake", "entry_prompt": "curator"},
+            {"id": "design", "entry_prompt": "designer", "depends_on": ["intake"]},
+            {"id": "research", "entry_prompt": "designer", "depends_on": ["intake"]},
+            {"id": "implement", "entry_prompt": "implementer", "depends_on": ["design", "research"],
+             "tasks": [
+                 {"id": "a", "tool_calls": ["slow:a"]},
+                 {"id": "b", "tool_calls": ["slow:b"]},
+                 {"id": "c", "tool_calls": ["slow:c"], "depends_on": ["a", "b"]},
+             ],
+             "transitions": {"on_complete": "done"}},
+        ],
+    }
+    data.update(overrides)
+    return Blueprint.model_validate(data)
+
+@pytest.fixture
+def offline(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "run_artifacts").mkdir()
+    monkeypatch.setenv("OPENAI_OFFLINE", "1")
+    calls = []
+    def slow(args, state, ctx):
+        calls.append((f"slow:{args['id']}", time.monotonic(), threading.current_thread().name))
+        time.sleep(0.05)
+    registry.load_tools()
+    monkeypatch.setitem(registry.TOOLS, "slow", registry.Tool("slow", slow, args={"id": str}, positional="id"))
+    return calls
+
+def test_parallel_phases_merge_artifacts(offline):
+    graph = orchestrator.compile_graph(_bp(), PROMPTS)
+    out = graph.invoke({"artifacts": {}}, context=orchestrator.RunContext(max_concurrency=4),
+                       config={"max_concurrency": 4})
+    assert set(out["artifacts"]) == {"intake", "design", "research", "implement"}
+    assert out["events"] == {p: "complete" for p in out["artifacts"]}
+
+def test_task_dependencies_respected(offline):
+    graph = orchestrator.compile_graph(_bp(), PROMPTS)
+    graph.invoke({"artifacts": {}}, context=orchestrator.RunContext(max_concurrency=4))
+    started = {spec: (t, th) for spec, t, th in offline}
+    assert started["slow:c"][0] >= max(started["slow:a"][0], started["slow:b"][0]) + 0.05
+    assert started["slow:a"][1] != started["slow:b"][1]
+
+def test_unknown_or_cyclic_dependencies_rejected():
+    with pytest.raises(ValidationError, match="unknown phase"):
+        _bp(phases=[{"id": "a", "entry_prompt": "x", "depends_on": ["nope"]}])
+    with pytest.raises(ValidationError, match="cycle"):
+        _bp(phases=[{"id": "a", "entry_prompt": "x", "tasks": [
+            {"id": "t1", "depends_on": ["t2"]}, {"id": "t2", "depends_on": ["t1"]}]}])
+
+def test_stream_keeps_partial_artifact_on_cancel(offline, monkeypatch):
+    from src.runtime import llm
+    class Interrupted:
+        def complete(self, model, input, on_delta=None, **kw):
+            on_delta("# Design\n")
+            on_delta("half of it")
+            raise KeyboardInterrupt
+    monkeypatch.delenv("OPENAI_OFFLINE")
+    monkeypatch.setattr(llm, "get_engine", lambda: Interrupted())
+    ctx = orchestrator.RunContext(stream=True, progress=None)
+    with pytest.raises(KeyboardInterrupt):
+        orchestrator._stream_prompt("Design.", {"phase": "design"}, ctx, "design.md", {})
+    (partial,) = list(pathlib.Path("run_artifacts").rglob("design.partial.md"))
+    assert partial.read_text() == "# Design\nhalf of it"
+
+def test_unknown_tool_fails_at_compile():
+    bp = _bp(phases=[{"id": "a", "entry_prompt": "x", "tasks": [{"id": "t", "tool_calls": ["nope.tool"]}],
+                      "gate": {"type": "automated_checks", "tools": ["ci.run_tests:oops=1"]}}])
+    with pytest.raises(registry.ToolSpecError) as e:
+        orchestrator.compile_graph(bp, PROMPTS)
+    assert "a.t: unknown tool 'nope.tool'" in str(e.value)
+    assert "a.gate: ci.run_tests: unexpected argument 'oops'" in str(e.value)
+
+def test_parse_call_schema():
+    call = registry.parse_call("github.commit_artifacts:phases=design, implement|branch=feat")
+    assert call.tool.side_effects and dict(call.args) == {"phases": ["design", "implement"], "branch": "feat"}
+    assert dict(registry.parse_call("doc.create:spec.md").args) == {"name": "spec.md"}
+    with pytest.raises(registry.ToolSpecError, match="missing required"):
+        registry.parse_call("github.commit_artifact:path=x.md")
+
+def test_graph_cache_reuses_until_files_change(tmp_path):
+    import os, yaml
+    bp_path, prompts_path = tmp_path / "bp.yaml", tmp_path / "prompts.yaml"
+    bp_path.write_text(yaml.safe_dump({"project": {"id": "p", "goal": "g"},
+                                       "phases": [{"id": "intake", "entry_prompt": "curator"}]}))
+    prompts_path.write_text(yaml.safe_dump(PROMPTS))
+    _, g1 = orchestrator.get_graph(str(bp_path), str(prompts_path))
+    _, g2 = orchestrator.get_graph(str(bp_path), str(prompts_path))
+    assert g1 is g2
+    prompts_path.write_text(yaml.safe_dump({**PROMPTS, "curator": "Curate harder."}))
+    os.utime(prompts_path, ns=(1, 1))
+    _, g3 = orchestrator.get_graph(str(bp_path), str(prompts_path))
+    assert g3 is not g1
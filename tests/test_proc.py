@@ -0,0 +1,98 @@
+import asyncio, os, sys, time, textwrap, threading
+import pytest
+from src.runtime import proc
+from src.tools import deploy
+
+FAKE_VERCEL = textwrap.dedent("""\
+    #!{python}
+    import os, sys, time
+    print("Vercel CLI 0.0.0-fake", flush=True)
+    if os.environ.get("FAKE_VERCEL_FAIL"):
+        print("Error: build failed", file=sys.stderr, flush=True)
+        sys.exit(1)
+    time.sleep(float(os.environ.get("FAKE_VERCEL_SLEEP", "0")))
+    print("Building...", flush=True)
+    print("https://site-" + ("prod" if "--prod" in sys.argv else "preview") + ".vercel.app", flush=True)
+""")
+
+@pytest.fixture
+def vercel(tmp_path, monkeypatch):
+    script = tmp_path / "bin" / "vercel"
+    script.parent.mkdir()
+    script.write_text(FAKE_VERCEL.format(python=sys.executable))
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("VERCEL_TOKEN", "t")
+    return script
+
+def test_lines_are_streamed_as_printed():
+    seen = []
+    code = "import time\nfor i in range(3):\n    print(i, flush=True); time.sleep(0.05)\nimport sys; print('e', file=sys.stderr)"
+    res = proc.run([sys.executable, "-c", code], on_line=lambda s, l: seen.append((s, l, time.monotonic())))
+    assert [(s, l) for s, l, _ in seen] == [("stdout", "0"), ("stdout", "1"), ("stdout", "2"), ("stderr", "e")]
+    assert seen[1][2] - seen[0][2] >= 0.04
+    assert res.returncode == 0 and res.lines == 4 and res.stdout == ["0", "1", "2"]
+
+def test_timeout_kills_the_process_group():
+    start = time.monotonic()
+    with pytest.raises(proc.ProcessTimeout):
+        proc.run([sys.executable, "-c", "import time; print('up', flush=True); time.sleep(30)"], timeout=0.5,
+                 on_line=lambda s, l: None)
+    assert time.monotonic() - start < 5
+
+def test_cancelling_stops_the_process(tmp_path):
+    marker = tmp_path / "alive"
+    code = f"import time, pathlib\nwhile True:\n    pathlib.Path({str(marker)!r}).touch(); time.sleep(0.05)"
+    async def main():
+        task = asyncio.ensure_future(proc.arun([sys.executable, "-c", code], on_line=lambda s, l: None))
+        while not marker.exists():
+            await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+    asyncio.run(main())
+    marker.unlink()
+    time.sleep(0.2)
+    assert not marker.exists()
+
+def test_vercel_deploy_with_fake_cli(vercel, tmp_path):
+    assert deploy.vercel_deploy(cwd=str(tmp_path))["url"] == "https://site-prod.vercel.app"
+    assert deploy.vercel_deploy(cwd=str(tmp_path), prod=False)["url"] == "https://site-preview.vercel.app"
+
+def test_vercel_failure_reports_stderr(vercel, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_VERCEL_FAIL", "1")
+    with pytest.raises(proc.ProcessError, match="build failed") as e:
+        deploy.vercel_deploy(cwd=str(tmp_path))
+    assert e.value.result.returncode == 1
+
+def test_deploys_overlap_across_threads(vercel, tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_VERCEL_SLEEP", "0.5")
+    start = time.monotonic()
+    threads = [threading.Thread(target=deploy.vercel_deploy, kwargs={"cwd": str(tmp_path)}) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - start < 1.4
+
+def test_ci_run_tests_runs_a_real_command(tmp_path):
+    from src.tools.registry import parse_call
+    (tmp_path / "ok.py").write_text("print('3 passed')")
+    (tmp_path / "bad.py").write_text("print('1 failed'); raise SystemExit(1)")
+    assert parse_call("ci.run_tests")()["status"] == "green"
+    assert parse_call(f"ci.run_tests:{sys.executable} ok.py|cwd={tmp_path}")()["status"] == "green"
+    res = parse_call(f"ci.run_tests:{sys.executable} bad.py|cwd={tmp_path}")()
+    assert res["status"] == "red" and res["exit_code"] == 1 and "1 failed" in res["output"]
+
+def test_red_ci_fails_the_task(tmp_path):
+    from src import orchestrator
+    from src.models import Task
+    (tmp_path / "bad.py").write_text("print('1 failed'); raise SystemExit(1)")
+    task = Task(id="t", tool_calls=[f"ci.run_tests:{sys.executable} bad.py|cwd={tmp_path}"])
+    with pytest.raises(RuntimeError, match="reported red:\n1 failed"):
+        orchestrator.run_tasks([task], {}, orchestrator.RunContext())
+
+def test_lines_over_the_stream_limit_are_pumped(tmp_path):
+    code = "import sys; sys.stdout.write('x' * 200000 + '\\nafter\\n')"
+    res = proc.run([sys.executable, "-c", code], cwd=str(tmp_path))
+    assert res.lines == 2 and res.stdout[-1] == "after" and len(res.stdout[0]) == 200000
@@ -0,0 +1,44 @@
+import pytest
+from src import orchestrator
+from src.models import Blueprint, Project
+from src.runtime import llm, prompts, tracing
+
+PROJECT = Project(id="shop", goal="Sell socks", context={"stack": "django"})
+
+def test_template_compiles_declared_variables():
+    t = prompts.PromptTemplate.compile("designer", 'You design {{ goal }} for {{project_id}}; output {"json": 1}.')
+    assert t.variables == ("goal", "project_id")
+    assert t.render({"goal": "a shop", "project_id": "shop"}) == 'You design a shop for shop; output {"json": 1}.'
+    templates, errors = prompts.compile_prompts({"ok": "fine", "bad": "uses {{budget}}"})
+    assert list(templates) == ["ok"] and "'bad': unknown variable(s) budget" in errors[0]
+    bp = Blueprint.model_validate({"project": {"id": "p", "goal": "g"}, "phases": [{"id": "a", "entry_prompt": "bad"}]})
+    with pytest.raises(prompts.PromptError, match="invalid prompts"):
+        orchestrator.compile_graph(bp, {"bad": "{{nope}}"})
+
+def test_prefix_is_fixed_and_state_goes_last(monkeypatch):
+    calls = []
+    class FakeEngine:
+        def complete(self, model, input, **kwargs):
+            calls.append((input, kwargs))
+            usage = {"input_tokens": 1500, "output_tokens": 10, "input_tokens_details": {"cached_tokens": 1280}}
+            return llm.LLMResult("out", model, usage)
+    monkeypatch.delenv("OPENAI_OFFLINE", raising=False)
+    monkeypatch.setattr(llm, "get_engine", lambda: FakeEngine())
+    prompt = prompts.build(prompts.PromptTemplate.compile("curator", "Curate {{goal}}."), "intake", PROJECT)
+    stats = {}
+    orchestrator.run_prompt(prompt, {"phase": "intake", "events": {"a": "complete"}}, stats=stats)
+    orchestrator.run_prompt(prompt, {"phase": "intake", "events": {"a": "complete", "b": "pass"}})
+    (first, kw1), (second, kw2) = calls
+    assert first[:2] == second[:2] and first[2] != second[2]
+    assert first[0]["content"] == "You are a helpful project intake."
+    assert first[1]["content"] == 'Curate Sell socks.\n\nPROJECT:\nshop: Sell socks\n{"stack": "django"}'
+    assert first[2]["content"].startswith("STATE:\n{")
+    assert kw1["prompt_cache_key"] == kw2["prompt_cache_key"] == prompt.key
+    assert stats["cached_tokens"] == 1280
+
+def test_phase_report_counts_cached_tokens():
+    spans = [{"name": "llm.attempt", "phase": "a", "seconds": 1.0, "error": None, "input_tokens": 1500,
+              "output_tokens": 10, "cached_tokens": 1280}]
+    (row,) = tracing.phase_report(spans)
+    assert row["tokens_cached"] == 1280
+    assert "tokens_cached" in tracing.format_report([row])
@@ -0,0 +1,51 @@
+import pytest
+from src import orchestrator
+from src.models import Blueprint
+from src.runtime.routing import RouteTable
+from src.tools import registry
+
+def _bp(*phases):
+    return Blueprint.model_validate({"project": {"id": "r", "goal": "g"}, "phases": list(phases)})
+
+def test_table_is_resolved_at_compile_time():
+    routes = RouteTable(_bp(
+        {"id": "build", "entry_prompt": "x", "transitions": {"on_all_tasks_green": "review"}},
+        {"id": "review", "entry_prompt": "x", "gate": {"type": "automated_checks"},
+         "transitions": {"on_fail": "build", "on_pass": "done"}}))
+    assert not routes.errors
+    assert routes.routes["build"]["complete"].target == "review"
+    # review -> build closes a loop, so it is counted; the way in and the way out are not
+    assert routes.routes["review"]["fail"].limit == 3 and routes.routes["review"]["pass"].target is None
+    assert routes.routes["build"]["complete"].limit is None
+    assert routes.next("review", "fail", {"review->build": 3}) == (None, "loop review->build already taken 3 time(s)")
+    assert routes.next("review", "pass", {}) == (None, None)
+
+def test_wrong_paths_are_reported():
+    errors = RouteTable(_bp(
+        {"id": "a", "entry_prompt": "x", "transitions": {"on_complete": "b"}},
+        {"id": "b", "entry_prompt": "x", "transitions": {"on_complete": "c"}},
+        {"id": "c", "entry_prompt": "x", "transitions": {"on_complete": "b", "on_approved": "done"}},
+        {"id": "d", "entry_prompt": "x", "transitions": {"on_complete": "nowhere"}})).errors
+    assert errors == [
+        "c: transition 'on_approved' never fires (the phase ends with on_complete)",
+        "d: transition 'on_complete' goes to unknown phase 'nowhere'",
+        "d: unreachable from 'a'",
+    ] + [f"{p}: never finishes (every event loops back; add a transition to done)" for p in "abc"]
+    with pytest.raises(orchestrator.RoutingError, match="unreachable"):
+        orchestrator.compile_graph(_bp({"id": "a", "entry_prompt": "x"}, {"id": "b", "entry_prompt": "x"}), {"x": "x"})
+
+def test_rework_loop_halts_at_its_limit(run_env):
+    pushes = []
+    seen = run_env({"project": {"id": "loop", "goal": "g"}, "phases": [
+        {"id": "implement", "entry_prompt": "x", "tasks": [{"id": "push", "tool_calls": ["push"]}],
+         "transitions": {"on_complete": "review"}},
+        {"id": "review", "entry_prompt": "x", "gate": {"type": "automated_checks", "tools": ["check"]},
+         "transitions": {"on_fail": {"to": "implement", "limit": 2}, "on_pass": "done"}}]}, {"x": "x"}, prompt=True,
+        tools={"check": registry.Tool("check", lambda args, state, ctx: {"status": "red"}),
+               "push": registry.Tool("push", lambda args, state, ctx: pushes.append(1), side_effects=True)})
+    out = orchestrator.run_blueprint("bp.yaml", "prompts.yaml")
+    assert seen == ["implement", "review"] * 3
+    # each pass around the loop pushes again; only resume replays are deduplicated
+    assert len(pushes) == 3
+    assert out["loops"] == {"review->implement": 2}
+    assert out["halted"] == "review: loop review->implement already taken 2 time(s)"
@@ -0,0 +1,107 @@
+import json, threading, time, urllib.error, urllib.request
+import pytest
+import yaml
+from src import service
+
+BLUEPRINT = {
+    "project": {"id": "served", "goal": "test"},
+    "phases": [
+        {"id": "intake", "entry_prompt": "curator", "transitions": {"on_complete": "design"}},
+        {"id": "design", "entry_prompt": "designer", "transitions": {"on_complete": "done"}},
+    ],
+}
+
+@pytest.fixture
+def env(run_env, tmp_path):
+    run_env(BLUEPRINT, {"curator": "c", "designer": "d"}, offline=True)
+    return tmp_path
+
+@pytest.fixture
+def api(env):
+    svc = service.Service(service.JobQueue(env / "jobs.sqlite"), workers=2, prompts="prompts.yaml")
+    svc.start()
+    server = service.make_server(svc, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", svc
+    server.shutdown()
+    svc.stop()
+
+def _call(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(req) as resp:
+        return resp.status, json.loads(resp.read())
+
+def _wait(url, job_id, timeout=10, until=("done", "failed")):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        _, job = _call(f"{url}/jobs/{job_id}")
+        if job["status"] in until:
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} still {job['status']}")
+
+def test_submit_and_poll_jobs(api):
+    url, _ = api
+    errors = service.METRICS._counters[("agent_runs_total", (("status", "error"),))]
+    status, body = _call(f"{url}/jobs", {"blueprint": "bp.yaml"})
+    assert status == 202
+    job = _wait(url, body["id"])
+    assert job["status"] == "done", job["error"]
+    assert job["phase"] == "design"
+    assert set(job["result"]["artifacts"]) == {"intake", "design"}
+    # a fresh job starts a run; it does not fail a resume first
+    assert service.METRICS._counters[("agent_runs_total", (("status", "error"),))] == errors
+    _, health = _call(f"{url}/health")
+    assert health["jobs"] == {"done": 1}
+
+def test_waiting_job_resumes_on_webhook(api, env):
+    gated = {**BLUEPRINT, "phases": [{**BLUEPRINT["phases"][0], "gate": {"type": "human_approval"},
+                                      "transitions": {"on_approved": "design"}},
+                                     BLUEPRINT["phases"][1]]}
+    (env / "gated.yaml").write_text(yaml.safe_dump(gated))
+    url, _ = api
+    _, body = _call(f"{url}/jobs", {"blueprint": "gated.yaml"})
+    job = _wait(url, body["id"], until=("waiting", "failed"))
+    assert job["status"] == "waiting", job["error"]
+    assert job["result"]["waiting"][0]["phase"] == "intake"
+    with pytest.raises(urllib.error.HTTPError) as err:
+        _call(f"{url}/jobs/{body['id']}/approve", {"phase": "design"})
+    assert err.value.code == 409
+    assert _call(f"{url}/jobs/{body['id']}/approve", {"phase": "intake", "approved": True})[0] == 202
+    job = _wait(url, body["id"])
+    assert job["status"] == "done", job["error"]
+    assert job["result"]["events"] == {"intake": "approved", "design": "complete"}
+    # a rejection with no on_rejected transition halts the run
+    _, body = _call(f"{url}/jobs", {"blueprint": "gated.yaml"})
+    _wait(url, body["id"], until=("waiting", "failed"))
+    _call(f"{url}/jobs/{body['id']}/approve", {"phase": "intake", "approved": False})
+    job = _wait(url, body["id"], until=("done", "failed", "halted"))
+    assert job["status"] == "halted" and job["result"]["halted"] == "intake: gate rejected, no transition"
+
+def test_rejects_missing_blueprint_and_unknown_options(api, env):
+    url, _ = api
+    with pytest.raises(urllib.error.HTTPError) as err:
+        _call(f"{url}/jobs", {"blueprint": "nope.yaml"})
+    assert err.value.code == 400
+    with pytest.raises(urllib.error.HTTPError) as err:
+        _call(f"{url}/jobs", {"blueprint": "bp.yaml", "options": {"resume": "someone-elses-run"}})
+    assert err.value.code == 400 and "resume" in json.loads(err.value.read())["error"]
+
+def test_interrupted_jobs_are_requeued(env):
+    queue = service.JobQueue(env / "jobs.sqlite")
+    job_id = queue.submit("bp.yaml", "prompts.yaml")
+    run_id = queue.claim()["run_id"]
+    queue.close()
+    # a new process finds the job stuck in 'running' and finishes it under the same run id
+    queue = service.JobQueue(env / "jobs.sqlite")
+    svc = service.Service(queue, workers=1)
+    svc.start()
+    try:
+        deadline = time.monotonic() + 10
+        while queue.get(job_id)["status"] != "done" and time.monotonic() < deadline:
+            time.sleep(0.05)
+        job = queue.get(job_id)
+        assert job["status"] == "done" and job["run_id"] == run_id
+    finally:
+        svc.stop()
@@ -0,0 +1,30 @@
+import os, re, subprocess, sys, pathlib
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+# generous for slow CI machines; validate used to take ~1.7s importing openai/langgraph
+BUDGET_MS = float(os.getenv("AGENT_VALIDATE_IMPORT_BUDGET_MS", "500"))
+HEAVY = ("openai", "langgraph", "requests", "src.orchestrator", "src.tools.github_api")
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+def _importtime(*args):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-m", "src.app", *args], cwd=ROOT,
+                          capture_output=True, text=True)
+    assert proc.returncode == 0, proc.stdout + proc.stderr
+    rows = [(m.group(4), len(m.group(3)), int(m.group(2))) for m in map(LINE.match, proc.stderr.splitlines()) if m]
+    # interpreter start-up (site, encodings) is not ours to budget
+    first = next(i for i, (name, _, _) in enumerate(rows) if name == "src" or name.startswith("src."))
+    return rows[first:]
+
+def test_validate_imports_stay_light():
+    rows = _importtime("validate", "--blueprint", "examples/website_redesign.yaml")
+    names = {name for name, _, _ in rows}
+    assert not [n for n in names if n.split(".")[0] in HEAVY or n in HEAVY]
+    total_ms = sum(us for _, depth, us in rows if depth == 0) / 1000
+    assert total_ms < BUDGET_MS, f"validate spent {total_ms:.0f}ms importing (budget {BUDGET_MS:.0f}ms)"
+
+def test_validate_leaves_no_run_artifacts(tmp_path):
+    env = {**os.environ, "PYTHONPATH": str(ROOT)}
+    bp = ROOT / "examples/website_redesign.yaml"
+    subprocess.run([sys.executable, "-m", "src.app", "validate", "--blueprint", str(bp)], cwd=tmp_path,
+                   env=env, check=True, capture_output=True)
+    assert list(tmp_path.iterdir()) == []
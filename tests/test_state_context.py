@@ -0,0 +1,28 @@
+import json
+from src.runtime.llm import count_tokens
+from src.runtime.state_context import StateContext
+
+def _artifacts(tmp_path, n, size=400):
+    arts = {}
+    for i in range(n):
+        p = tmp_path / f"p{i}.md"
+        p.write_text(f"# Phase {i}\n\n" + ("word " * size))
+        arts[f"p{i}"] = str(p)
+    return arts
+
+def test_render_is_valid_json_within_budget(tmp_path):
+    state = {"phase": "ship", "ctx": {"project_id": "x"}, "artifacts": _artifacts(tmp_path, 6)}
+    out = StateContext(budget=500, summary_tokens=120).render(state)
+    data = json.loads(out)
+    assert count_tokens(out) <= 500
+    # newest artifacts are kept, older ones are named but dropped
+    assert "p5" in data["artifacts"] and "p0" in data["omitted_artifacts"]
+    assert data["artifacts"]["p5"].startswith("# Phase 5")
+
+def test_artifact_pieces_encoded_once(tmp_path):
+    arts = _artifacts(tmp_path, 2, size=10)
+    sc = StateContext()
+    first = sc.render({"phase": "review", "artifacts": arts})
+    for p in arts.values():
+        (tmp_path / p).unlink()
+    assert sc.render({"phase": "review", "artifacts": arts}) == first
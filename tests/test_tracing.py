@@ -0,0 +1,102 @@
+import json, threading, time
+import pytest
+from src import orchestrator
+from src.runtime import tracing
+from src.tools import registry
+
+BLUEPRINT = {
+    "project": {"id": "traced", "goal": "test"},
+    "phases": [
+        {"id": "intake", "entry_prompt": "curator", "transitions": {"on_complete": "build"}},
+        {"id": "build", "entry_prompt": "implementer",
+         "tasks": [{"id": "a", "tool_calls": ["slow:a"]}, {"id": "b", "tool_calls": ["slow:b"]}],
+         "transitions": {"on_complete": "done"}},
+    ],
+}
+
+@pytest.fixture
+def env(run_env, tmp_path):
+    run_env(BLUEPRINT, {"curator": "c", "implementer": "i"}, offline=True, tools={"slow": registry.Tool(
+        "slow", lambda args, state, ctx: time.sleep(0.02), args={"id": str}, positional="id")})
+    return tmp_path
+
+def test_run_writes_nested_spans_and_metrics(env):
+    out = orchestrator.run_blueprint("bp.yaml", "prompts.yaml", run_id="run-t")
+    spans = tracing.load_spans(env / "run_artifacts" / "traces.jsonl")
+    assert {s["run_id"] for s in spans} == {"run-t"}
+    tools = [s for s in spans if s["name"] == "tool"]
+    assert sorted(s["spec"] for s in tools) == ["slow:a", "slow:b"]
+    assert all(s["phase"] == "build" and s["seconds"] >= 0.02 for s in tools)
+    rows = {r["phase"]: r for r in tracing.phase_report(spans)}
+    assert rows["build"]["tool_calls"] == 2
+    assert rows["intake"]["bytes"] == (env / out["artifacts"]["intake"]).stat().st_size
+    prom = (env / "run_artifacts" / "metrics.prom").read_text()
+    assert 'agent_tool_calls_total{status="ok",tool="slow"}' in prom
+    assert 'agent_span_seconds_count{phase="build",span="phase"}' in prom
+
+def test_tool_spans_nest_under_phase(env):
+    tracer = tracing.Tracer("nest", env / "t.jsonl")
+    ctx = orchestrator.RunContext(max_concurrency=2, tracer=tracer)
+    calls = {"a": [registry.parse_call("slow:a")], "b": [registry.parse_call("slow:b")]}
+    phase = orchestrator.Phase.model_validate(BLUEPRINT["phases"][1])
+    with tracer.span("phase", phase="build") as parent:
+        orchestrator.run_tasks(phase.tasks, {"phase": "build"}, ctx, calls)
+    lines = (env / "t.jsonl").read_text().splitlines()
+    raw = [json.loads(l)["resourceSpans"][0]["scopeSpans"][0]["spans"][0] for l in lines]
+    assert [r.get("parentSpanId") for r in raw if r["name"] == "tool"] == [parent.span_id] * 2
+
+def test_llm_attempts_reported_with_retries(env):
+    tracer = tracing.Tracer("llm", env / "t.jsonl")
+    now = time.time_ns()
+    attempts = [{"start": now, "end": now + 10**8, "wait": 0.0, "error": "RateLimitError: slow down"},
+                {"start": now + 2 * 10**8, "end": now + 5 * 10**8, "wait": 0.1, "error": None}]
+    with tracer.span("phase", phase="intake"):
+        orchestrator._trace_attempts(tracer, "intake", "m", attempts, {"input_tokens": 12, "output_tokens": 30})
+    (row,) = tracing.phase_report(tracing.load_spans(env / "t.jsonl"))
+    assert (row["attempts"], row["retries"], row["tokens_in"], row["tokens_out"]) == (2, 1, 12, 30)
+    assert row["llm_s"] == pytest.approx(0.4)
+
+def test_metrics_render_histogram():
+    m = tracing.Metrics()
+    m.observe("x_seconds", 0.3, span="a")
+    m.observe("x_seconds", 3, span="a")
+    m.inc("x_total", 2, kind="in")
+    text = m.render()
+    assert 'x_seconds_bucket{span="a",le="0.5"} 1' in text
+    assert 'x_seconds_bucket{span="a",le="+Inf"} 2' in text
+    assert 'x_seconds_count{span="a"} 2' in text
+    assert 'x_total{kind="in"} 2' in text
+
+def test_metrics_write_is_safe_from_concurrent_writers(tmp_path):
+    m = tracing.Metrics()
+    m.inc("x_total")
+    errors = []
+    def write():
+        try:
+            for _ in range(100):
+                m.write(tmp_path / "metrics.prom")
+        except OSError as e:
+            errors.append(e)
+    threads = [threading.Thread(target=write) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    assert [p.name for p in tmp_path.iterdir()] == ["metrics.prom"]
+    assert "x_total 1" in (tmp_path / "metrics.prom").read_text()
+
+def test_metrics_snapshot_merges_across_processes():
+    worker, parent = tracing.Metrics(), tracing.Metrics()
+    worker.inc("x_total", 2)
+    worker.observe("x_seconds", 0.3)
+    parent.inc("x_total")
+    parent.merge(worker.snapshot(reset=True))
+    assert "x_total 3" in parent.render() and "x_seconds_count 1" in parent.render()
+    assert worker.render() == "\n"
+
+def test_report_table_aligns_columns():
+    rows = [{"phase": "intake", "total_s": 1.5}, {"phase": "qa", "total_s": 12.25, "errors": 1}]
+    lines = tracing.format_report(rows).splitlines()
+    assert lines[0].startswith("phase   total_s") and set(lines[1]) == {"-", " "}
+    assert lines[3].startswith("qa      12.25") and lines[3].endswith("1")